@@ -0,0 +1,77 @@
+"""
+Compares the DRF model serializers with the values serializers on 10k row
+payloads:
+
+    $ python benchmarks/serializers.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+                                                                __file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'example_app.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from django_gamification.extensions.drf.serializers import \
+    BadgeSerializer, BadgeValuesSerializer, \
+    GamificationInterfaceSerializer, GamificationInterfaceValuesSerializer, \
+    PointChangeSerializer, PointChangeValuesSerializer, \
+    UnlockableSerializer, UnlockableValuesSerializer  # noqa: E402
+from django_gamification.models import GamificationInterface, \
+    PointChange, BadgeDefinition, Badge, UnlockableDefinition, \
+    Unlockable  # noqa: E402
+
+ROWS = 10000
+REPEAT = 3
+
+
+def populate():
+    BadgeDefinition.objects.create(name='badge', progression_target=10,
+                                   points=5)
+    UnlockableDefinition.objects.create(name='unlockable',
+                                        points_required=10)
+    interfaces = GamificationInterface.objects.provision_bulk(ROWS)
+    PointChange.objects.award_bulk(
+        (interface, i % 20) for i, interface in enumerate(interfaces))
+
+
+def best_of(serialize):
+    return min(timeit.repeat(serialize, number=1, repeat=REPEAT))
+
+
+def main():
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        populate()
+        print('{:<24} {:>6} {:>10} {:>10} {:>8}'.format(
+            'model', 'rows', 'model (s)', 'values (s)', 'speedup'))
+        for queryset, serializer_class, values_serializer_class in (
+                (GamificationInterface.objects.all(),
+                 GamificationInterfaceSerializer,
+                 GamificationInterfaceValuesSerializer),
+                (PointChange.objects.all(), PointChangeSerializer,
+                 PointChangeValuesSerializer),
+                (BadgeSerializer.setup_eager_loading(Badge.objects.all()),
+                 BadgeSerializer, BadgeValuesSerializer),
+                (Unlockable.objects.all(), UnlockableSerializer,
+                 UnlockableValuesSerializer)):
+            model = best_of(
+                lambda: serializer_class(queryset, many=True).data)
+            values = best_of(lambda: values_serializer_class(queryset).data)
+            print('{:<24} {:>6} {:>10.3f} {:>10.3f} {:>7.1f}x'.format(
+                queryset.model.__name__, queryset.count(), model, values,
+                model / values))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
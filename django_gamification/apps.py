@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class GamificationConfig(AppConfig):
+    name = 'django_gamification'
+
+    def ready(self):
+        # Connect the receivers that keep unlockables, badges and caches in
+        # sync with the models
+        from django_gamification import cache, signals  # noqa: F401
@@ -0,0 +1,272 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from django_gamification.conf import gamification_settings
+from django_gamification.models import GamificationInterface, Badge, \
+    BadgeDefinition, Progression, Unlockable, UnlockableDefinition, \
+    definitions_changed, interface_changed, points_changed
+from django_gamification.registry import definition_registry
+
+
+class InterfaceStateCache(object):
+    """
+    Read-through cache of the gamification state of interfaces, stored in
+    the Django cache named by GAMIFICATION_CACHE.
+
+    The state of an interface is a dict with its points, the ids of the
+    BadgeDefinitions of its acquired (and not revoked) badges, the ids of the
+    UnlockableDefinitions it has unlocked and the progress of its badges by
+    BadgeDefinition id.
+
+    Entries are stored under keys that contain a version per interface and a
+    version for all definitions. The write paths in models.py bump these
+    versions once their transaction commits, so stale entries are simply
+    never read again and expire on their own. Versions are the time of the
+    latest change in nanoseconds, so that a version evicted from the cache
+    can never bring an old entry back, and expire after
+    GAMIFICATION_CACHE_TIMEOUT like the entries.
+    """
+    prefix = 'gamification'
+
+    @property
+    def enabled(self):
+        return gamification_settings.CACHE is not None
+
+    @property
+    def cache(self):
+        return caches[gamification_settings.CACHE]
+
+    def _version_key(self, interface_id):
+        return '{}:interface:{}:version'.format(self.prefix, interface_id)
+
+    def _definitions_key(self):
+        return '{}:definitions:version'.format(self.prefix)
+
+    def _state_key(self, interface_id, definitions_version, version):
+        return '{}:interface:{}:state:{}:{}'.format(
+            self.prefix, interface_id, definitions_version, version)
+
+    def _versions(self, interface_ids):
+        keys = [self._version_key(interface_id)
+                for interface_id in interface_ids]
+        keys.append(self._definitions_key())
+        versions = self.cache.get_many(keys)
+
+        missing = {key: time.time_ns() for key in keys if key not in versions}
+        for key, version in missing.items():
+            if not self.cache.add(key, version,
+                                  gamification_settings.CACHE_TIMEOUT):
+                version = self.cache.get(key, version)
+            versions[key] = version
+        return versions
+
+    def _bump(self, key):
+        version = self.cache.get(key, 0)
+        self.cache.set(key, max(time.time_ns(), version + 1),
+                       gamification_settings.CACHE_TIMEOUT)
+
+    def version(self, interface, create=True):
+        """
+        Returns the version of the state of an interface, which changes
+        whenever its points, badges, unlockables or the definitions change.
+
+        :param interface: GamificationInterface object or its primary key
+        :param create: False to return None instead of starting a version
+            for an interface that has none in the cache, e.g. before it is
+            known to exist
+        :return: version string, None when caching is disabled
+        """
+        if not self.enabled:
+            return None
+        interface_id = getattr(interface, 'pk', interface)
+        if not create and self.cache.get(
+                self._version_key(interface_id)) is None:
+            return None
+        versions = self._versions([interface_id])
+        definitions_version = versions[self._definitions_key()]
+        interface_version = versions[self._version_key(interface_id)]
+        return '{}.{}'.format(definitions_version, interface_version)
+
+    def get(self, interface):
+        """
+        :param interface: GamificationInterface object or its primary key
+        :return: state dict of the interface, None if it does not exist
+        """
+        interface_id = getattr(interface, 'pk', interface)
+        return self.get_many([interface_id]).get(interface_id)
+
+    async def aget(self, interface):
+        """
+        Async version of get.
+        """
+        interface_id = getattr(interface, 'pk', interface)
+        return (await self.aget_many([interface_id])).get(interface_id)
+
+    async def aget_many(self, interfaces):
+        """
+        Async version of get_many. The cache round trips and queries are
+        made in one hop to the sync thread.
+        """
+        return await sync_to_async(self.get_many)(list(interfaces))
+
+    def get_many(self, interfaces):
+        """
+        Returns the state of many interfaces, with a fixed number of cache
+        round trips and, for the ones that are not cached, database queries.
+
+        :param interfaces: iterable of GamificationInterface objects or their
+            primary keys
+        :return: dict of {interface_id: state}
+        """
+        interface_ids = [getattr(interface, 'pk', interface)
+                         for interface in interfaces]
+        if not self.enabled:
+            return self.load(interface_ids)
+
+        versions = self._versions(interface_ids)
+        definitions_version = versions[self._definitions_key()]
+        keys = {
+            interface_id: self._state_key(
+                interface_id, definitions_version,
+                versions[self._version_key(interface_id)])
+            for interface_id in interface_ids
+        }
+        cached = self.cache.get_many(keys.values())
+
+        states = {}
+        missing = []
+        for interface_id, key in keys.items():
+            if key in cached:
+                states[interface_id] = cached[key]
+            else:
+                missing.append(interface_id)
+
+        if missing:
+            loaded = self.load(missing)
+            self.cache.set_many(
+                {keys[interface_id]: state
+                 for interface_id, state in loaded.items()},
+                gamification_settings.CACHE_TIMEOUT)
+            states.update(loaded)
+        return states
+
+    def load(self, interface_ids):
+        """
+        Reads the state of the interfaces from the database with three
+        queries, whatever their number.
+
+        :param interface_ids: primary keys of GamificationInterface objects
+        :return: dict of {interface_id: state}
+        """
+        states = {
+            interface_id: {
+                'points': points,
+                'badges': [],
+                'unlockables': [],
+                'progress': {},
+            }
+            for interface_id, points in GamificationInterface.objects.filter(
+                pk__in=interface_ids).values_list('pk', 'points_balance')
+        }
+
+        for interface_id, definition_id, acquired, revoked, progress in \
+                Badge.objects.filter(
+                    interface_id__in=states
+                ).order_by('badge_definition').values_list(
+                    'interface_id', 'badge_definition_id', 'acquired',
+                    'revoked', 'progression__progress'):
+            state = states[interface_id]
+            if acquired and not revoked:
+                state['badges'].append(definition_id)
+            if progress is not None:
+                state['progress'][definition_id] = progress
+
+        for interface_id, definition_id in Unlockable.objects.filter(
+                interface_id__in=states, acquired=True
+        ).order_by('unlockable_definition').values_list(
+                'interface_id', 'unlockable_definition_id'):
+            states[interface_id]['unlockables'].append(definition_id)
+
+        if gamification_settings.LAZY and states:
+            # Unlockables that have not been stored yet are unlocked when
+            # the balance covers them
+            definitions = [
+                (definition.pk, definition.points_required)
+                for definition in
+                definition_registry.unlockable_definitions()
+            ]
+            for state in states.values():
+                unlocked = set(state['unlockables'])
+                unlocked.update(pk for pk, points_required in definitions
+                                if points_required <= state['points'])
+                state['unlockables'] = sorted(unlocked)
+
+        return states
+
+    def invalidate(self, interface_ids):
+        """
+        Drops the cached state of the interfaces once the current
+        transaction commits.
+
+        :param interface_ids: primary keys of GamificationInterface objects
+        :return:
+        """
+        if not self.enabled:
+            return
+        interface_ids = list(interface_ids)
+
+        def bump():
+            for interface_id in interface_ids:
+                self._bump(self._version_key(interface_id))
+        transaction.on_commit(bump)
+
+    def invalidate_all(self):
+        """
+        Drops the cached state of all interfaces once the current
+        transaction commits.
+
+        :return:
+        """
+        if self.enabled:
+            transaction.on_commit(lambda: self._bump(self._definitions_key()))
+
+
+state_cache = InterfaceStateCache()
+
+
+@receiver(points_changed)
+@receiver(interface_changed)
+def invalidate_interfaces(sender, interface_ids, **kwargs):
+    state_cache.invalidate(interface_ids)
+
+
+@receiver(definitions_changed)
+@receiver(post_delete, sender=BadgeDefinition)
+@receiver(post_delete, sender=UnlockableDefinition)
+def invalidate_definitions(sender, **kwargs):
+    state_cache.invalidate_all()
+
+
+@receiver(post_save, sender=Badge)
+@receiver(post_save, sender=Unlockable)
+@receiver(post_delete, sender=Badge)
+@receiver(post_delete, sender=Unlockable)
+def invalidate_owner(sender, instance, **kwargs):
+    state_cache.invalidate([instance.interface_id])
+
+
+@receiver(post_save, sender=Progression)
+def invalidate_progression_owner(sender, instance, **kwargs):
+    if state_cache.enabled:
+        state_cache.invalidate(Badge.objects.filter(
+            progression=instance).values_list('interface_id', flat=True))
+
+
+@receiver(post_delete, sender=GamificationInterface)
+def invalidate_deleted_interface(sender, instance, **kwargs):
+    state_cache.invalidate([instance.pk])
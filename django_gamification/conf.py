@@ -0,0 +1,59 @@
+from django.conf import settings
+
+
+class GamificationSettings(object):
+    """
+    Gives access to the GAMIFICATION_* Django settings, falling back to the
+    defaults below. Settings are read on every access so that they can be
+    changed with override_settings in tests.
+
+    GAMIFICATION_EVENT_QUEUE
+        Dotted path of the events.EventQueue class that events.emit hands
+        events to: events.ThreadPoolQueue to process them on a background
+        thread, or events.OutboxQueue to store them for the
+        process_gamification_events command.
+
+    GAMIFICATION_LAZY
+        When True, Badges and Unlockables are only stored once something
+        happens to them (progress, award or unlock) instead of being created
+        for every interface up front. See Badge.objects.for_interface and
+        Unlockable.objects.for_interface.
+
+    GAMIFICATION_LEADERBOARD_MAX_AGE
+        Seconds after which the in-process leaderboard is reloaded to pick
+        up points changed by other processes, None to never reload.
+
+    GAMIFICATION_LEDGER_HORIZON_DAYS
+        Default age in days after which the compact_point_changes command
+        folds PointChanges into a checkpoint.
+
+    GAMIFICATION_CACHE
+        Alias of the Django cache used by cache.state_cache, None to always
+        read the state of interfaces from the database.
+
+    GAMIFICATION_CACHE_TIMEOUT
+        Seconds the state of an interface is cached for.
+
+    GAMIFICATION_REGISTRY_CHECK_INTERVAL
+        Seconds between two checks of the version of the definitions in the
+        database by registry.definition_registry, i.e. how long other
+        processes may use definitions that have been changed. None never
+        checks.
+    """
+    defaults = {
+        'CACHE': None,
+        'CACHE_TIMEOUT': 300,
+        'EVENT_QUEUE': 'django_gamification.events.ThreadPoolQueue',
+        'LAZY': False,
+        'LEADERBOARD_MAX_AGE': 60,
+        'LEDGER_HORIZON_DAYS': 365,
+        'REGISTRY_CHECK_INTERVAL': 5,
+    }
+
+    def __getattr__(self, name):
+        if name not in self.defaults:
+            raise AttributeError(name)
+        return getattr(settings, 'GAMIFICATION_' + name, self.defaults[name])
+
+
+gamification_settings = GamificationSettings()
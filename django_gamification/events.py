@@ -0,0 +1,247 @@
+import logging
+import threading
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+from django_gamification.conf import gamification_settings
+from django_gamification.models import Badge, GamificationEvent, \
+    GamificationInterface, PointChange
+from django_gamification.registry import definition_registry
+from django_gamification.rules import rule_engine
+from django_gamification.utils import BULK_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# An action performed by an interface, worth amount points and progress on
+# the badge of badge_definition_id (if any). data is a JSON serializable dict
+# for the trigger predicates of badge definitions.
+Event = namedtuple('Event', ['interface_id', 'action', 'amount',
+                             'badge_definition_id', 'progress', 'data'],
+                   defaults=[None])
+
+
+def emit(interface, action, amount=0, badge=None, progress=1, data=None):
+    """
+    Records that the interface performed an action and hands it to the
+    configured event queue, so that awarding its points and progressing its
+    badge happens outside of the caller's request.
+
+    :param interface: GamificationInterface object or its primary key
+    :param action: name of the action, e.g. 'comment'
+    :param amount: points awarded for the action
+    :param badge: BadgeDefinition object or primary key of the badge to
+        progress, None to progress no badge
+    :param progress: progress added to that badge
+    :param data: JSON serializable dict passed on to trigger predicates
+    :return:
+    """
+    badge_definition_id = getattr(badge, 'pk', badge)
+    get_queue().put([Event(
+        interface_id=getattr(interface, 'pk', interface),
+        action=action,
+        amount=amount,
+        badge_definition_id=badge_definition_id,
+        progress=progress if badge_definition_id is not None else 0,
+        data=data,
+    )])
+
+
+def process_events(events):
+    """
+    Applies a batch of events in one transaction. Events for the same
+    interface are coalesced into a single PointChange and one progression
+    update per badge.
+
+    Every event also progresses the badges whose definition has it as
+    trigger by one, or awards them when they have no progression target and
+    have not been revoked.
+
+    :param events: iterable of Event objects
+    :return:
+    """
+    points = defaultdict(int)
+    progress = defaultdict(int)
+    awards = set()
+    for event in events:
+        points[event.interface_id] += event.amount
+        if event.badge_definition_id is not None:
+            progress[(event.interface_id, event.badge_definition_id)] += \
+                event.progress
+        for rule in rule_engine.match(event):
+            key = (event.interface_id, rule.badge_definition_id)
+            if rule.target is None:
+                awards.add(key)
+            else:
+                progress[key] += 1
+
+    with transaction.atomic():
+        PointChange.objects.award_bulk(
+            (interface_id, amount)
+            for interface_id, amount in points.items() if amount)
+        if progress:
+            Badge.objects.increment_many(progress)
+        for interface_id, definition_id in sorted(awards):
+            badge = Badge.objects.get_for(
+                GamificationInterface(pk=interface_id),
+                definition_registry.badge_definition(definition_id))
+            # award() restores revoked badges, which a trigger must not do
+            if not badge.revoked:
+                badge.award()
+
+
+class EventQueue(object):
+    """
+    Base class of the queues emit hands events to.
+    """
+
+    def put(self, events):
+        """
+        :param events: list of Event objects
+        :return:
+        """
+        raise NotImplementedError
+
+
+class ThreadPoolQueue(EventQueue):
+    """
+    Processes events on a background thread of the current process once the
+    transaction that emitted them commits. Events emitted while a batch is
+    being processed are collected and processed together in the next one.
+
+    Events are lost if the process exits before they are processed, or if
+    processing them fails, which is logged. Use the OutboxQueue when they
+    must not be lost.
+    """
+
+    def __init__(self):
+        self.executor = None
+        self._lock = threading.Lock()
+        self._pending = []
+        self._scheduled = False
+
+    def put(self, events):
+        transaction.on_commit(lambda: self._buffer(events))
+
+    def _buffer(self, events):
+        with self._lock:
+            self._pending.extend(events)
+            if self._scheduled:
+                return
+            self._scheduled = True
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='gamification')
+        self.executor.submit(self._run)
+
+    def _run(self):
+        try:
+            self.drain()
+        except Exception:
+            logger.exception('Failed to process gamification events')
+        finally:
+            connections.close_all()
+
+    def drain(self):
+        """
+        Processes the events collected so far in the calling thread.
+
+        :return: number of events processed
+        """
+        with self._lock:
+            events, self._pending = self._pending, []
+            self._scheduled = False
+        if events:
+            process_events(events)
+        return len(events)
+
+
+class OutboxQueue(EventQueue):
+    """
+    Stores events as GamificationEvent rows in the transaction that emits
+    them, so they are kept exactly when that transaction commits. They are
+    processed in batches by the process_gamification_events command.
+
+    When a batch fails, its events are processed one by one so that the
+    others still go through. Events that fail are kept and retried until
+    they have failed max_attempts times, after which they are left in the
+    table for inspection.
+    """
+    max_attempts = 5
+
+    def put(self, events):
+        GamificationEvent.objects.bulk_create([
+            GamificationEvent(interface_id=event.interface_id,
+                              action=event.action,
+                              amount=event.amount,
+                              badge_definition_id=event.badge_definition_id,
+                              progress=event.progress,
+                              data=event.data)
+            for event in events
+        ], batch_size=BULK_BATCH_SIZE)
+
+    def drain(self, batch_size=BULK_BATCH_SIZE):
+        """
+        Processes and removes the oldest batch of stored events. Concurrent
+        workers skip the rows locked by each other where the database
+        supports it.
+
+        :param batch_size: maximum number of events processed
+        :return: number of events processed or failed
+        """
+        features = connections[GamificationEvent.objects.db].features
+        with transaction.atomic():
+            rows = list(GamificationEvent.objects.select_for_update(
+                skip_locked=features.has_select_for_update_skip_locked
+            ).filter(
+                attempts__lt=self.max_attempts
+            ).order_by('pk').values_list(
+                'pk', 'interface_id', 'action', 'amount',
+                'badge_definition_id', 'progress', 'data'
+            )[:batch_size])
+            if not rows:
+                return 0
+
+            processed = [row[0] for row in rows]
+            failed = []
+            try:
+                with transaction.atomic():
+                    process_events(Event(*row[1:]) for row in rows)
+            except Exception:
+                # Find the events that fail by processing them one by one
+                processed = []
+                for row in rows:
+                    try:
+                        with transaction.atomic():
+                            process_events([Event(*row[1:])])
+                    except Exception:
+                        logger.exception(
+                            'Failed to process gamification event %s', row[0])
+                        failed.append(row[0])
+                    else:
+                        processed.append(row[0])
+
+            GamificationEvent.objects.filter(pk__in=processed).delete()
+            if failed:
+                GamificationEvent.objects.filter(pk__in=failed).update(
+                    attempts=F('attempts') + 1)
+        return len(rows)
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_queue():
+    """
+    :return: the EventQueue named by GAMIFICATION_EVENT_QUEUE, created once
+        per process
+    """
+    path = gamification_settings.EVENT_QUEUE
+    with _queues_lock:
+        if path not in _queues:
+            _queues[path] = import_string(path)()
+        return _queues[path]
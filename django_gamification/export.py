@@ -0,0 +1,128 @@
+import csv
+from collections import OrderedDict
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from django_gamification.models import GamificationInterface, Badge, \
+    PointChange, Unlockable
+
+# The columns of every kind of export, as {column: values_list() lookup}
+EXPORTS = OrderedDict([
+    ('interfaces', (GamificationInterface, OrderedDict([
+        ('id', 'pk'),
+        ('points', 'points_balance'),
+    ]))),
+    ('point_changes', (PointChange, OrderedDict([
+        ('id', 'pk'),
+        ('interface', 'interface_id'),
+        ('amount', 'amount'),
+        ('time', 'time'),
+        ('checkpoint', 'checkpoint'),
+    ]))),
+    ('badges', (Badge, OrderedDict([
+        ('id', 'pk'),
+        ('interface', 'interface_id'),
+        ('badge_definition', 'badge_definition_id'),
+        ('name', 'name'),
+        ('acquired', 'acquired'),
+        ('revoked', 'revoked'),
+        ('progress', 'progression__progress'),
+        ('target', 'progression__target'),
+    ]))),
+    ('unlockables', (Unlockable, OrderedDict([
+        ('id', 'pk'),
+        ('interface', 'interface_id'),
+        ('unlockable_definition', 'unlockable_definition_id'),
+        ('name', 'name'),
+        ('points_required', 'points_required'),
+        ('acquired', 'acquired'),
+    ]))),
+])
+
+FORMATS = ('ndjson', 'csv')
+
+
+def export_rows(kind, interfaces=None, chunk_size=2000):
+    """
+    Streams the rows of one kind of export, reading them with a server-side
+    cursor where the database supports it, so memory use does not depend on
+    the size of the table.
+
+    :param kind: one of the keys of EXPORTS
+    :param interfaces: iterable of GamificationInterface objects or their
+        primary keys to export the data of, None for all interfaces
+    :param chunk_size: number of rows fetched from the database at a time
+    :return: generator of (column, value) tuples per row
+    """
+    model, columns = EXPORTS[kind]
+    queryset = model._default_manager.order_by('pk')
+    if interfaces is not None:
+        interface_ids = [getattr(interface, 'pk', interface)
+                         for interface in interfaces]
+        if model is GamificationInterface:
+            queryset = queryset.filter(pk__in=interface_ids)
+        else:
+            queryset = queryset.filter(interface_id__in=interface_ids)
+
+    names = list(columns)
+    for row in queryset.values_list(*columns.values()).iterator(
+                                                    chunk_size=chunk_size):
+        yield zip(names, row)
+
+
+def to_ndjson(rows):
+    """
+    :param rows: iterable of rows from export_rows
+    :return: generator of one JSON object per line
+    """
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(OrderedDict(row)) + '\n'
+
+
+class _Echo(object):
+    """
+    File-like object whose write returns what was written, so csv.writer
+    can be used to format one line at a time.
+    """
+
+    def write(self, value):
+        return value
+
+
+def to_csv(rows, columns):
+    """
+    :param rows: iterable of rows from export_rows
+    :param columns: names of the columns
+    :return: generator of the header line and one line per row
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for column, value in row])
+
+
+def export(kind, format='ndjson', interfaces=None, chunk_size=2000):
+    """
+    Streams an export as text, e.g. into a StreamingHttpResponse:
+
+        StreamingHttpResponse(export('point_changes', interfaces=[pk]),
+                              content_type='application/x-ndjson')
+
+    :param kind: one of the keys of EXPORTS
+    :param format: 'ndjson' or 'csv'
+    :param interfaces: see export_rows
+    :param chunk_size: see export_rows
+    :return: generator of str
+    """
+    if kind not in EXPORTS:
+        raise ValueError('Unknown export {!r}'.format(kind))
+    if format not in FORMATS:
+        raise ValueError('Unknown format {!r}'.format(format))
+
+    rows = export_rows(kind, interfaces=interfaces, chunk_size=chunk_size)
+    if format == 'csv':
+        return to_csv(rows, list(EXPORTS[kind][1]))
+    return to_ndjson(rows)
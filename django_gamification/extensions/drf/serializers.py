@@ -5,16 +5,44 @@ from django_gamification.models import GamificationInterface, Category, \
     Unlockable
 
 
-class GamificationInterfaceSerializer(serializers.ModelSerializer):
+class EagerLoadingMixin(object):
     """
+    Lets list views load everything a serializer renders with a constant
+    number of queries:
 
+        queryset = BadgeSerializer.setup_eager_loading(Badge.objects.all())
     """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """
+        :param queryset: queryset of the serializer's model
+        :return: queryset that joins or prefetches the nested objects
+        """
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(
+                *cls.prefetch_related_fields)
+        return queryset
+
+
+class GamificationInterfaceSerializer(EagerLoadingMixin,
+                                      serializers.ModelSerializer):
+    """
+    points is read from the points_balance column loaded with the interface
+    rather than with a query per interface.
+    """
+    points = serializers.IntegerField(source='points_balance', read_only=True)
+
     class Meta:
         model = GamificationInterface
         fields = ('id', 'points')
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """
 
     """
@@ -23,7 +51,7 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class PointChangeSerializer(serializers.ModelSerializer):
+class PointChangeSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """
 
     """
@@ -32,7 +60,7 @@ class PointChangeSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class ProgressionSerializer(serializers.ModelSerializer):
+class ProgressionSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """
 
     """
@@ -41,10 +69,13 @@ class ProgressionSerializer(serializers.ModelSerializer):
         fields = ('id', 'progress', 'target', 'finished')
 
 
-class BadgeDefinitionSerializer(serializers.ModelSerializer):
+class BadgeDefinitionSerializer(EagerLoadingMixin,
+                                serializers.ModelSerializer):
     """
 
     """
+    select_related_fields = ('category',)
+
     category = CategorySerializer()
 
     class Meta:
@@ -52,10 +83,12 @@ class BadgeDefinitionSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class BadgeSerializer(serializers.ModelSerializer):
+class BadgeSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """
 
     """
+    select_related_fields = ('progression',)
+
     progression = ProgressionSerializer()
 
     class Meta:
@@ -63,7 +96,8 @@ class BadgeSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class UnlockableDefinitionSerializer(serializers.ModelSerializer):
+class UnlockableDefinitionSerializer(EagerLoadingMixin,
+                                     serializers.ModelSerializer):
     """
 
     """
@@ -72,10 +106,90 @@ class UnlockableDefinitionSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class UnlockableSerializer(serializers.ModelSerializer):
+class UnlockableSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """
 
     """
     class Meta:
         model = Unlockable
         fields = '__all__'
+
+
+class ValuesSerializer(object):
+    """
+    Read-only serializer that builds the output of a ModelSerializer from
+    .values_list() rows, without model instances or per-field serializer
+    calls. Much cheaper for long lists:
+
+        BadgeValuesSerializer(Badge.objects.filter(...)).data
+    """
+    fields = ()
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def get_lookups(self):
+        """
+        :return: names passed to values_list, fields by default
+        """
+        return self.fields
+
+    def to_representation(self, row):
+        return dict(zip(self.fields, row))
+
+    @property
+    def data(self):
+        return [self.to_representation(row)
+                for row in self.queryset.values_list(*self.get_lookups())]
+
+
+class GamificationInterfaceValuesSerializer(ValuesSerializer):
+    """
+    Same output as GamificationInterfaceSerializer.
+    """
+    fields = ('id', 'points_balance')
+
+    def to_representation(self, row):
+        return {'id': row[0], 'points': row[1]}
+
+
+class PointChangeValuesSerializer(ValuesSerializer):
+    """
+    Same output as PointChangeSerializer.
+    """
+    fields = ('id', 'amount', 'time', 'checkpoint', 'interface')
+    time_field = serializers.DateTimeField()
+
+    def to_representation(self, row):
+        return {'id': row[0], 'amount': row[1],
+                'time': self.time_field.to_representation(row[2]),
+                'checkpoint': row[3], 'interface': row[4]}
+
+
+class BadgeValuesSerializer(ValuesSerializer):
+    """
+    Same output as BadgeSerializer.
+    """
+    fields = ('id', 'progression', 'acquired', 'revoked', 'name',
+              'description', 'points', 'points_awarded', 'badge_definition',
+              'interface', 'next_badge', 'category')
+
+    def get_lookups(self):
+        return self.fields + ('progression__progress', 'progression__target')
+
+    def to_representation(self, row):
+        data = dict(zip(self.fields, row))
+        if data['progression'] is not None:
+            progress, target = row[-2:]
+            data['progression'] = {'id': data['progression'],
+                                   'progress': progress, 'target': target,
+                                   'finished': progress >= target}
+        return data
+
+
+class UnlockableValuesSerializer(ValuesSerializer):
+    """
+    Same output as UnlockableSerializer.
+    """
+    fields = ('id', 'acquired', 'name', 'points_required', 'description',
+              'unlockable_definition', 'interface')
@@ -0,0 +1,13 @@
+from rest_framework.routers import SimpleRouter
+
+from django_gamification.extensions.drf.views import \
+    GamificationInterfaceViewSet, BadgeViewSet, PointChangeViewSet, \
+    UnlockableViewSet
+
+router = SimpleRouter()
+router.register(r'interfaces', GamificationInterfaceViewSet)
+router.register(r'badges', BadgeViewSet)
+router.register(r'unlockables', UnlockableViewSet)
+router.register(r'point-changes', PointChangeViewSet)
+
+urlpatterns = router.urls
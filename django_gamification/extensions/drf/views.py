@@ -0,0 +1,227 @@
+import hashlib
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework import pagination, viewsets
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from django_gamification.cache import state_cache
+from django_gamification.extensions.drf.serializers import \
+    GamificationInterfaceSerializer, BadgeSerializer, PointChangeSerializer, \
+    UnlockableSerializer
+from django_gamification.models import GamificationInterface, Badge, \
+    PointChange, Unlockable
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Paginates by the position of the last row of a page in the ordering,
+    e.g. WHERE (time, id) < (last time, last id), instead of an OFFSET, so
+    deep pages cost as much as the first one. All ordering fields must be
+    sorted in the same direction and the last one must be unique.
+    """
+    ordering = ('id',)
+    page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def _fields(self):
+        return [name.lstrip('-') for name in self.ordering]
+
+    def encode_cursor(self, obj):
+        position = [getattr(obj, name) for name in self._fields()]
+        position = [value.isoformat() if hasattr(value, 'isoformat')
+                    else value for value in position]
+        return urlsafe_b64encode(
+            json.dumps(position).encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, queryset, encoded):
+        try:
+            position = json.loads(urlsafe_b64decode(
+                encoded.encode('ascii')).decode('ascii'))
+            fields = self._fields()
+            if len(position) != len(fields):
+                raise ValueError(encoded)
+            opts = queryset.model._meta
+            return [opts.get_field(name).to_python(value)
+                    for name, value in zip(fields, position)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        queryset = queryset.order_by(*self.ordering)
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            position = self.decode_cursor(queryset, encoded)
+            lookup = 'lt' if self.ordering[0].startswith('-') else 'gt'
+            after = Q()
+            fields = self._fields()
+            for i, name in enumerate(fields):
+                equal = dict(zip(fields[:i], position[:i]))
+                equal['{}__{}'.format(name, lookup)] = position[i]
+                after |= Q(**equal)
+            queryset = queryset.filter(after)
+
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(),
+                                   self.cursor_query_param,
+                                   self.encode_cursor(self.last))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+
+class PointChangePagination(KeysetPagination):
+    """
+    Newest PointChanges first, by (time, id).
+    """
+    ordering = ('-time', '-id')
+
+
+class ConditionalGetMixin(object):
+    """
+    Answers GET requests for the data of one interface with an ETag derived
+    from the version state_cache keeps for it, and
+    with 304 Not Modified, without querying the database, when the client
+    already has the current version. Needs GAMIFICATION_CACHE to be set,
+    without it responses are always sent in full.
+
+    There is no Last-Modified, as its whole seconds cannot tell apart two
+    changes made within the same second.
+
+    A version is only started for interfaces that exist, so that requests
+    for made up ids do not fill the cache.
+    """
+
+    def get_interface_id(self):
+        """
+        :return: primary key of the interface whose data the request asks
+            for, None if it is not about a single interface
+        """
+        return None
+
+    def conditional(self, handler, request, *args, **kwargs):
+        interface_id = self.get_interface_id()
+        version = None
+        if interface_id is not None and state_cache.enabled:
+            version = state_cache.version(interface_id, create=False)
+            if version is None and GamificationInterface.objects.filter(
+                    pk=interface_id).exists():
+                version = state_cache.version(interface_id)
+        if version is None:
+            return handler(request, *args, **kwargs)
+
+        etag = quote_etag(hashlib.md5('{}:{}:{}'.format(
+            version, request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', '')
+        ).encode('utf-8')).hexdigest())
+
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+
+        response = handler(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(
+            super(ConditionalGetMixin, self).list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(
+            super(ConditionalGetMixin, self).retrieve, request, *args,
+            **kwargs)
+
+
+class InterfaceFilterMixin(object):
+    """
+    Filters the objects of a viewset by the interface given in the
+    ?interface= query parameter.
+    """
+
+    def get_interface_id(self):
+        interface_id = self.request.query_params.get('interface')
+        if interface_id is None:
+            return None
+        if not interface_id.isdigit():
+            raise ValidationError({'interface': 'A valid integer is required.'})
+        return int(interface_id)
+
+    def get_queryset(self):
+        queryset = super(InterfaceFilterMixin, self).get_queryset()
+        interface_id = self.get_interface_id()
+        if interface_id is not None:
+            queryset = queryset.filter(interface_id=interface_id)
+        return self.get_serializer_class().setup_eager_loading(queryset)
+
+
+class GamificationInterfaceViewSet(ConditionalGetMixin,
+                                   viewsets.ReadOnlyModelViewSet):
+    """
+
+    """
+    queryset = GamificationInterface.objects.all()
+    serializer_class = GamificationInterfaceSerializer
+    pagination_class = KeysetPagination
+    # The viewsets expose the data of every interface, so only staff may
+    # read it unless a subclass limits the queryset to the requesting user
+    permission_classes = (IsAdminUser,)
+
+    def get_interface_id(self):
+        pk = str(self.kwargs.get('pk', ''))
+        # Anything else is not found by retrieve anyway
+        return int(pk) if pk.isdigit() else None
+
+
+class BadgeViewSet(InterfaceFilterMixin, ConditionalGetMixin,
+                   viewsets.ReadOnlyModelViewSet):
+    """
+
+    """
+    queryset = Badge.objects.all()
+    serializer_class = BadgeSerializer
+    pagination_class = KeysetPagination
+    permission_classes = (IsAdminUser,)
+
+
+class UnlockableViewSet(InterfaceFilterMixin, ConditionalGetMixin,
+                        viewsets.ReadOnlyModelViewSet):
+    """
+
+    """
+    queryset = Unlockable.objects.all()
+    serializer_class = UnlockableSerializer
+    pagination_class = KeysetPagination
+    permission_classes = (IsAdminUser,)
+
+
+class PointChangeViewSet(InterfaceFilterMixin, ConditionalGetMixin,
+                         viewsets.ReadOnlyModelViewSet):
+    """
+    Point history, newest first.
+    """
+    queryset = PointChange.objects.all()
+    serializer_class = PointChangeSerializer
+    pagination_class = PointChangePagination
+    permission_classes = (IsAdminUser,)
@@ -0,0 +1,308 @@
+import csv
+import json
+from collections import defaultdict
+
+from django.core.management.color import no_style
+from django.db import NotSupportedError, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from django_gamification.conf import gamification_settings
+from django_gamification.export import FORMATS
+from django_gamification.models import GamificationInterface, Badge, \
+    BadgeDefinition, PointChange, PointRollup, Progression, Unlockable, \
+    UnlockableDefinition, interface_changed, points_changed
+from django_gamification.registry import definition_registry
+from django_gamification.utils import BULK_BATCH_SIZE, chunked
+
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return value.lower() in ('true', '1', 'yes')
+    return bool(value)
+
+
+def _to_datetime(value):
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if value is not None and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+# The columns read by every kind of import and how they are converted. The
+# columns are the ones written by the export of the same kind.
+IMPORTS = {
+    'interfaces': {'id': int},
+    'point_changes': {'interface': int, 'amount': int,
+                      'time': _to_datetime, 'checkpoint': _to_bool},
+    'badges': {'interface': int, 'badge_definition': int,
+               'acquired': _to_bool, 'revoked': _to_bool, 'progress': int},
+}
+
+
+def read_rows(kind, lines, format='ndjson'):
+    """
+    Parses the lines of an NDJSON or CSV file, as written by
+    export.export, into dicts with the columns the import of kind reads.
+    Missing and empty values become None.
+
+    :param kind: one of the keys of IMPORTS
+    :param lines: iterable of str, e.g. an open file
+    :param format: 'ndjson' or 'csv'
+    :return: generator of dicts
+    """
+    if kind not in IMPORTS:
+        raise ValueError('Unknown import {!r}'.format(kind))
+    if format not in FORMATS:
+        raise ValueError('Unknown format {!r}'.format(format))
+
+    if format == 'csv':
+        records = csv.DictReader(lines)
+    else:
+        records = (json.loads(line) for line in lines if line.strip())
+
+    columns = IMPORTS[kind]
+    for record in records:
+        row = {}
+        for column, convert in columns.items():
+            value = record.get(column)
+            row[column] = None if value in (None, '') else convert(value)
+        yield row
+
+
+def import_interfaces(rows, batch_size=BULK_BATCH_SIZE):
+    """
+    Creates the interfaces with the given ids that do not exist yet, and
+    unless in lazy mode their Badges and Unlockables, with bulk inserts that
+    do not send post_save. Their points come from the imported point
+    changes.
+
+    :param rows: iterable of dicts with an id
+    :param batch_size: number of interfaces created per transaction
+    :return: list of the ids of the created interfaces
+    """
+    using = GamificationInterface.objects.db
+    created = []
+    for batch in chunked(rows, batch_size):
+        interface_ids = {row['id'] for row in batch}
+        with transaction.atomic(using=using):
+            interface_ids -= set(GamificationInterface.objects.filter(
+                pk__in=interface_ids).values_list('pk', flat=True))
+            interfaces = [GamificationInterface(pk=interface_id)
+                          for interface_id in sorted(interface_ids)]
+            GamificationInterface.objects.bulk_create(interfaces,
+                                                      batch_size=batch_size)
+            if not gamification_settings.LAZY:
+                Badge.objects.create_badges(
+                    BadgeDefinition.objects.order_by('pk'), interfaces,
+                    batch_size=batch_size)
+                Unlockable.objects.create_unlockables(
+                    UnlockableDefinition.objects.order_by('pk'), interfaces,
+                    batch_size=batch_size)
+        created.extend(interface.pk for interface in interfaces)
+
+    # Interfaces were inserted with explicit ids, move the sequence past them
+    # like loaddata does
+    if created:
+        connection = connections[using]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [GamificationInterface]):
+                cursor.execute(sql)
+    return created
+
+
+def import_point_changes(rows, batch_size=BULK_BATCH_SIZE):
+    """
+    Appends point changes to the ledger of their interfaces, keeping their
+    time, and applies them to the balances and PointRollups with one UPDATE
+    per distinct total per batch. Checkpoints only count in the balances. Rows without a time are dated now.
+    Keeping the times needs a database that returns the primary keys of
+    bulk inserts, such as PostgreSQL or SQLite.
+
+    :param rows: iterable of dicts with an interface, amount and optionally
+        time and checkpoint
+    :param batch_size: number of point changes written per transaction
+    :return: number of PointChange objects created
+    """
+    using = PointChange.objects.db
+    can_return_rows = \
+        connections[using].features.can_return_rows_from_bulk_insert
+
+    created = 0
+    for batch in chunked(rows, batch_size):
+        times = [row.get('time') for row in batch]
+        if not can_return_rows and any(times):
+            raise NotSupportedError(
+                'Importing the time of point changes needs a database that '
+                'returns the primary keys of bulk inserts')
+        changes = [PointChange(interface_id=row['interface'],
+                               amount=row['amount'],
+                               checkpoint=bool(row.get('checkpoint')))
+                   for row in batch]
+        totals = defaultdict(int)
+        for change in changes:
+            totals[change.interface_id] += change.amount
+        interfaces_by_total = defaultdict(list)
+        for interface_id, total in totals.items():
+            interfaces_by_total[total].append(interface_id)
+
+        with transaction.atomic(using=using):
+            # The field has auto_now_add, so bulk_create dates the rows now
+            # and the imported times are written back afterwards
+            PointChange.objects.bulk_create(changes, batch_size=batch_size)
+            dated = []
+            for change, time in zip(changes, times):
+                if time is not None:
+                    change.time = time
+                    dated.append(change)
+            if dated:
+                PointChange.objects.bulk_update(dated, ['time'],
+                                                batch_size=batch_size)
+
+            for total, interface_ids in interfaces_by_total.items():
+                if total:
+                    GamificationInterface.objects.filter(
+                        pk__in=interface_ids
+                    ).update(points_balance=F('points_balance') + total)
+            # A checkpoint is the total of older changes, which would all
+            # land in its bucket
+            PointRollup.objects.add(
+                (change.interface_id, change.time, change.amount)
+                for change in changes if not change.checkpoint)
+            points_changed.send(sender=GamificationInterface,
+                                interface_ids=list(totals))
+        created += len(changes)
+    return created
+
+
+def import_badges(rows, batch_size=BULK_BATCH_SIZE):
+    """
+    Sets the acquired and revoked flags and the progress of the badges of
+    interfaces, creating the badges that have not been stored yet. Flags
+    and progress are written with one UPDATE per distinct value per batch,
+    a missing (None) value leaves the stored one alone. Points are not
+    awarded, import them as point changes. Badges that end up acquired and
+    not revoked count as having had their points awarded.
+
+    :param rows: iterable of dicts with an interface, badge_definition and
+        optionally acquired, revoked and progress
+    :param batch_size: number of badges updated per transaction
+    :return: number of badges updated
+    """
+    updated = 0
+    for batch in chunked(rows, batch_size):
+        states = {(row['interface'], row['badge_definition']): row
+                  for row in batch}
+        interface_ids = {key[0] for key in states}
+        definition_ids = {key[1] for key in states}
+
+        with transaction.atomic(using=Badge.objects.db):
+            def stored():
+                return {
+                    (interface_id, definition_id): (pk, progression_id)
+                    for interface_id, definition_id, pk, progression_id in
+                    Badge.objects.filter(
+                        interface_id__in=interface_ids,
+                        badge_definition_id__in=definition_ids
+                    ).values_list('interface_id', 'badge_definition_id',
+                                  'pk', 'progression_id')
+                }
+
+            found = stored()
+            missing = defaultdict(list)
+            for interface_id, definition_id in states:
+                if (interface_id, definition_id) not in found:
+                    missing[definition_id].append(interface_id)
+            for definition_id, missing_ids in missing.items():
+                definition = definition_registry.badge_definition(
+                                                                definition_id)
+                if definition is None:
+                    raise ValueError(
+                        'Unknown badge definition {}'.format(definition_id))
+                Badge.objects.create_badges([definition], missing_ids)
+            if missing:
+                found = stored()
+
+            badges_by_flag = defaultdict(list)
+            progressions_by_progress = defaultdict(list)
+            for key, row in states.items():
+                pk, progression_id = found[key]
+                for flag in ('acquired', 'revoked'):
+                    if row.get(flag) is not None:
+                        badges_by_flag[(flag, row[flag])].append(pk)
+                if progression_id is not None and \
+                        row.get('progress') is not None:
+                    progressions_by_progress[row['progress']].append(
+                                                            progression_id)
+
+            for (flag, value), pks in badges_by_flag.items():
+                Badge.objects.filter(pk__in=pks).update(**{flag: value})
+            if badges_by_flag:
+                Badge.objects.filter(pk__in={
+                    pk for pks in badges_by_flag.values() for pk in pks
+                }).update(points_awarded=Q(acquired=True, revoked=False))
+            for progress, progression_ids in \
+                    progressions_by_progress.items():
+                Progression.objects.filter(
+                    pk__in=progression_ids).update(progress=progress)
+            interface_changed.send(sender=GamificationInterface,
+                                   interface_ids=list(interface_ids))
+        updated += len(states)
+    return updated
+
+
+def reconcile(interfaces=None, batch_size=BULK_BATCH_SIZE):
+    """
+    Brings the derived state of imported interfaces in line with their
+    points and progress in one set-based pass per batch: badges whose
+    progress reached their target are acquired and unlockables covered by
+    the balance are unlocked.
+
+    :param interfaces: iterable of GamificationInterface objects or their
+        primary keys, None for all interfaces
+    :param batch_size: number of interfaces handled per transaction
+    :return:
+    """
+    if interfaces is None:
+        interfaces = GamificationInterface.objects.order_by(
+            'pk').values_list('pk', flat=True).iterator(chunk_size=batch_size)
+
+    for batch in chunked(interfaces, batch_size):
+        interface_ids = [getattr(interface, 'pk', interface)
+                         for interface in batch]
+        with transaction.atomic(using=Badge.objects.db):
+            # Their points are part of the imported point changes
+            if Badge.objects.filter(
+                interface_id__in=interface_ids,
+                acquired=False,
+                revoked=False,
+                progression__progress__gte=F('progression__target')
+            ).update(acquired=True, points_awarded=True):
+                interface_changed.send(sender=GamificationInterface,
+                                       interface_ids=interface_ids)
+            Unlockable.objects.unlock_reached(interface_ids)
+
+
+def import_data(kind, lines, format='ndjson', batch_size=BULK_BATCH_SIZE):
+    """
+    Imports an NDJSON or CSV file of one kind. Import interfaces first, then
+    point changes and badges, and call reconcile once everything has been
+    imported.
+
+    :param kind: one of the keys of IMPORTS
+    :param lines: iterable of str, e.g. an open file
+    :param format: 'ndjson' or 'csv'
+    :param batch_size: number of rows written per transaction
+    :return: list of created interface ids for interfaces, otherwise the
+        number of rows imported
+    """
+    rows = read_rows(kind, lines, format=format)
+    importer = {
+        'interfaces': import_interfaces,
+        'point_changes': import_point_changes,
+        'badges': import_badges,
+    }[kind]
+    return importer(rows, batch_size=batch_size)
@@ -0,0 +1,292 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from django_gamification.conf import gamification_settings
+from django_gamification.models import GamificationInterface, \
+    LeaderboardSnapshot, PointRollup, points_changed
+from django_gamification.utils import BULK_BATCH_SIZE, chunked
+
+Standing = namedtuple('Standing', ['rank', 'interface_id', 'points'])
+
+
+class Leaderboard(object):
+    """
+    Ranks all interfaces by points.
+
+    The ranking is kept in memory as a list of (-points, interface_id) sorted
+    with bisect, so finding the rank of an interface is O(log n). It is
+    loaded from the LeaderboardSnapshot table, corrected with the balances
+    that changed since the snapshot was taken, and then kept up to date by
+    the points_changed signal. Interfaces changed by other processes are
+    picked up when the ranking is older than GAMIFICATION_LEADERBOARD_MAX_AGE
+    seconds.
+
+    Ranks follow standard competition ranking: interfaces with the same
+    points share a rank, and the rank is one more than the number of
+    interfaces with more points.
+
+    top, rank, standing and around also take a period (PointRollup.DAY, WEEK
+    or MONTH) and a time in that period (defaults to now) to rank the points
+    gained in that window instead. These are read from the PointRollup
+    table with index range reads, and only interfaces that gained or lost
+    points in the window are ranked.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._points = {}
+        self._ranking = []
+        self._changed = set()
+        self._loaded_at = None
+
+    def _interface_id(self, interface):
+        return getattr(interface, 'pk', interface)
+
+    def _set(self, interface_id, points):
+        previous = self._points.get(interface_id)
+        if previous is not None:
+            del self._ranking[bisect_left(self._ranking,
+                                          (-previous, interface_id))]
+        if points is None:
+            self._points.pop(interface_id, None)
+        else:
+            self._points[interface_id] = points
+            insort(self._ranking, (-points, interface_id))
+
+    def load(self):
+        """
+        Loads the ranking from the snapshot table and applies the balances
+        that no longer match it.
+
+        :return:
+        """
+        with self._lock:
+            self._points = {}
+            self._ranking = []
+            for interface_id, points in LeaderboardSnapshot.objects.order_by(
+                    'rank', 'interface').values_list('interface', 'points'
+                                                     ).iterator():
+                self._points[interface_id] = points
+                self._ranking.append((-points, interface_id))
+            # The snapshot is ordered by rank, but ties may not be ordered
+            # by interface
+            self._ranking.sort()
+
+            changed = GamificationInterface.objects.exclude(
+                leaderboardsnapshot__points=F('points_balance')
+            ).values_list('pk', 'points_balance')
+            for interface_id, points in changed.iterator():
+                self._set(interface_id, points)
+
+            self._changed = set()
+            self._loaded_at = time.monotonic()
+
+    def _refresh(self):
+        max_age = gamification_settings.LEADERBOARD_MAX_AGE
+        if self._loaded_at is None or (
+                max_age is not None and
+                time.monotonic() - self._loaded_at > max_age):
+            self.load()
+            return
+
+        if self._changed:
+            changed, self._changed = self._changed, set()
+            found = dict(GamificationInterface.objects.filter(
+                pk__in=changed
+            ).values_list('pk', 'points_balance'))
+            for interface_id in changed:
+                self._set(interface_id, found.get(interface_id))
+
+    def mark_changed(self, interface_ids):
+        """
+        Marks interfaces whose points changed, their new balances are read
+        the next time the leaderboard is used.
+
+        :param interface_ids: primary keys of GamificationInterface objects
+        :return:
+        """
+        with self._lock:
+            self._changed.update(interface_ids)
+
+    def _standing(self, index):
+        points, interface_id = self._ranking[index]
+        rank = bisect_left(self._ranking, (points,)) + 1
+        return Standing(rank, interface_id, -points)
+
+    def top(self, count, period=None, at=None):
+        """
+        :param count: number of standings to return
+        :param period: rank the points of this period instead of all points
+        :param at: time in the period, defaults to now
+        :return: list of Standing for the interfaces with most points
+        """
+        if period is not None:
+            rows = self._window(period, at).order_by(
+                '-points', 'interface').values_list(
+                'interface', 'points')[:count]
+            return _ranked(rows, 1, 1)
+
+        with self._lock:
+            self._refresh()
+            return [self._standing(index)
+                    for index in range(min(count, len(self._ranking)))]
+
+    def rank(self, interface, period=None, at=None):
+        """
+        :param interface: GamificationInterface object or its primary key
+        :param period: rank the points of this period instead of all points
+        :param at: time in the period, defaults to now
+        :return: rank of the interface, or None if it is not ranked
+        """
+        standing = self.standing(interface, period, at)
+        return standing and standing.rank
+
+    def standing(self, interface, period=None, at=None):
+        """
+        :param interface: GamificationInterface object or its primary key
+        :param period: rank the points of this period instead of all points
+        :param at: time in the period, defaults to now
+        :return: Standing of the interface, or None if it is not ranked
+        """
+        interface_id = self._interface_id(interface)
+        if period is not None:
+            window = self._window(period, at)
+            points = window.filter(interface_id=interface_id).values_list(
+                                                'points', flat=True).first()
+            if points is None:
+                return None
+            return Standing(window.filter(points__gt=points).count() + 1,
+                            interface_id, points)
+
+        with self._lock:
+            self._refresh()
+            points = self._points.get(interface_id)
+            if points is None:
+                return None
+            return Standing(
+                bisect_left(self._ranking, (-points,)) + 1,
+                interface_id, points)
+
+    def around(self, interface, count=5, period=None, at=None):
+        """
+        Returns the standings of the interface and its neighbours.
+
+        :param interface: GamificationInterface object or its primary key
+        :param count: number of neighbours on each side
+        :param period: rank the points of this period instead of all points
+        :param at: time in the period, defaults to now
+        :return: list of Standing, empty if the interface is not ranked
+        """
+        interface_id = self._interface_id(interface)
+        if period is not None:
+            return self._window_around(interface_id, count, period, at)
+
+        with self._lock:
+            self._refresh()
+            points = self._points.get(interface_id)
+            if points is None:
+                return []
+            index = bisect_right(self._ranking, (-points, interface_id)) - 1
+            return [self._standing(position) for position in range(
+                max(index - count, 0),
+                min(index + count + 1, len(self._ranking)))]
+
+    def _window(self, period, at):
+        return PointRollup.objects.filter(
+            period=period,
+            start=PointRollup.bucket_start(period, at or timezone.now()))
+
+    def _window_around(self, interface_id, count, period, at):
+        window = self._window(period, at)
+        points = window.filter(interface_id=interface_id).values_list(
+                                                'points', flat=True).first()
+        if points is None:
+            return []
+
+        ahead = Q(points__gt=points) | Q(points=points,
+                                         interface_id__lt=interface_id)
+        above = list(window.filter(ahead).order_by(
+            'points', '-interface').values_list('interface', 'points')[:count])
+        above.reverse()
+        below = list(window.exclude(ahead).exclude(
+            interface_id=interface_id
+        ).order_by('-points', 'interface').values_list(
+            'interface', 'points')[:count])
+
+        rows = above + [(interface_id, points)] + below
+        first_points = rows[0][1]
+        first_rank = window.filter(points__gt=first_points).count() + 1
+        first_position = window.filter(
+            Q(points__gt=first_points) |
+            Q(points=first_points, interface_id__lt=rows[0][0])
+        ).count() + 1
+        return _ranked(rows, first_position, first_rank)
+
+    def save_snapshot(self, batch_size=BULK_BATCH_SIZE):
+        """
+        Replaces the LeaderboardSnapshot table with the current ranking.
+
+        :param batch_size: number of rows per INSERT
+        :return: number of interfaces in the snapshot
+        """
+        with self._lock:
+            self.load()
+            ranking = list(self._ranking)
+
+        with transaction.atomic():
+            LeaderboardSnapshot.objects.all().delete()
+            rank = 0
+            previous = None
+            for batch in chunked(enumerate(ranking, 1), batch_size):
+                rows = []
+                for position, (points, interface_id) in batch:
+                    if points != previous:
+                        rank, previous = position, points
+                    rows.append(LeaderboardSnapshot(
+                        interface_id=interface_id, points=-points, rank=rank))
+                LeaderboardSnapshot.objects.bulk_create(rows)
+        return len(ranking)
+
+
+def _ranked(rows, first_position, first_rank):
+    """
+    Turns consecutive (interface_id, points) rows ordered by points into
+    standings, given the position and rank of the first row.
+    """
+    standings = []
+    for position, (interface_id, points) in enumerate(rows, first_position):
+        if not standings:
+            rank = first_rank
+        elif points != standings[-1].points:
+            rank = position
+        else:
+            rank = standings[-1].rank
+        standings.append(Standing(rank, interface_id, points))
+    return standings
+
+
+leaderboard = Leaderboard()
+
+
+@receiver(points_changed)
+def mark_leaderboard_changed(sender, interface_ids, **kwargs):
+    # Only once the new balances are committed, so that neither another
+    # thread reads the old ones and drops the mark, nor rolled back ones
+    # end up in the ranking
+    interface_ids = list(interface_ids)
+    transaction.on_commit(lambda: leaderboard.mark_changed(interface_ids))
+
+
+@receiver(post_delete, sender=GamificationInterface)
+def remove_from_leaderboard(sender, instance, **kwargs):
+    interface_id = instance.pk
+    transaction.on_commit(lambda: leaderboard.mark_changed([interface_id]))
@@ -0,0 +1,32 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from django_gamification.conf import gamification_settings
+from django_gamification.models import PointChange
+
+
+class Command(BaseCommand):
+    """
+    Folds the PointChanges older than the horizon into one checkpoint
+    PointChange per interface. Balances are preserved exactly and the command
+    can be interrupted and run again at any time.
+    """
+    help = 'Fold old PointChanges into one checkpoint per interface.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            default=gamification_settings.LEDGER_HORIZON_DAYS,
+            help='Fold PointChanges older than this many days.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of interfaces to process per transaction.')
+
+    def handle(self, *args, **options):
+        before = timezone.now() - datetime.timedelta(days=options['days'])
+        removed = PointChange.objects.compact(
+            before, batch_size=options['batch_size'])
+        self.stdout.write('Removed {} PointChanges older than {}.'.format(
+            removed, before.isoformat()))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from django_gamification.export import EXPORTS, FORMATS, export
+
+
+class Command(BaseCommand):
+    """
+    Streams the interfaces, point changes, badges or unlockables of all (or
+    some) interfaces as NDJSON or CSV, with constant memory use.
+    """
+    help = 'Export gamification data as NDJSON or CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(EXPORTS))
+        parser.add_argument(
+            '--format', choices=FORMATS, default='ndjson',
+            help='Output format.')
+        parser.add_argument(
+            '--interface', type=int, action='append', dest='interfaces',
+            help='Only export the data of this interface, can be repeated.')
+        parser.add_argument(
+            '--output',
+            help='File to write to instead of standard output.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Number of rows fetched from the database at a time.')
+
+    def handle(self, *args, **options):
+        chunks = export(options['kind'], format=options['format'],
+                        interfaces=options['interfaces'],
+                        chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='') as f:
+                f.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+
+from django_gamification.export import FORMATS
+from django_gamification.importer import import_data, reconcile
+
+
+class Command(BaseCommand):
+    """
+    Imports interfaces, point changes and badge states from NDJSON or CSV
+    files, such as the ones written by export_gamification, with bulk
+    writes that bypass the per-row signals. Badges and unlockables of all
+    interfaces are reconciled with their progress and points afterwards.
+    """
+    help = 'Import gamification data from NDJSON or CSV files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interfaces',
+            help='File of interfaces, with an id column.')
+        parser.add_argument(
+            '--point-changes',
+            help='File of point changes, with interface, amount and '
+                 'optionally time and checkpoint columns.')
+        parser.add_argument(
+            '--badges',
+            help='File of badge states, with interface, badge_definition '
+                 'and optionally acquired, revoked and progress columns.')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Format of the files, by default csv for files ending in '
+                 '.csv and ndjson otherwise.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of rows to write per transaction.')
+        parser.add_argument(
+            '--no-reconcile', action='store_false', dest='reconcile',
+            help='Do not reconcile badges and unlockables afterwards.')
+
+    def handle(self, *args, **options):
+        for kind in ('interfaces', 'point_changes', 'badges'):
+            path = options[kind]
+            if not path:
+                continue
+            file_format = options['format'] or (
+                'csv' if path.endswith('.csv') else 'ndjson')
+            with open(path, newline='') as f:
+                result = import_data(kind, f, format=file_format,
+                                     batch_size=options['batch_size'])
+            if kind == 'interfaces':
+                result = len(result)
+            self.stdout.write('Imported {} {}.'.format(
+                result, kind.replace('_', ' ')))
+
+        if options['reconcile']:
+            reconcile(batch_size=options['batch_size'])
+            self.stdout.write('Reconciled badges and unlockables.')
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from django_gamification.events import OutboxQueue
+
+
+class Command(BaseCommand):
+    """
+    Drains the GamificationEvents stored by the OutboxQueue in batches,
+    coalescing the events of each interface into one PointChange and one
+    progression update per badge. Several workers can run at once on
+    databases that support SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    help = 'Process the gamification events stored in the outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of events to process per transaction.')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once the outbox is empty instead of waiting for '
+                 'new events.')
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Seconds to wait when the outbox is empty.')
+
+    def handle(self, *args, **options):
+        queue = OutboxQueue()
+        processed = 0
+        while True:
+            count = queue.drain(batch_size=options['batch_size'])
+            processed += count
+            if count:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
+        self.stdout.write('Processed {} events.'.format(processed))
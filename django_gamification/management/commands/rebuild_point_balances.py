@@ -0,0 +1,88 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import BigIntegerField, F, OuterRef, Subquery, Sum, \
+    Value
+from django.db.models.functions import Coalesce
+
+from django_gamification.models import GamificationInterface, \
+    PointChange, Unlockable, points_changed
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds GamificationInterface.points_balance from the PointChange ledger
+    and unlocks the unlockables covered by the rebuilt balances that are not
+    acquired yet.
+
+    With --verify the balances are only compared against the ledger and any
+    interfaces that are out of sync are reported, nothing is written.
+    """
+    help = 'Rebuild (or verify) the denormalized points balance of every ' \
+           'GamificationInterface from its PointChanges.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true', default=False,
+            help='Only report interfaces whose balance does not match the '
+                 'ledger.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of interfaces to process per transaction.')
+
+    def handle(self, *args, **options):
+        ledger_total = Coalesce(
+            Subquery(
+                PointChange.objects.filter(
+                    interface=OuterRef('pk')
+                ).order_by().values('interface').annotate(
+                    total=Sum('amount')
+                ).values('total'),
+                output_field=BigIntegerField()
+            ),
+            Value(0)
+        )
+        batch_size = options['batch_size']
+        checked = mismatched = 0
+
+        last_pk = 0
+        while True:
+            batch = list(GamificationInterface.objects.filter(
+                pk__gt=last_pk
+            ).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1]
+
+            stale = GamificationInterface.objects.filter(
+                pk__in=batch
+            ).annotate(
+                ledger_total=ledger_total
+            ).exclude(
+                points_balance=F('ledger_total')
+            ).values_list('pk', 'points_balance', 'ledger_total')
+
+            checked += len(batch)
+            stale_pks = []
+            for pk, balance, total in stale:
+                stale_pks.append(pk)
+                self.stdout.write(
+                    'Interface {}: balance {} != ledger {}'.format(
+                        pk, balance, total))
+            mismatched += len(stale_pks)
+
+            if stale_pks and not options['verify']:
+                with transaction.atomic():
+                    GamificationInterface.objects.filter(
+                        pk__in=stale_pks
+                    ).update(points_balance=ledger_total)
+                    points_changed.send(sender=GamificationInterface,
+                                        interface_ids=stale_pks)
+            if not options['verify']:
+                Unlockable.objects.unlock_reached(batch)
+
+        if options['verify']:
+            self.stdout.write('Checked {} interfaces, {} out of sync.'.format(
+                checked, mismatched))
+        else:
+            self.stdout.write('Rebuilt {} interfaces, {} were out of sync.'
+                              .format(checked, mismatched))
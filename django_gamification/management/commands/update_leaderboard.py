@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from django_gamification.leaderboard import leaderboard
+
+
+class Command(BaseCommand):
+    """
+    Saves the current ranking of all interfaces to the LeaderboardSnapshot
+    table. Run it periodically so that loading the leaderboard only has to
+    apply the balances that changed since the last snapshot.
+    """
+    help = 'Save a snapshot of the leaderboard.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of snapshot rows per INSERT.')
+
+    def handle(self, *args, **options):
+        count = leaderboard.save_snapshot(batch_size=options['batch_size'])
+        self.stdout.write('Saved leaderboard snapshot of {} interfaces.'
+                          .format(count))
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:08
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_points_balance(apps, schema_editor):
+    GamificationInterface = apps.get_model('django_gamification',
+                                           'GamificationInterface')
+    PointChange = apps.get_model('django_gamification', 'PointChange')
+
+    GamificationInterface.objects.update(points_balance=Coalesce(
+        Subquery(
+            PointChange.objects.filter(
+                interface=OuterRef('pk')
+            ).order_by().values('interface').annotate(
+                total=Sum('amount')
+            ).values('total'),
+            output_field=models.BigIntegerField()
+        ),
+        Value(0)
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_gamification', '0013_auto_20180324_0605'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamificationinterface',
+            name='points_balance',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_points_balance,
+                             migrations.RunPython.noop),
+    ]
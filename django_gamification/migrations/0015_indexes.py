@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:13
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def duplicates(model, alias, field):
+    # (interface, field) pairs that more than one row of model has
+    return model._default_manager.using(alias).values(
+        'interface', field
+    ).annotate(count=Count('pk')).filter(count__gt=1).values_list(
+        'interface', field)
+
+
+def remove_duplicates(apps, schema_editor):
+    # create_badge and create_unlockable used to allow several badges or
+    # unlockables of one definition per interface, keep the most advanced
+    alias = schema_editor.connection.alias
+    Badge = apps.get_model('django_gamification', 'Badge')
+    Progression = apps.get_model('django_gamification', 'Progression')
+    Unlockable = apps.get_model('django_gamification', 'Unlockable')
+
+    badges = Badge._default_manager.using(alias)
+    for interface_id, definition_id in duplicates(Badge, alias,
+                                                  'badge_definition'):
+        rows = list(badges.filter(
+            interface_id=interface_id, badge_definition_id=definition_id
+        ).order_by(
+            '-acquired', 'revoked', '-progression__progress', 'pk'
+        ).values_list('pk', 'progression_id'))
+        keep = rows[0][0]
+        removed = [pk for pk, progression_id in rows[1:]]
+        # next_badge cascades, point the badges leading here to the kept one
+        badges.filter(next_badge__in=removed).update(next_badge=keep)
+        badges.filter(pk__in=removed).delete()
+        Progression._default_manager.using(alias).filter(
+            pk__in=[progression_id for pk, progression_id in rows[1:]
+                    if progression_id not in (None, rows[0][1])]
+        ).delete()
+
+    unlockables = Unlockable._default_manager.using(alias)
+    for interface_id, definition_id in duplicates(Unlockable, alias,
+                                                  'unlockable_definition'):
+        rows = list(unlockables.filter(
+            interface_id=interface_id, unlockable_definition_id=definition_id
+        ).order_by('-acquired', 'pk').values_list('pk', flat=True))
+        unlockables.filter(pk__in=rows[1:]).delete()
+
+
+class Migration(migrations.Migration):
+
+    # The duplicates are removed in their own transaction, PostgreSQL does
+    # not alter tables with pending deferred foreign key checks
+    atomic = False
+
+    dependencies = [
+        ('django_gamification', '0014_gamificationinterface_points_balance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='badge',
+            index=models.Index(condition=models.Q(('acquired', True), ('revoked', False)), fields=['interface'], name='badge_acquired'),
+        ),
+        migrations.AddIndex(
+            model_name='pointchange',
+            index=models.Index(fields=['interface', 'time'], name='pointchange_interface_time'),
+        ),
+        migrations.AddIndex(
+            model_name='unlockable',
+            index=models.Index(condition=models.Q(('acquired', False)), fields=['interface', 'points_required'], name='unlockable_pending'),
+        ),
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop,
+                             atomic=True),
+        migrations.AddConstraint(
+            model_name='badge',
+            constraint=models.UniqueConstraint(fields=('interface', 'badge_definition'), name='badge_interface_definition'),
+        ),
+        migrations.AddConstraint(
+            model_name='unlockable',
+            constraint=models.UniqueConstraint(fields=('interface', 'unlockable_definition'), name='unlockable_interface_definition'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_gamification', '0015_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardSnapshot',
+            fields=[
+                ('interface', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='django_gamification.gamificationinterface')),
+                ('points', models.BigIntegerField()),
+                ('rank', models.PositiveIntegerField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_gamification', '0016_leaderboardsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PointRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=5)),
+                ('start', models.DateField()),
+                ('points', models.BigIntegerField(default=0)),
+                ('interface', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='django_gamification.gamificationinterface')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'start', '-points'], name='pointrollup_bucket_points')],
+                'constraints': [models.UniqueConstraint(fields=('period', 'start', 'interface'), name='pointrollup_bucket_interface')],
+            },
+        ),
+    ]
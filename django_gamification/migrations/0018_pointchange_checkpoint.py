@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_gamification', '0017_pointrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pointchange',
+            name='checkpoint',
+            field=models.BooleanField(default=False),
+        ),
+    ]
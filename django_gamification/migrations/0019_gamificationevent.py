@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_gamification', '0018_pointchange_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GamificationEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(max_length=128)),
+                ('amount', models.BigIntegerField(default=0)),
+                ('progress', models.IntegerField(default=0)),
+                ('time', models.DateTimeField(auto_now_add=True)),
+                ('badge_definition', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='django_gamification.badgedefinition')),
+                ('interface', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='django_gamification.gamificationinterface')),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_gamification', '0019_gamificationevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='badgedefinition',
+            name='trigger',
+            field=models.CharField(blank=True, max_length=128, null=True),
+        ),
+        migrations.AddField(
+            model_name='badgedefinition',
+            name='trigger_predicate',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='gamificationevent',
+            name='data',
+            field=models.JSONField(null=True),
+        ),
+    ]
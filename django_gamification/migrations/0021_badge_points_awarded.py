@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+def mark_awarded(apps, schema_editor):
+    # Badges that are held were awarded their points before the flag existed
+    Badge = apps.get_model('django_gamification', 'Badge')
+    Badge.default_objects.using(schema_editor.connection.alias).filter(
+        acquired=True, revoked=False
+    ).update(points_awarded=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_gamification', '0020_badgedefinition_trigger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='badge',
+            name='points_awarded',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_awarded, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:20
+
+from django.db import migrations
+from django.db.models import F
+
+
+def unlock_covered(apps, schema_editor):
+    # New point changes only unlock what they cross, so unlockables that
+    # the balance already covers but that were stored locked, e.g. by
+    # create_unlockable or reset, are unlocked once here
+    Unlockable = apps.get_model('django_gamification', 'Unlockable')
+    Unlockable.default_objects.using(schema_editor.connection.alias).filter(
+        acquired=False,
+        points_required__lte=F('interface__points_balance')
+    ).update(acquired=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_gamification', '0021_badge_points_awarded'),
+    ]
+
+    operations = [
+        migrations.RunPython(unlock_covered, migrations.RunPython.noop),
+    ]
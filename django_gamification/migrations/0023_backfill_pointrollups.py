@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:35
+
+import datetime
+from collections import defaultdict
+
+from django.db import migrations
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def buckets(time):
+    # Frozen copy of PointRollup.buckets
+    if timezone.is_aware(time):
+        time = timezone.localtime(time, timezone.get_default_timezone())
+    day = time.date()
+    return [('day', day),
+            ('week', day - datetime.timedelta(days=day.weekday())),
+            ('month', day.replace(day=1))]
+
+
+def backfill_rollups(apps, schema_editor):
+    # Rollups were only kept from 0017 on, rebuild them from the whole
+    # ledger so windows include older points and deleting older point
+    # changes does not leave negative buckets. Checkpoints hold the total of
+    # changes whose buckets are already kept.
+    alias = schema_editor.connection.alias
+    GamificationInterface = apps.get_model('django_gamification',
+                                           'GamificationInterface')
+    PointChange = apps.get_model('django_gamification', 'PointChange')
+    PointRollup = apps.get_model('django_gamification', 'PointRollup')
+
+    PointRollup.objects.using(alias).all().delete()
+    interface_ids = GamificationInterface.objects.using(alias).order_by(
+        'pk').values_list('pk', flat=True)
+    last_pk = 0
+    while True:
+        batch = list(interface_ids.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1]
+
+        totals = defaultdict(int)
+        for interface_id, time, amount in PointChange.objects.using(
+            alias
+        ).filter(
+            interface_id__in=batch, checkpoint=False
+        ).values_list('interface_id', 'time', 'amount').iterator(
+                                                    chunk_size=BATCH_SIZE):
+            for period, start in buckets(time):
+                totals[(period, start, interface_id)] += amount
+
+        PointRollup.objects.using(alias).bulk_create([
+            PointRollup(period=period, start=start, interface_id=interface_id,
+                        points=points)
+            for (period, start, interface_id), points in totals.items()
+        ], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_gamification', '0022_unlock_covered_unlockables'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
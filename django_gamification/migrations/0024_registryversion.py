@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+def create_version(apps, schema_editor):
+    RegistryVersion = apps.get_model('django_gamification', 'RegistryVersion')
+    RegistryVersion._default_manager.using(
+        schema_editor.connection.alias).create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_gamification', '0023_backfill_pointrollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistryVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
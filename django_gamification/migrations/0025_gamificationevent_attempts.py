@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_gamification', '0024_registryversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamificationevent',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
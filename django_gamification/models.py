@@ -1,5 +1,151 @@
-from django.db import models
-from django.db.models import Sum
+import datetime
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connections, models, router, \
+    transaction
+from django.db.models import Case, Count, F, Max, OuterRef, Q, Subquery, \
+    Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.dispatch import Signal
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from django_gamification.conf import gamification_settings
+from django_gamification.registry import definition_registry
+from django_gamification.utils import BULK_BATCH_SIZE, chunked
+
+# Sent with the primary keys of the interfaces whose points_balance has been
+# changed by any of the write paths below, inside their transaction.
+points_changed = Signal()
+
+# Sent with the primary keys of the interfaces whose badges, progressions or
+# unlockables have been changed by a write path that bypasses post_save.
+interface_changed = Signal()
+
+# Sent when a BadgeDefinition or UnlockableDefinition has been saved and the
+# badges or unlockables made from it have been updated.
+definitions_changed = Signal()
+
+
+class GamificationInterfaceManager(models.Manager):
+    """
+
+    """
+    def provision_bulk(self, count, batch_size=BULK_BATCH_SIZE):
+        """
+        Creates count new interfaces together with their Badges,
+        Progressions and Unlockables using bulk inserts.
+
+        bulk_create does not send post_save, so this is the supported way of
+        creating many interfaces at once without leaving them without the
+        objects the signal would have made.
+
+        In lazy mode only the interfaces are created.
+
+        :param count: number of interfaces to create
+        :param batch_size: number of interfaces created per transaction
+        :return: list of the new GamificationInterface objects
+        """
+        if gamification_settings.LAZY:
+            badge_definitions = unlockable_definitions = []
+        else:
+            # Not from the definition registry, which may not know the
+            # definitions created by other processes yet
+            badge_definitions = list(BadgeDefinition.objects.db_manager(
+                                                self.db).order_by('pk'))
+            unlockable_definitions = list(
+                UnlockableDefinition.objects.db_manager(self.db).order_by('pk'))
+
+        interfaces = []
+        for batch in chunked(range(count), batch_size):
+            with transaction.atomic(using=self.db):
+                new = [self.model() for i in batch]
+                _bulk_create_with_pks(self.model, new, self.db)
+                Badge.objects.db_manager(self.db).create_badges(
+                    badge_definitions, new, batch_size=batch_size)
+                Unlockable.objects.db_manager(self.db).create_unlockables(
+                    unlockable_definitions, new, batch_size=batch_size)
+            interfaces.extend(new)
+        return interfaces
+
+    def reset_many(self, interfaces, batch_size=BULK_BATCH_SIZE):
+        """
+        Resets the points, badges and unlockable items of many interfaces,
+        e.g. at the end of a season.
+
+        Every chunk of batch_size interfaces is reset with a fixed number of
+        set-based queries in its own transaction, so locks are only held for
+        one chunk at a time.
+
+        :param interfaces: queryset or iterable of GamificationInterface
+            objects or their primary keys
+        :param batch_size: number of interfaces reset per transaction
+        :return:
+        """
+        if isinstance(interfaces, models.QuerySet):
+            interfaces = interfaces.values_list('pk', flat=True).iterator(
+                                                        chunk_size=batch_size)
+
+        for batch in chunked(interfaces, batch_size):
+            interface_ids = [getattr(interface, 'pk', interface)
+                             for interface in batch]
+
+            with transaction.atomic(using=self.db):
+                # Delete all points
+                PointChange.objects.filter(
+                    interface_id__in=interface_ids
+                ).delete(update_balances=False)
+                PointRollup.objects.filter(
+                    interface_id__in=interface_ids
+                ).delete()
+                self.filter(pk__in=interface_ids).update(points_balance=0)
+
+                # All unlockable objects become not acquired, apart from
+                # the ones that do not require any points
+                Unlockable.objects.filter(
+                    interface_id__in=interface_ids
+                ).update(
+                    acquired=Q(points_required__lte=0)
+                )
+
+                # All badges become not acquired and their progress is set
+                # to 0
+                Progression.objects.filter(
+                    badge__interface_id__in=interface_ids
+                ).update(progress=0)
+                Badge.objects.filter(
+                    interface_id__in=interface_ids
+                ).update(acquired=False, points_awarded=False)
+
+                points_changed.send(sender=self.model,
+                                    interface_ids=interface_ids)
+                interface_changed.send(sender=self.model,
+                                       interface_ids=interface_ids)
+
+    async def areset_many(self, interfaces, batch_size=BULK_BATCH_SIZE):
+        """
+        Async version of reset_many, run in one hop to the sync thread.
+        """
+        await sync_to_async(self.reset_many)(interfaces, batch_size=batch_size)
+
+    async def apoints_many(self, interfaces):
+        """
+        Returns the points of many interfaces with a single query.
+
+        :param interfaces: iterable of GamificationInterface objects or their
+            primary keys
+        :return: dict of {interface_id: points}
+        """
+        interface_ids = [getattr(interface, 'pk', interface)
+                         for interface in interfaces]
+        return {
+            interface_id: points
+            async for interface_id, points in self.filter(
+                pk__in=interface_ids
+            ).values_list('pk', 'points_balance')
+        }
 
 
 class GamificationInterface(models.Model):
@@ -10,10 +156,29 @@ class GamificationInterface(models.Model):
     game_tracking = ForeignKey(GamificationInterface)
     """
 
+    # Running total of all PointChange amounts for this interface. It is kept
+    # in sync by PointChange.save, PointChange.delete and
+    # PointChangeQuerySet.delete so that reading the balance never needs to
+    # aggregate over the ledger. See the rebuild_point_balances command.
+    points_balance = models.BigIntegerField(default=0)
+
+    objects = GamificationInterfaceManager()
+
     @property
     def points(self):
-        return PointChange.objects.filter(interface=self).aggregate(
-                                            Sum('amount'))['amount__sum'] or 0
+        if self.pk is None:
+            return self.points_balance
+        return GamificationInterface.objects.filter(pk=self.pk).values_list(
+                                            'points_balance', flat=True).get()
+
+    async def apoints(self):
+        """
+        Async version of points.
+        """
+        if self.pk is None:
+            return self.points_balance
+        return await GamificationInterface.objects.filter(
+            pk=self.pk).values_list('points_balance', flat=True).aget()
 
     def reset(self):
         """
@@ -23,20 +188,15 @@ class GamificationInterface(models.Model):
         :return:
         """
 
-        # Delete all points
-        self.pointchange_set.all().delete()
-
-        # All unlockable objects become not acquired
-        self.unlockable_set.all().update(acquired=False)
+        GamificationInterface.objects.reset_many([self])
+        self.points_balance = 0
 
-        # All badges become not acquired and their progress is set to 0
-        for badge in self.badge_set.all():
-            progression = badge.progression
-            if progression is not None:
-                progression.progress = 0
-                progression.save()
-            badge.acquired = False
-            badge.save()
+    async def areset(self):
+        """
+        Async version of reset.
+        """
+        await GamificationInterface.objects.areset_many([self])
+        self.points_balance = 0
 
 
 class Category(models.Model):
@@ -60,10 +220,24 @@ class BadgeDefinition(models.Model):
     next_badge = models.ForeignKey('self', null=True, on_delete=models.CASCADE)
     category = models.ForeignKey(Category, null=True, on_delete=models.CASCADE)
     points = models.BigIntegerField(null=True, blank=True)
+    # Name of the event (see events.emit) that progresses the badge by one,
+    # or awards it when there is no progression_target. Only events for
+    # which the callable at the dotted path trigger_predicate, if set,
+    # returns True count. See rules.RuleEngine.
+    trigger = models.CharField(max_length=128, null=True, blank=True)
+    trigger_predicate = models.CharField(max_length=255, null=True,
+                                         blank=True)
 
     def __str__(self):
         return self.name
 
+    def clean(self):
+        if self.trigger_predicate:
+            try:
+                import_string(self.trigger_predicate)
+            except ImportError as e:
+                raise ValidationError({'trigger_predicate': str(e)})
+
     def save(self, *args, **kwargs):
         """
         We made this method expensive as it is likely to be used very rarely
@@ -84,36 +258,108 @@ class BadgeDefinition(models.Model):
             super(BadgeDefinition, self).save(*args, **kwargs)
 
             # Create Badges for all GamificationInterfaces
-            for interface in GamificationInterface.objects.all():
-                Badge.objects.create_badge(self, interface)
+            if not gamification_settings.LAZY:
+                Badge.objects.create_badges(
+                    [self],
+                    GamificationInterface.objects.values_list(
+                        'pk', flat=True).iterator(chunk_size=BULK_BATCH_SIZE)
+                )
 
         else:
             super(BadgeDefinition, self).save(*args, **kwargs)
 
             # Update all Badges that use this definition
-            # unfortunately we need to loop rather than using .update because
-            # we need to update all the Progression objects as well
-            for badge in Badge.objects.filter(badge_definition=self):
-                badge.name = self.name
-                badge.description = self.description
-
-                if badge.progression:
-                    if self.progression_target is None:
-                        temp = badge.progression
-                        badge.progression = None
-                        temp.delete()
-                    else:
-                        badge.progression.target = self.progression_target
-                        badge.progression.save()
-                if self.next_badge:
-                    badge.next_badge = Badge.objects.filter(
-                        interface=badge.interface,
-                        badge_definition=self.next_badge
-                    ).first()
-
-                badge.category = self.category
-                badge.points = self.points
-                badge.save()
+            with transaction.atomic():
+                badges = Badge.objects.filter(badge_definition=self)
+
+                if self.progression_target is None:
+                    progression_ids = badges.exclude(
+                        progression=None
+                    ).values_list('progression', flat=True)
+                    for chunk in chunked(list(progression_ids),
+                                         BULK_BATCH_SIZE):
+                        Badge.objects.filter(
+                            progression_id__in=chunk
+                        ).update(progression=None)
+                        Progression.objects.filter(pk__in=chunk).delete()
+                else:
+                    Progression.objects.filter(
+                        badge__badge_definition=self
+                    ).update(target=self.progression_target)
+
+                if self.next_badge_id is None:
+                    next_badge = None
+                else:
+                    next_badge = Subquery(
+                        Badge.objects.filter(
+                            interface=OuterRef('interface'),
+                            badge_definition_id=self.next_badge_id
+                        ).values('pk')[:1]
+                    )
+
+                badges.update(
+                    name=self.name,
+                    description=self.description,
+                    category=self.category,
+                    points=self.points,
+                    next_badge=next_badge
+                )
+
+        definition_registry.invalidate()
+        definitions_changed.send(sender=BadgeDefinition)
+
+
+def _bulk_create_with_pks(model, objs, using):
+    """
+    Inserts objs with bulk_create when the database hands back the new
+    primary keys, falling back to one INSERT per object when it does not.
+    """
+    if connections[using].features.can_return_rows_from_bulk_insert:
+        model._default_manager.using(using).bulk_create(
+            objs, batch_size=BULK_BATCH_SIZE)
+    else:
+        for obj in objs:
+            obj.save(using=using)
+
+
+def _can_update_returning(connection):
+    """
+    Whether the database supports UPDATE ... RETURNING, which Django has no
+    feature flag for: PostgreSQL and SQLite from 3.35 on.
+    """
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return False
+
+
+def _add_to_balance(interface_id, delta, using):
+    """
+    Adds delta to an interface's points_balance in the database using and
+    returns the new balance, or None if the interface does not exist.
+    Databases that support UPDATE ... RETURNING do both in one statement.
+    """
+    connection = connections[using]
+    if _can_update_returning(connection):
+        opts = GamificationInterface._meta
+        balance = connection.ops.quote_name(
+            opts.get_field('points_balance').column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE {table} SET {balance} = {balance} + %s '
+                'WHERE {pk} = %s RETURNING {balance}'.format(
+                    table=connection.ops.quote_name(opts.db_table),
+                    balance=balance,
+                    pk=connection.ops.quote_name(opts.pk.column)),
+                [delta, interface_id])
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    interfaces = GamificationInterface.objects.using(using).filter(
+                                                            pk=interface_id)
+    interfaces.update(points_balance=F('points_balance') + delta)
+    return interfaces.values_list('points_balance', flat=True).first()
 
 
 class Progression(models.Model):
@@ -123,21 +369,410 @@ class Progression(models.Model):
     progress = models.IntegerField(default=0, null=False, blank=False)
     target = models.IntegerField(null=False, blank=False)
 
-    def increment(self):
-        self.progress += 1
+    def save(self, *args, **kwargs):
+        super(Progression, self).save(*args, **kwargs)
+        self._incremented = False
+
+    def increment(self, by=1):
+        self.progress += by
+        self._incremented = True
 
     @property
     def finished(self):
         return self.progress >= self.target
 
 
-class PointChange(models.Model):
+class PointChangeQuerySet(models.QuerySet):
+    """
+
+    """
+    def delete(self, update_balances=True):
+        """
+        Deletes the PointChanges and removes their amounts from the
+        points_balance and the PointRollups of the interfaces they belong to.
+
+        :param update_balances: False when the caller takes care of the
+            balances itself, e.g. when resetting them to 0
+        :return: the same as QuerySet.delete
+        """
+        if not update_balances:
+            return super(PointChangeQuerySet, self).delete()
+
+        with transaction.atomic():
+            daily_totals = self.order_by().values_list(
+                'interface',
+                TruncDate('time', tzinfo=timezone.get_default_timezone()),
+                'checkpoint'
+            ).annotate(total=Sum('amount'))
+
+            totals = defaultdict(int)
+            for interface_id, day, checkpoint, total in daily_totals:
+                totals[interface_id] += total
+            for interface_id, total in totals.items():
+                GamificationInterface.objects.filter(
+                    pk=interface_id
+                ).update(
+                    points_balance=F('points_balance') - total
+                )
+            # Checkpoints hold totals of older changes that the rollups
+            # still count in the buckets of those changes
+            PointRollup.objects.add(
+                (interface_id, day, -total)
+                for interface_id, day, checkpoint, total in daily_totals
+                if not checkpoint)
+
+            deleted = super(PointChangeQuerySet, self).delete()
+            points_changed.send(sender=GamificationInterface,
+                                interface_ids=list(totals))
+            return deleted
+
+
+class PointChangeManager(models.Manager):
+    """
+
     """
+    def get_queryset(self):
+        return PointChangeQuerySet(self.model, using=self._db)
+
+    def award_bulk(self, awards, batch_size=BULK_BATCH_SIZE):
+        """
+        Awards points to many interfaces at once without going through
+        PointChange.save and the post_save signals for every row.
+
+        Each batch inserts its PointChanges with bulk_create, applies the
+        per-interface totals to points_balance with one UPDATE per distinct
+        total and unlocks the Unlockables of all affected interfaces with a
+        single UPDATE, all in one transaction.
+
+        :param awards: iterable of (interface, amount) pairs, where interface
+            is a GamificationInterface object or its primary key
+        :param batch_size: number of awards handled per transaction
+        :return: number of PointChange objects created
+        """
+        created = 0
+        for batch in chunked(awards, batch_size):
+            changes = []
+            totals = defaultdict(int)
+            for interface, amount in batch:
+                interface_id = getattr(interface, 'pk', interface)
+                changes.append(PointChange(interface_id=interface_id,
+                                           amount=amount))
+                totals[interface_id] += amount
+
+            # Campaigns tend to give everybody the same amount, so group the
+            # interfaces by total to keep the number of UPDATEs small
+            interfaces_by_total = defaultdict(list)
+            for interface_id, total in totals.items():
+                if total:
+                    interfaces_by_total[total].append(interface_id)
+
+            with transaction.atomic(using=self.db):
+                self.bulk_create(changes, batch_size=batch_size)
+                PointRollup.objects.db_manager(self.db).add(
+                    (change.interface_id, change.time, change.amount)
+                    for change in changes)
+                for total, interface_ids in interfaces_by_total.items():
+                    GamificationInterface.objects.filter(
+                        pk__in=interface_ids
+                    ).update(
+                        points_balance=F('points_balance') + total
+                    )
+
+                gained = [interface_id
+                          for total, interface_ids in interfaces_by_total.items()
+                          if total > 0 for interface_id in interface_ids]
+                if gained:
+                    Unlockable.objects.db_manager(self.db).unlock_reached(
+                                                                    gained)
+
+                points_changed.send(sender=GamificationInterface,
+                                    interface_ids=list(totals))
+            created += len(changes)
+        return created
+
+    async def aaward_bulk(self, awards, batch_size=BULK_BATCH_SIZE):
+        """
+        Async version of award_bulk. awards may also be an async iterable,
+        which is collected in batches of batch_size, each awarded in one hop
+        to the sync thread.
+
+        :return: number of PointChange objects created
+        """
+        award_bulk = sync_to_async(self.award_bulk)
+        if not hasattr(awards, '__aiter__'):
+            return await award_bulk(awards, batch_size=batch_size)
+
+        created = 0
+        batch = []
+        async for award in awards:
+            batch.append(award)
+            if len(batch) == batch_size:
+                created += await award_bulk(batch, batch_size=batch_size)
+                batch = []
+        if batch:
+            created += await award_bulk(batch, batch_size=batch_size)
+        return created
+
+    def compact(self, before, batch_size=BULK_BATCH_SIZE):
+        """
+        Folds the PointChanges of every interface that are older than before
+        into a single checkpoint PointChange, the newest of them, holding
+        their total. Balances are left untouched as the total does not
+        change, and the PointRollups keep the history per period.
+
+        Interfaces are handled in chunks of batch_size, each in its own
+        transaction with a fixed number of queries, so this can be run
+        repeatedly on a live database.
+
+        :param before: datetime, PointChanges older than this are folded
+        :param batch_size: number of interfaces handled per transaction
+        :return: number of PointChange objects removed
+        """
+        removed = 0
+        last_pk = None
+        while True:
+            interfaces = GamificationInterface.objects.order_by('pk')
+            if last_pk is not None:
+                interfaces = interfaces.filter(pk__gt=last_pk)
+            interface_ids = list(interfaces.values_list(
+                                            'pk', flat=True)[:batch_size])
+            if not interface_ids:
+                return removed
+            last_pk = interface_ids[-1]
+
+            with transaction.atomic(using=self.db):
+                old = self.filter(interface_id__in=interface_ids,
+                                  time__lt=before)
+                checkpoints = list(old.order_by().values(
+                    'interface'
+                ).annotate(
+                    keep=Max('pk'), total=Sum('amount'), count=Count('pk')
+                ).filter(count__gt=1).values_list(
+                    'interface', 'keep', 'total'))
+                if not checkpoints:
+                    continue
+
+                keep = [pk for interface_id, pk, total in checkpoints]
+                self.filter(pk__in=keep).update(
+                    amount=Case(*[When(pk=pk, then=Value(total))
+                                  for interface_id, pk, total in checkpoints]),
+                    checkpoint=True
+                )
+                deleted, rows = old.filter(
+                    interface_id__in=[interface_id for interface_id, pk, total
+                                      in checkpoints]
+                ).exclude(pk__in=keep).delete(update_balances=False)
+                removed += deleted
+                # The point history of the interfaces changed, even though
+                # their balances did not
+                interface_changed.send(
+                    sender=GamificationInterface,
+                    interface_ids=[interface_id for interface_id, pk, total
+                                   in checkpoints])
+
 
+class PointChange(models.Model):
+    """
+    A change to an interface's points. Saving or deleting one keeps the
+    interface's points_balance and PointRollups in sync. Checkpoints are
+    left out of the PointRollups, which already count the changes folded
+    into them.
     """
     amount = models.BigIntegerField(null=False, blank=False)
     interface = models.ForeignKey(GamificationInterface, on_delete=models.CASCADE)
     time = models.DateTimeField(auto_now_add=True)
+    # Set on PointChanges that hold the total of older ones folded into it
+    # by PointChange.objects.compact
+    checkpoint = models.BooleanField(default=False)
+
+    objects = PointChangeManager()
+
+    class Meta:
+        indexes = [
+            # Point history of an interface
+            models.Index(fields=['interface', 'time'],
+                         name='pointchange_interface_time'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the PointChange and applies the change in amount to the
+        interface's points_balance in the same transaction, before any
+        post_save receivers run. The new balance is kept on the instance for
+        them as _points_balance.
+
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        using = kwargs.get('using') or router.db_for_write(PointChange,
+                                                           instance=self)
+        with transaction.atomic(using=using):
+            previous = None
+            if self.pk is not None:
+                previous = PointChange.objects.using(using).filter(
+                    pk=self.pk).values_list('interface_id', 'amount').first()
+
+            delta = self.amount
+            interface_ids = [self.interface_id]
+            if previous is not None:
+                previous_interface_id, previous_amount = previous
+                if previous_interface_id == self.interface_id:
+                    delta -= previous_amount
+                else:
+                    # Moved to another interface, which gets the whole
+                    # amount, while the previous one loses what it had
+                    GamificationInterface.objects.using(using).filter(
+                        pk=previous_interface_id
+                    ).update(
+                        points_balance=F('points_balance') - previous_amount
+                    )
+                    if not self.checkpoint:
+                        PointRollup.objects.db_manager(using).add(
+                            [(previous_interface_id, self.time,
+                              -previous_amount)])
+                    interface_ids.append(previous_interface_id)
+
+            self._points_balance = None
+            if delta:
+                self._points_balance = _add_to_balance(
+                    self.interface_id, delta, using)
+            super(PointChange, self).save(*args, **kwargs)
+            if delta and not self.checkpoint:
+                PointRollup.objects.db_manager(using).add(
+                    [(self.interface_id, self.time, delta)])
+            if delta or len(interface_ids) > 1:
+                points_changed.send(sender=GamificationInterface,
+                                    interface_ids=interface_ids)
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(PointChange,
+                                                           instance=self)
+        with transaction.atomic(using=using):
+            GamificationInterface.objects.using(using).filter(
+                pk=self.interface_id
+            ).update(
+                points_balance=F('points_balance') - self.amount
+            )
+            if not self.checkpoint:
+                PointRollup.objects.db_manager(using).add(
+                    [(self.interface_id, self.time, -self.amount)])
+            points_changed.send(sender=GamificationInterface,
+                                interface_ids=[self.interface_id])
+            return super(PointChange, self).delete(*args, **kwargs)
+
+
+class PointRollupManager(models.Manager):
+    """
+
+    """
+    def add(self, changes):
+        """
+        Adds point changes to the day, week and month rollups they fall in.
+
+        Missing rollups are inserted with 0 points first, ignoring conflicts,
+        and then incremented with F expressions, so concurrent writers never
+        lose each other's changes. That is one INSERT and one UPDATE per
+        distinct amount, whatever the number of buckets.
+
+        :param changes: iterable of (interface_id, time, amount), where time
+            is a datetime or a date in the default time zone
+        :return:
+        """
+        totals = defaultdict(int)
+        for interface_id, time, amount in changes:
+            for period, start in PointRollup.buckets(time):
+                totals[(period, start, interface_id)] += amount
+
+        keys_by_total = defaultdict(list)
+        for key, total in totals.items():
+            if total:
+                keys_by_total[total].append(key)
+        if not keys_by_total:
+            return
+
+        self.bulk_create([
+            PointRollup(period=period, start=start, interface_id=interface_id)
+            for keys in keys_by_total.values()
+            for period, start, interface_id in keys
+        ], batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+
+        for total, keys in keys_by_total.items():
+            for chunk in chunked(keys, BULK_BATCH_SIZE):
+                interfaces_by_bucket = defaultdict(list)
+                for period, start, interface_id in chunk:
+                    interfaces_by_bucket[(period, start)].append(interface_id)
+
+                condition = Q()
+                for (period, start), interface_ids in \
+                        interfaces_by_bucket.items():
+                    condition |= Q(period=period, start=start,
+                                   interface_id__in=interface_ids)
+                self.filter(condition).update(points=F('points') + total)
+
+
+class PointRollup(models.Model):
+    """
+    Total points an interface gained in a day, week or month of the default
+    time zone (TIME_ZONE), used for time windowed leaderboards. Kept in sync
+    by the PointChange write paths.
+    """
+    DAY = 'day'
+    WEEK = 'week'
+    MONTH = 'month'
+    PERIOD_CHOICES = (
+        (DAY, 'Day'),
+        (WEEK, 'Week'),
+        (MONTH, 'Month'),
+    )
+
+    interface = models.ForeignKey(GamificationInterface, on_delete=models.CASCADE)
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    start = models.DateField()
+    points = models.BigIntegerField(default=0)
+
+    objects = PointRollupManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'start', 'interface'],
+                                    name='pointrollup_bucket_interface'),
+        ]
+        indexes = [
+            # Ranking the interfaces of a bucket
+            models.Index(fields=['period', 'start', '-points'],
+                         name='pointrollup_bucket_points'),
+        ]
+
+    @staticmethod
+    def bucket_start(period, time):
+        """
+        :param period: PointRollup.DAY, WEEK or MONTH
+        :param time: datetime or date in the default time zone
+        :return: first day of the bucket of period that time falls in
+        """
+        if isinstance(time, datetime.datetime):
+            # Not the active time zone, which may differ between requests
+            if timezone.is_aware(time):
+                time = timezone.localtime(time,
+                                          timezone.get_default_timezone())
+            time = time.date()
+        if period == PointRollup.DAY:
+            return time
+        if period == PointRollup.WEEK:
+            return time - datetime.timedelta(days=time.weekday())
+        if period == PointRollup.MONTH:
+            return time.replace(day=1)
+        raise ValueError('Unknown period {!r}'.format(period))
+
+    @staticmethod
+    def buckets(time):
+        """
+        :param time: datetime or date in the default time zone
+        :return: list of (period, start) of the buckets time falls in
+        """
+        return [(period, PointRollup.bucket_start(period, time))
+                for period, label in PointRollup.PERIOD_CHOICES]
 
 
 class BadgeManager(models.Manager):
@@ -173,6 +808,322 @@ class BadgeManager(models.Manager):
             badge.save()
         return badge
 
+    def create_badges(self, definitions, interfaces,
+                      batch_size=BULK_BATCH_SIZE):
+        """
+        Creates a badge for every combination of the given badge definitions
+        and gamification interfaces using bulk inserts.
+
+        The interfaces are consumed in chunks of batch_size, so an iterator
+        over millions of interfaces is fine. For each chunk the Progressions
+        and Badges are inserted with bulk_create and next_badge is filled in
+        with one UPDATE per definition that has a next badge.
+
+        :param definitions: iterable of BadgeDefinition objects
+        :param interfaces: iterable of GamificationInterface objects or their
+            primary keys
+        :param batch_size: number of interfaces handled per transaction
+        :return: number of Badge objects created
+        """
+        definitions = list(definitions)
+        if not definitions:
+            return 0
+
+        created = 0
+        for batch in chunked(interfaces, batch_size):
+            interface_ids = [getattr(interface, 'pk', interface)
+                             for interface in batch]
+
+            with transaction.atomic(using=self.db):
+                progressions = [
+                    Progression(target=definition.progression_target)
+                    for interface_id in interface_ids
+                    for definition in definitions
+                    if definition.progression_target
+                ]
+                _bulk_create_with_pks(Progression, progressions, self.db)
+                progressions = iter(progressions)
+
+                badges = [
+                    Badge(
+                        interface_id=interface_id,
+                        name=definition.name,
+                        description=definition.description,
+                        progression=next(progressions)
+                        if definition.progression_target else None,
+                        category_id=definition.category_id,
+                        points=definition.points,
+                        badge_definition=definition
+                    )
+                    for interface_id in interface_ids
+                    for definition in definitions
+                ]
+                self.bulk_create(badges, batch_size=batch_size)
+
+                for definition in definitions:
+                    if definition.next_badge_id is None:
+                        continue
+                    self.filter(
+                        interface_id__in=interface_ids,
+                        badge_definition=definition
+                    ).update(
+                        next_badge=Subquery(
+                            Badge.objects.filter(
+                                interface=OuterRef('interface'),
+                                badge_definition_id=definition.next_badge_id
+                            ).values('pk')[:1]
+                        )
+                    )
+            created += len(badges)
+        return created
+
+    def build_badge(self, definition, interface, next_badge=None):
+        """
+        Builds an unsaved badge (and progression) from a badge definition
+        and a gamification interface. This is what an interface's badge
+        looks like before anything has happened to it in lazy mode.
+
+        :param definition: BadgeDefinition object
+        :param interface: GamificationInterface object
+        :param next_badge: stored Badge object for definition.next_badge
+        :return: unsaved Badge object
+        """
+        return Badge(
+            interface=interface,
+            name=definition.name,
+            description=definition.description,
+            progression=Progression(target=definition.progression_target)
+            if definition.progression_target else None,
+            next_badge=next_badge,
+            category_id=definition.category_id,
+            points=definition.points,
+            badge_definition=definition
+        )
+
+    def for_interface(self, interface):
+        """
+        Returns a badge for every badge definition for the interface. In
+        lazy mode the badges that have not been stored yet are built from
+        their definition, saving one stores them.
+
+        :param interface: GamificationInterface object
+        :return: list of Badge objects, ordered by definition
+        """
+        stored = {
+            badge.badge_definition_id: badge
+            for badge in self.filter(interface=interface).select_related(
+                                                                'progression')
+        }
+        badges = []
+        for definition in definition_registry.badge_definitions():
+            badge = stored.get(definition.pk)
+            if badge is None:
+                badge = self.build_badge(definition, interface,
+                                         stored.get(definition.next_badge_id))
+            badges.append(badge)
+        return badges
+
+    def get_for(self, interface, definition):
+        """
+        Returns the badge of a definition for the interface, building it
+        from the definition if it has not been stored yet.
+
+        :param interface: GamificationInterface object
+        :param definition: BadgeDefinition object
+        :return: Badge object, unsaved if it was built
+        """
+        badge = self.filter(interface=interface,
+                            badge_definition=definition).first()
+        if badge is None:
+            next_badge = None
+            if definition.next_badge_id is not None:
+                next_badge = self.filter(
+                    interface=interface,
+                    badge_definition_id=definition.next_badge_id
+                ).first()
+            badge = self.build_badge(definition, interface, next_badge)
+        return badge
+
+    def materialize(self, interface, definition):
+        """
+        Returns the stored badge of a definition for the interface, storing
+        it first if needed.
+
+        :param interface: GamificationInterface object
+        :param definition: BadgeDefinition object
+        :return: Badge object
+        """
+        badge = self.get_for(interface, definition)
+        if badge.pk is None:
+            try:
+                with transaction.atomic(using=self.db):
+                    badge.save()
+            except IntegrityError:
+                # Somebody else stored it first
+                badge = self.get(interface=interface,
+                                 badge_definition=definition)
+        return badge
+
+    def _find_pairs(self, pairs):
+        """
+        :param pairs: iterable of (interface_id, badge_definition_id)
+        :return: dict of {(interface_id, badge_definition_id): (pk,
+            progression_id, revoked)} of the stored badges among them
+        """
+        # One condition per definition keeps the query exact without one
+        # condition per pair
+        interfaces_by_definition = defaultdict(list)
+        for interface_id, definition_id in pairs:
+            interfaces_by_definition[definition_id].append(interface_id)
+        condition = Q()
+        for definition_id, interface_ids in interfaces_by_definition.items():
+            condition |= Q(badge_definition_id=definition_id,
+                           interface_id__in=interface_ids)
+
+        badges = self.filter(condition).values_list(
+            'interface_id', 'badge_definition_id', 'pk', 'progression_id',
+            'revoked')
+        return {(interface_id, definition_id): tuple(row)
+                for interface_id, definition_id, *row in badges}
+
+    def _store_pairs(self, pairs):
+        """
+        Stores the lazy badges of many (interface_id, badge_definition_id)
+        pairs with bulk inserts, ignoring the ones stored concurrently.
+
+        :param pairs: iterable of (interface_id, badge_definition_id)
+        :return:
+        """
+        badges = []
+        for interface_id, definition_id in pairs:
+            definition = definition_registry.badge_definition(definition_id)
+            if definition is not None:
+                badges.append(self.build_badge(
+                    definition, GamificationInterface(pk=interface_id)))
+
+        progressions = [badge.progression for badge in badges
+                        if badge.progression is not None]
+        _bulk_create_with_pks(Progression, progressions, self.db)
+        self.bulk_create(badges, ignore_conflicts=True)
+        if progressions:
+            # Drop the progressions of the badges somebody else stored first
+            Progression.objects.db_manager(self.db).filter(
+                pk__in=[progression.pk for progression in progressions],
+                badge__isnull=True
+            ).delete()
+
+        # Link the new badges to their next badge and, like Badge.save, the
+        # stored badges whose next badge is new
+        interfaces_by_definition = defaultdict(set)
+        for badge in badges:
+            interfaces_by_definition[badge.badge_definition_id].add(
+                                                        badge.interface_id)
+        for definition in definition_registry.badge_definitions():
+            interface_ids = \
+                interfaces_by_definition.get(definition.pk, set()) | \
+                interfaces_by_definition.get(definition.next_badge_id, set())
+            if definition.next_badge_id is None or not interface_ids:
+                continue
+            self.filter(
+                interface_id__in=interface_ids,
+                badge_definition=definition,
+                next_badge__isnull=True
+            ).update(
+                next_badge=Subquery(
+                    Badge.objects.filter(
+                        interface=OuterRef('interface'),
+                        badge_definition_id=definition.next_badge_id
+                    ).values('pk')[:1]
+                )
+            )
+
+    def increment_many(self, increments, batch_size=BULK_BATCH_SIZE):
+        """
+        Adds progress to many badges at once with F expression updates, so
+        concurrent workers never lose each other's progress.
+
+        Badges that reach their progression target are acquired, and their
+        points awarded, in the same transaction. Only the worker whose UPDATE
+        flips a badge to acquired awards its points. Revoked badges and
+        badges without a progression are skipped, like in Badge.increment.
+        In lazy mode badges that have not been stored yet are stored first,
+        with bulk inserts.
+
+        :param increments: dict of {(interface, definition): amount}, where
+            interface and definition are GamificationInterface and
+            BadgeDefinition objects or their primary keys
+        :param batch_size: number of badges handled per transaction
+        :return: list of primary keys of the badges that were acquired
+        """
+        acquired = []
+        for batch in chunked(increments.items(), batch_size):
+            amounts = {}
+            for (interface, definition), amount in batch:
+                key = (getattr(interface, 'pk', interface),
+                       getattr(definition, 'pk', definition))
+                amounts[key] = amounts.get(key, 0) + amount
+
+            with transaction.atomic(using=self.db):
+                found = self._find_pairs(amounts)
+
+                missing = [key for key in amounts if key not in found]
+                if missing and gamification_settings.LAZY:
+                    self._store_pairs(missing)
+                    found.update(self._find_pairs(missing))
+
+                progressions_by_amount = defaultdict(list)
+                candidates = []
+                for key, amount in amounts.items():
+                    if key not in found:
+                        continue
+                    pk, progression_id, revoked = found[key]
+                    if progression_id is None or revoked or not amount:
+                        continue
+                    progressions_by_amount[amount].append(progression_id)
+                    candidates.append(pk)
+
+                for amount, progression_ids in \
+                        progressions_by_amount.items():
+                    Progression.objects.filter(
+                        pk__in=progression_ids
+                    ).update(
+                        progress=F('progress') + amount
+                    )
+                if candidates:
+                    interface_changed.send(
+                        sender=GamificationInterface,
+                        interface_ids=list({key[0] for key in amounts}))
+
+                # Lock the badges that crossed their target so that only one
+                # worker flips them and awards their points
+                crossed = list(self.select_for_update().filter(
+                    pk__in=candidates,
+                    points_awarded=False,
+                    revoked=False,
+                    progression__progress__gte=F('progression__target')
+                ).values_list('pk', 'interface_id', 'points'))
+                if not crossed:
+                    continue
+
+                self.filter(
+                    pk__in=[pk for pk, interface_id, points in crossed],
+                    points_awarded=False
+                ).update(acquired=True, points_awarded=True)
+                PointChange.objects.db_manager(self.db).award_bulk(
+                    (interface_id, points)
+                    for pk, interface_id, points in crossed
+                    if points is not None
+                )
+                acquired.extend(pk for pk, interface_id, points in crossed)
+        return acquired
+
+    async def aincrement_many(self, increments, batch_size=BULK_BATCH_SIZE):
+        """
+        Async version of increment_many.
+        """
+        return await sync_to_async(self.increment_many)(
+            increments, batch_size=batch_size)
+
 
 class AcquiredBadgesManager(BadgeManager):
     """
@@ -199,42 +1150,145 @@ class Badge(models.Model):
     next_badge = models.ForeignKey('self', null=True, on_delete=models.CASCADE)
     category = models.ForeignKey(Category, null=True, on_delete=models.CASCADE)
     points = models.BigIntegerField(null=True, blank=True)
+    # Whether the points of the badge have been awarded. It is kept apart
+    # from acquired because Badge.increment acquires a badge in memory and
+    # the points are only awarded by a later Badge.award.
+    points_awarded = models.BooleanField(default=False)
 
     default_objects = models.Manager()
     objects = BadgeManager()
     acquired_objects = AcquiredBadgesManager()
 
-    def increment(self):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['interface', 'badge_definition'],
+                                    name='badge_interface_definition'),
+        ]
+        indexes = [
+            # Badge.acquired_objects, partial where the database supports it
+            models.Index(fields=['interface'],
+                         condition=Q(acquired=True, revoked=False),
+                         name='badge_acquired'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the Progression too when it has not been stored yet or was
+        incremented since it was last saved. Badges built by
+        Badge.objects.for_interface in lazy mode are stored the first time
+        they are saved, and the interface's badges that lead to this one are
+        linked to it.
+
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        created = self.pk is None
+        # A progression that has not been loaded cannot have changed, so do
+        # not query it
+        progression = None
+        if Badge._meta.get_field('progression').is_cached(self):
+            progression = self.progression
+        if progression is not None and (
+                progression.pk is None or
+                getattr(progression, '_incremented', False)):
+            progression.save()
+        super(Badge, self).save(*args, **kwargs)
+
+        if created and gamification_settings.LAZY:
+            Badge.objects.filter(
+                interface_id=self.interface_id,
+                badge_definition__next_badge_id=self.badge_definition_id,
+                next_badge=None
+            ).update(
+                next_badge=self
+            )
+
+    def increment(self, by=1):
         if self.progression and not self.revoked:
-            self.progression.increment()
+            self.progression.increment(by)
             if self.progression.finished:
                 self.acquired = True
 
     def award(self):
-        if self.revoked:
-            self.revoked = False
-            if self.points is not None:
-                PointChange.objects.create(
-                    amount=self.points,
-                    interface=self.interface
-                )
+        """
+        Awards the badge, or gives a revoked badge back, and its points.
 
-        elif not self.progression or self.progression.finished:
-            self.acquired = True
+        The change is made with a conditional UPDATE of points_awarded and
+        the points are only awarded when it changed the badge, so several
+        workers handling the same event award the points once. A badge that
+        Badge.increment already acquired still gets its points. A badge
+        built in lazy mode is stored first.
+
+        :return: True if the badge was awarded or given back
+        """
+        if self.pk is None:
+            self.save()
+
+        with transaction.atomic():
+            if Badge.objects.filter(pk=self.pk, revoked=True).update(
+                                        revoked=False, points_awarded=True):
+                self.revoked = False
+            elif (not self.progression or self.progression.finished) and \
+                    Badge.objects.filter(
+                        pk=self.pk, points_awarded=False, revoked=False
+                    ).update(acquired=True, points_awarded=True):
+                self.acquired = True
+            else:
+                return False
+            self.points_awarded = True
+
+            interface_changed.send(sender=GamificationInterface,
+                                   interface_ids=[self.interface_id])
             if self.points is not None:
                 PointChange.objects.create(
                     amount=self.points,
-                    interface=self.interface
+                    interface_id=self.interface_id
                 )
+        return True
+
+    async def aaward(self):
+        """
+        Async version of award.
+        """
+        return await sync_to_async(self.award)()
 
     def force_revoke(self):
-        if self.acquired:
+        """
+        Revokes an acquired badge and takes its points back.
+
+        Like award, only the worker whose conditional UPDATE revoked the
+        badge takes the points back, and only if they had been awarded.
+
+        :return: True if the badge was revoked
+        """
+        with transaction.atomic():
+            revoked = Badge.objects.filter(pk=self.pk, acquired=True,
+                                           revoked=False)
+            if revoked.filter(points_awarded=True).update(
+                                        revoked=True, points_awarded=False):
+                take_back = True
+            elif revoked.update(revoked=True):
+                take_back = False
+            else:
+                return False
             self.revoked = True
-            if self.points is not None:
+            self.points_awarded = False
+
+            interface_changed.send(sender=GamificationInterface,
+                                   interface_ids=[self.interface_id])
+            if take_back and self.points is not None:
                 PointChange.objects.create(
                     amount=(-self.points),
-                    interface=self.interface
+                    interface_id=self.interface_id
                 )
+        return True
+
+    async def aforce_revoke(self):
+        """
+        Async version of force_revoke.
+        """
+        return await sync_to_async(self.force_revoke)()
 
 
 class UnlockableDefinition(models.Model):
@@ -267,8 +1321,12 @@ class UnlockableDefinition(models.Model):
             super(UnlockableDefinition, self).save(*args, **kwargs)
 
             # Create Unlockables for all GamificationInterfaces
-            for interface in GamificationInterface.objects.all():
-                Unlockable.objects.create_unlockable(self, interface)
+            if not gamification_settings.LAZY:
+                Unlockable.objects.create_unlockables(
+                    [self],
+                    GamificationInterface.objects.values_list(
+                        'pk', flat=True).iterator(chunk_size=BULK_BATCH_SIZE)
+                )
 
         else:
             super(UnlockableDefinition, self).save(*args, **kwargs)
@@ -280,6 +1338,20 @@ class UnlockableDefinition(models.Model):
                 points_required=self.points_required
             )
 
+            # Unlockables are only checked when an interface's balance
+            # crosses their points_required, so unlock the ones that are
+            # already covered by the current balance of their interface
+            Unlockable.objects.filter(
+                unlockable_definition=self,
+                acquired=False,
+                points_required__lte=F('interface__points_balance')
+            ).update(
+                acquired=True
+            )
+
+        definition_registry.invalidate()
+        definitions_changed.send(sender=UnlockableDefinition)
+
 
 class UnlockableManager(models.Manager):
     """
@@ -300,8 +1372,212 @@ class UnlockableManager(models.Manager):
             description=definition.description,
             points_required=definition.points_required,
             unlockable_definition=definition,
+            acquired=definition.points_required <= interface.points,
+        )
+
+    def create_unlockables(self, definitions, interfaces,
+                           batch_size=BULK_BATCH_SIZE):
+        """
+        Creates an unlockable for every combination of the given unlockable
+        definitions and gamification interfaces using bulk inserts.
+
+        Unlockables whose points_required is already covered by the balance
+        of their interface are created acquired.
+
+        :param definitions: iterable of UnlockableDefinition objects
+        :param interfaces: iterable of GamificationInterface objects or their
+            primary keys
+        :param batch_size: number of interfaces handled per transaction
+        :return: number of Unlockable objects created
+        """
+        definitions = list(definitions)
+        if not definitions:
+            return 0
+
+        created = 0
+        for batch in chunked(interfaces, batch_size):
+            interface_ids = [getattr(interface, 'pk', interface)
+                             for interface in batch]
+
+            with transaction.atomic(using=self.db):
+                unlockables = [
+                    Unlockable(
+                        interface_id=interface_id,
+                        name=definition.name,
+                        description=definition.description,
+                        points_required=definition.points_required,
+                        unlockable_definition=definition,
+                    )
+                    for interface_id in interface_ids
+                    for definition in definitions
+                ]
+                self.bulk_create(unlockables, batch_size=batch_size)
+                self.filter(
+                    interface_id__in=interface_ids,
+                    unlockable_definition__in=definitions,
+                    points_required__lte=F('interface__points_balance')
+                ).update(
+                    acquired=True
+                )
+            created += len(unlockables)
+        return created
+
+    def build_unlockable(self, definition, interface, points):
+        """
+        Builds an unsaved unlockable from an unlockable definition and a
+        gamification interface. This is what an interface's unlockable looks
+        like before it has been unlocked in lazy mode.
+
+        :param definition: UnlockableDefinition object
+        :param interface: GamificationInterface object
+        :param points: current points of the interface
+        :return: unsaved Unlockable object
+        """
+        return Unlockable(
+            interface=interface,
+            name=definition.name,
+            description=definition.description,
+            points_required=definition.points_required,
+            unlockable_definition=definition,
+            acquired=definition.points_required <= points,
         )
 
+    def for_interface(self, interface):
+        """
+        Returns an unlockable for every unlockable definition for the
+        interface. In lazy mode the unlockables that have not been stored
+        yet are built from their definition.
+
+        :param interface: GamificationInterface object
+        :return: list of Unlockable objects, ordered by definition
+        """
+        stored = {
+            unlockable.unlockable_definition_id: unlockable
+            for unlockable in self.filter(interface=interface)
+        }
+        points = interface.points
+        return [
+            stored.get(definition.pk) or self.build_unlockable(
+                                            definition, interface, points)
+            for definition in definition_registry.unlockable_definitions()
+        ]
+
+    def get_for(self, interface, definition):
+        """
+        Returns the unlockable of a definition for the interface, building it
+        from the definition if it has not been stored yet.
+
+        :param interface: GamificationInterface object
+        :param definition: UnlockableDefinition object
+        :return: Unlockable object, unsaved if it was built
+        """
+        unlockable = self.filter(interface=interface,
+                                 unlockable_definition=definition).first()
+        if unlockable is None:
+            unlockable = self.build_unlockable(definition, interface,
+                                               interface.points)
+        return unlockable
+
+    def unlock_reached(self, interfaces, above=None):
+        """
+        Unlocks the unlockables of the interfaces whose points_required is
+        covered by the interface's balance. In lazy mode the unlockables that
+        have not been stored yet are created acquired.
+
+        :param interfaces: iterable of GamificationInterface objects or
+            their primary keys
+        :param above: only consider unlockables that require more points
+            than this, e.g. the balance before the latest change
+        :return:
+        """
+        interface_ids = [getattr(interface, 'pk', interface)
+                         for interface in interfaces]
+
+        unlockables = self.filter(
+            interface_id__in=interface_ids,
+            acquired=False,
+            points_required__lte=F('interface__points_balance')
+        )
+        if above is not None:
+            unlockables = unlockables.filter(points_required__gt=above)
+        if unlockables.update(acquired=True):
+            interface_changed.send(sender=GamificationInterface,
+                                   interface_ids=interface_ids)
+
+        if not gamification_settings.LAZY:
+            return
+
+        balances = dict(GamificationInterface.objects.filter(
+            pk__in=interface_ids
+        ).values_list('pk', 'points_balance'))
+        if not balances:
+            return
+        most = max(balances.values())
+        definitions = [
+            definition
+            for definition in definition_registry.unlockable_definitions()
+            if definition.points_required <= most and
+            (above is None or definition.points_required > above)
+        ]
+        if not definitions:
+            return
+
+        stored = set(self.filter(
+            interface_id__in=interface_ids,
+            unlockable_definition__in=definitions
+        ).values_list('interface_id', 'unlockable_definition_id'))
+        self.bulk_create([
+            self.build_unlockable(definition, GamificationInterface(
+                pk=interface_id, points_balance=points), points)
+            for interface_id, points in balances.items()
+            for definition in definitions
+            if definition.points_required <= points and
+            (interface_id, definition.pk) not in stored
+        ], batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+        interface_changed.send(sender=GamificationInterface,
+                               interface_ids=interface_ids)
+
+    def unlock_crossed(self, interface, before, after):
+        """
+        Unlocks the unlockables whose points_required lies between two
+        balances of the interface, with one conditional UPDATE on the stored
+        unlockables. It does not rely on the definition registry, which may
+        not know a definition another process has just created. In lazy mode
+        the crossed definitions of the registry that have not been stored yet
+        are created acquired.
+
+        :param interface: GamificationInterface object or its primary key
+        :param before: balance before the change
+        :param after: balance after the change
+        :return:
+        """
+        if after <= before:
+            return
+        interface_id = getattr(interface, 'pk', interface)
+
+        changed = self.filter(
+            interface_id=interface_id,
+            acquired=False,
+            points_required__gt=before,
+            points_required__lte=after
+        ).update(acquired=True)
+
+        if gamification_settings.LAZY:
+            definitions = definition_registry.unlockable_definitions_between(
+                                                                before, after)
+            if definitions:
+                interface = GamificationInterface(pk=interface_id,
+                                                  points_balance=after)
+                self.bulk_create([
+                    self.build_unlockable(definition, interface, after)
+                    for definition in definitions
+                ], batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+                changed = True
+
+        if changed:
+            interface_changed.send(sender=GamificationInterface,
+                                   interface_ids=[interface_id])
+
 
 class Unlockable(models.Model):
     """
@@ -318,3 +1594,58 @@ class Unlockable(models.Model):
 
     default_objects = models.Manager()
     objects = UnlockableManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['interface', 'unlockable_definition'],
+                name='unlockable_interface_definition'),
+        ]
+        indexes = [
+            # Unlockables waiting for an interface's balance to reach them,
+            # partial where the database supports it
+            models.Index(fields=['interface', 'points_required'],
+                         condition=Q(acquired=False),
+                         name='unlockable_pending'),
+        ]
+
+
+class LeaderboardSnapshot(models.Model):
+    """
+    Persisted copy of the leaderboard, written by Leaderboard.save_snapshot
+    (or the update_leaderboard command) and used to load it again without
+    sorting every interface.
+    """
+    interface = models.OneToOneField(GamificationInterface, primary_key=True,
+                                     on_delete=models.CASCADE)
+    points = models.BigIntegerField()
+    rank = models.PositiveIntegerField(db_index=True)
+
+
+class GamificationEvent(models.Model):
+    """
+    An event emitted with django_gamification.events.emit, stored until the
+    process_gamification_events command processes it when the OutboxQueue
+    is used.
+    """
+    interface = models.ForeignKey(GamificationInterface,
+                                  on_delete=models.CASCADE)
+    action = models.CharField(max_length=128)
+    amount = models.BigIntegerField(default=0)
+    badge_definition = models.ForeignKey(BadgeDefinition, null=True,
+                                         on_delete=models.CASCADE)
+    progress = models.IntegerField(default=0)
+    data = models.JSONField(null=True)
+    time = models.DateTimeField(auto_now_add=True)
+    # Number of times processing this event failed, events that reached
+    # OutboxQueue.max_attempts are kept but not processed any more
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+
+class RegistryVersion(models.Model):
+    """
+    Version of the definitions, a single row shared by all processes. It is
+    incremented in every transaction that changes definitions, see
+    registry.DefinitionRegistry.
+    """
+    version = models.BigIntegerField(default=0)
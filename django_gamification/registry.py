@@ -0,0 +1,217 @@
+import threading
+from bisect import bisect_right
+import time
+
+from django.db import transaction
+from django.db.models import F
+
+from django_gamification.conf import gamification_settings
+
+
+class _Definitions(object):
+    """
+    The definitions loaded by one DefinitionRegistry version.
+    """
+
+    def __init__(self, badge_definitions, unlockable_definitions,
+                 categories):
+        self.badge_definitions = badge_definitions
+        self.unlockable_definitions = unlockable_definitions
+        self.categories = categories
+        self.badge_definitions_by_pk = {
+            definition.pk: definition for definition in badge_definitions}
+        self.unlockable_definitions_by_pk = {
+            definition.pk: definition
+            for definition in unlockable_definitions}
+        # UnlockableDefinitions sorted by points_required, with the sorted
+        # thresholds alongside for bisection
+        self.unlockable_definitions_by_threshold = sorted(
+            unlockable_definitions,
+            key=lambda definition: definition.points_required)
+        self.unlock_thresholds = [
+            definition.points_required
+            for definition in self.unlockable_definitions_by_threshold]
+
+
+class DefinitionRegistry(object):
+    """
+    In-process copy of all BadgeDefinitions (with their category),
+    UnlockableDefinitions and Categories, used by the library instead of
+    querying the definitions every time.
+
+    The registry is loaded once and stamped with a version counter kept in
+    the single RegistryVersion row, so that every process sees it whatever
+    cache backend is used. Saving or deleting a definition or category bumps
+    the counter in the same transaction. The current process reloads right
+    after it commits, other processes reload once they see the new version,
+    which they check at most every GAMIFICATION_REGISTRY_CHECK_INTERVAL
+    seconds (never if it is None).
+
+    Until the change commits, the thread that made it reads the definitions
+    from the database on every access, so that it sees its uncommitted
+    definitions, and does not keep them if the transaction (or a savepoint)
+    is rolled back, while other threads do not see them.
+
+    The definition objects are shared, so treat them as read-only.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._definitions = None
+        self._version = None
+        self._checked = None
+        self._local = threading.local()
+
+    def _current_version(self):
+        from django_gamification.models import RegistryVersion
+
+        return RegistryVersion.objects.filter(pk=1).values_list(
+                                            'version', flat=True).first() or 0
+
+    def _bump_version(self):
+        from django_gamification.models import RegistryVersion
+
+        versions = RegistryVersion.objects.filter(pk=1)
+        if not versions.update(version=F('version') + 1):
+            # The row is created by a migration, but may have been flushed
+            RegistryVersion.objects.bulk_create([RegistryVersion(pk=1)],
+                                                ignore_conflicts=True)
+            versions.update(version=F('version') + 1)
+
+    def _load(self):
+        from django_gamification.models import BadgeDefinition, Category, \
+            UnlockableDefinition
+
+        return _Definitions(
+            list(BadgeDefinition.objects.select_related(
+                                            'category').order_by('pk')),
+            list(UnlockableDefinition.objects.order_by('pk')),
+            {category.pk: category for category in Category.objects.all()},
+        )
+
+    def _pending(self):
+        """
+        Whether this thread changed definitions in a transaction that has
+        not committed yet.
+        """
+        if not getattr(self._local, 'pending', False):
+            return False
+        if transaction.get_connection().in_atomic_block:
+            return True
+        # The transaction ended without committing
+        self._local.pending = False
+        return False
+
+    def _get(self):
+        if self._pending():
+            return self._load()
+
+        with self._lock:
+            now = time.monotonic()
+            interval = gamification_settings.REGISTRY_CHECK_INTERVAL
+            if self._definitions is None or (
+                    interval is not None and now - self._checked >= interval):
+                version = self._current_version()
+                if self._definitions is None or version != self._version:
+                    self._definitions = self._load()
+                    self._version = version
+                self._checked = now
+            return self._definitions
+
+    def invalidate(self):
+        """
+        Bumps the version in the current transaction. Until it commits this
+        thread reads the definitions from the database, once it does all
+        threads and processes reload them.
+
+        :return:
+        """
+        def reload():
+            self._local.pending = False
+            with self._lock:
+                self._definitions = None
+
+        self._bump_version()
+        self._local.pending = True
+        transaction.on_commit(reload)
+
+    def clear(self):
+        """
+        Drops the definitions loaded by this process without bumping the
+        version, e.g. after a test case rolled back definitions it had
+        committed as far as on_commit is concerned.
+
+        :return:
+        """
+        self._local.pending = False
+        with self._lock:
+            self._definitions = None
+
+    def badge_definitions(self):
+        """
+        :return: list of all BadgeDefinition objects ordered by pk
+        """
+        return self._get().badge_definitions
+
+    def badge_definition(self, pk):
+        """
+        :param pk: primary key of a BadgeDefinition
+        :return: BadgeDefinition object, None if it does not exist
+        """
+        return self._get().badge_definitions_by_pk.get(pk)
+
+    def next_badges(self, definition):
+        """
+        Follows the next_badge chain of a badge definition.
+
+        :param definition: BadgeDefinition object or its primary key
+        :return: list of the BadgeDefinition objects that come after it
+        """
+        definitions = self._get().badge_definitions_by_pk
+        chain = []
+        seen = {getattr(definition, 'pk', definition)}
+        definition = definitions.get(getattr(definition, 'pk', definition))
+        while definition is not None and definition.next_badge_id not in seen:
+            definition = definitions.get(definition.next_badge_id)
+            if definition is not None:
+                chain.append(definition)
+                seen.add(definition.pk)
+        return chain
+
+    def unlockable_definitions(self):
+        """
+        :return: list of all UnlockableDefinition objects ordered by pk
+        """
+        return self._get().unlockable_definitions
+
+    def unlockable_definition(self, pk):
+        """
+        :param pk: primary key of an UnlockableDefinition
+        :return: UnlockableDefinition object, None if it does not exist
+        """
+        return self._get().unlockable_definitions_by_pk.get(pk)
+
+    def unlockable_definitions_between(self, low, high):
+        """
+        Finds the unlockable definitions crossed when a balance goes from low
+        to high, by bisecting the sorted points_required thresholds.
+
+        :param low: balance before the change
+        :param high: balance after the change
+        :return: list of UnlockableDefinition objects with
+            low < points_required <= high, ordered by points_required
+        """
+        definitions = self._get()
+        if high <= low:
+            return []
+        start = bisect_right(definitions.unlock_thresholds, low)
+        end = bisect_right(definitions.unlock_thresholds, high, lo=start)
+        return definitions.unlockable_definitions_by_threshold[start:end]
+
+    def categories(self):
+        """
+        :return: dict of all Category objects by pk
+        """
+        return self._get().categories
+
+
+definition_registry = DefinitionRegistry()
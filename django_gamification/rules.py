@@ -0,0 +1,76 @@
+import logging
+import threading
+from collections import defaultdict, namedtuple
+
+from django.utils.module_loading import import_string
+
+from django_gamification.registry import definition_registry
+
+logger = logging.getLogger(__name__)
+
+# A BadgeDefinition subscribed to an event. target is its
+# progression_target, None when one matching event awards the badge.
+Rule = namedtuple('Rule', ['badge_definition_id', 'target', 'predicate'])
+
+
+class RuleEngine(object):
+    """
+    Dispatch table of the BadgeDefinition triggers by event name.
+
+    The table is compiled from the definition registry and compiled again
+    whenever the registry reloads, so matching an event only looks at the
+    rules subscribed to its action instead of every badge definition.
+    Definitions whose trigger_predicate cannot be imported are logged and
+    left out.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._definitions = None
+        self._table = {}
+
+    def _compile(self, definitions):
+        table = defaultdict(list)
+        for definition in definitions:
+            if not definition.trigger:
+                continue
+            predicate = None
+            if definition.trigger_predicate:
+                try:
+                    predicate = import_string(definition.trigger_predicate)
+                except ImportError:
+                    # One broken definition must not stop the events of
+                    # every other one from being processed
+                    logger.exception(
+                        'Skipping the trigger of BadgeDefinition %s, its '
+                        'trigger_predicate cannot be imported',
+                        definition.pk)
+                    continue
+            table[definition.trigger].append(Rule(
+                badge_definition_id=definition.pk,
+                target=definition.progression_target or None,
+                predicate=predicate))
+        return dict(table)
+
+    def rules(self, action):
+        """
+        :param action: name of an event
+        :return: list of the Rule objects subscribed to it
+        """
+        definitions = definition_registry.badge_definitions()
+        with self._lock:
+            if definitions is not self._definitions:
+                self._table = self._compile(definitions)
+                self._definitions = definitions
+            return self._table.get(action, [])
+
+    def match(self, event):
+        """
+        :param event: events.Event object
+        :return: list of the Rule objects the event satisfies
+        """
+        return [rule for rule in self.rules(event.action)
+                if rule.predicate is None or rule.predicate(event)]
+
+
+rule_engine = RuleEngine()
@@ -1,15 +1,26 @@
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django_gamification.conf import gamification_settings
 from django_gamification.models import PointChange, Unlockable, \
-    GamificationInterface, BadgeDefinition, Badge, UnlockableDefinition
+    GamificationInterface, BadgeDefinition, Badge, UnlockableDefinition, \
+    Category
+from django_gamification.registry import definition_registry
 
 
 @receiver(post_save, sender=PointChange)
-def check_unlockables(sender, instance=None, **kwargs):
+def check_unlockables(sender, instance=None, created=False, **kwargs):
     """
     Checks if the interface being used has unlocked any new Unlockables
 
+    PointChange.save leaves the new balance on the instance, so for a new
+    PointChange the balance moved from (balance - amount) to balance and
+    only the Unlockables with points_required in that range can have been
+    unlocked by it, which are unlocked with a single UPDATE. A negative
+    change can never unlock anything.
+
+    In lazy mode the Unlockables that have not been stored yet are created.
+
     :param sender:
     :param kwargs:
     :return:
@@ -17,14 +28,15 @@ def check_unlockables(sender, instance=None, **kwargs):
     if instance is None:
         return
 
-    # Find all unlockables for the interface that have less points
-    # then the current interface, and update them to be unlocked
-    Unlockable.objects.filter(
-        interface=instance.interface,
-        points_required__lte=instance.interface.points
-    ).update(
-        acquired=True
-    )
+    if created and instance.amount <= 0:
+        return
+
+    balance = getattr(instance, '_points_balance', None)
+    if created and balance is not None:
+        Unlockable.objects.unlock_crossed(
+            instance.interface_id, balance - instance.amount, balance)
+    else:
+        Unlockable.objects.unlock_reached([instance.interface_id])
 
 
 @receiver(post_save, sender=GamificationInterface)
@@ -32,6 +44,7 @@ def create_badges_and_unlockables_from_new_interface(
         sender, instance, created, **kwargs):
     """
     Creates new badges from all definitions for the new interface.
+    Nothing is created in lazy mode.
 
     :param sender:
     :param created:
@@ -39,11 +52,28 @@ def create_badges_and_unlockables_from_new_interface(
     :return:
     """
 
-    if not created:
+    if not created or gamification_settings.LAZY:
         return
 
-    for definition in BadgeDefinition.objects.all():
-        Badge.objects.create_badge(definition, instance)
+    # The definitions are read from the database rather than the definition
+    # registry, which may not know the ones created by other processes yet
+    Badge.objects.create_badges(
+        BadgeDefinition.objects.order_by('pk'), [instance])
+    Unlockable.objects.create_unlockables(
+        UnlockableDefinition.objects.order_by('pk'), [instance])
+
 
-    for definition in UnlockableDefinition.objects.all():
-        Unlockable.objects.create_unlockable(definition, instance)
+@receiver(post_delete, sender=BadgeDefinition)
+@receiver(post_delete, sender=UnlockableDefinition)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_definition_registry(sender, **kwargs):
+    """
+    Drops the cached definitions when a definition is deleted or a category
+    changes. Saving a definition invalidates the registry itself.
+
+    :param sender:
+    :param kwargs:
+    :return:
+    """
+    definition_registry.invalidate()
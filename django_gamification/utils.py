@@ -0,0 +1,21 @@
+from itertools import islice
+
+# Number of rows written per bulk insert/update by the bulk code paths
+BULK_BATCH_SIZE = 1000
+
+
+def chunked(iterable, size):
+    """
+    Splits any iterable into lists of at most size items without loading it
+    all into memory.
+
+    :param iterable:
+    :param size:
+    :return: generator of lists
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
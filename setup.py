@@ -17,7 +17,9 @@ URL = 'https://github.com/mattjegan/django-gamification'
 EMAIL = 'matthewj.egan@hotmail.com'
 AUTHOR = 'Matthew Egan'
 
-REQUIRED = []
+REQUIRED = [
+    'Django>=4.1',
+]
 
 here = os.path.abspath(os.path.dirname(__file__))
 
@@ -68,28 +70,35 @@ setup(
     author=AUTHOR,
     author_email=EMAIL,
     url=URL,
-    packages=['django_gamification'],
+    packages=['django_gamification',
+              'django_gamification.management',
+              'django_gamification.management.commands'],
     install_requires=REQUIRED,
+    python_requires='>=3.8',
+    extras_require={
+        'drf': ['djangorestframework>=3.14'],
+    },
     include_package_data=True,
     license='BSD',
     classifiers=[
         'Environment :: Web Environment',
         'Framework :: Django',
-        'Framework :: Django :: 1.8',
-        'Framework :: Django :: 1.9',
-        'Framework :: Django :: 1.10',
-        'Framework :: Django :: 1.11',
+        'Framework :: Django :: 4.1',
+        'Framework :: Django :: 4.2',
+        'Framework :: Django :: 5.0',
+        'Framework :: Django :: 5.1',
+        'Framework :: Django :: 5.2',
         'Intended Audience :: Developers',
         'License :: OSI Approved :: BSD License',
         'Operating System :: OS Independent',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 2.6',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
+        'Programming Language :: Python :: 3.12',
         'Programming Language :: Python :: Implementation :: CPython',
         'Programming Language :: Python :: Implementation :: PyPy',
         'Topic :: Internet :: WWW/HTTP',
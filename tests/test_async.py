@@ -0,0 +1,91 @@
+from django.test import TestCase, override_settings
+
+from django_gamification.cache import state_cache
+from django_gamification.models import GamificationInterface, PointChange, \
+    BadgeDefinition, Badge, UnlockableDefinition, Unlockable
+
+
+class AsyncApiTest(TestCase):
+    """Tests for the async versions of the points and badge operations"""
+
+    def setUp(self):
+        self.interface = GamificationInterface.objects.create()
+        self.other = GamificationInterface.objects.create()
+        self.definition = BadgeDefinition.objects.create(
+            name='badge', progression_target=2, points=10)
+        UnlockableDefinition.objects.create(name='unlockable',
+                                            points_required=20)
+
+    async def test_apoints(self):
+        await PointChange.objects.acreate(amount=5, interface=self.interface)
+        self.assertEqual(await self.interface.apoints(), 5)
+        self.assertEqual(
+            await GamificationInterface(points_balance=3).apoints(), 3)
+
+    async def test_apoints_many(self):
+        await PointChange.objects.aaward_bulk([(self.interface, 5),
+                                               (self.other.pk, 7)])
+        points = await GamificationInterface.objects.apoints_many(
+            [self.interface, self.other.pk])
+        self.assertEqual(points, {self.interface.pk: 5, self.other.pk: 7})
+
+    async def test_aaward_bulk_from_async_iterable(self):
+        async def awards():
+            for i in range(5):
+                yield self.interface, 5
+
+        created = await PointChange.objects.aaward_bulk(awards(),
+                                                        batch_size=2)
+        self.assertEqual(created, 5)
+        self.assertEqual(await self.interface.apoints(), 25)
+        self.assertTrue((await Unlockable.objects.aget(
+            interface=self.interface)).acquired)
+
+    async def test_aaward_and_aforce_revoke(self):
+        badge = await Badge.objects.select_related('progression').aget(
+            interface=self.interface, badge_definition=self.definition)
+        badge.progression.progress = 2
+
+        self.assertTrue(await badge.aaward())
+        self.assertFalse(await badge.aaward())
+        self.assertEqual(await self.interface.apoints(), 10)
+
+        self.assertTrue(await badge.aforce_revoke())
+        self.assertFalse(await badge.aforce_revoke())
+        self.assertEqual(await self.interface.apoints(), 0)
+
+    async def test_aincrement_many(self):
+        acquired = await Badge.objects.aincrement_many(
+            {(self.interface, self.definition): 2,
+             (self.other, self.definition): 1})
+        badge = await Badge.objects.aget(interface=self.interface)
+        self.assertEqual(acquired, [badge.pk])
+        self.assertEqual(await self.interface.apoints(), 10)
+
+    async def test_areset(self):
+        await PointChange.objects.aaward_bulk([(self.interface, 25),
+                                               (self.other, 25)])
+        await self.interface.areset()
+        self.assertEqual(self.interface.points_balance, 0)
+        self.assertEqual(await self.interface.apoints(), 0)
+        self.assertEqual(await self.other.apoints(), 25)
+
+        await GamificationInterface.objects.areset_many(
+            GamificationInterface.objects.all())
+        self.assertEqual(await self.other.apoints(), 0)
+
+    @override_settings(
+        CACHES={'gamification': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'async',
+        }},
+        GAMIFICATION_CACHE='gamification',
+    )
+    async def test_state_cache(self):
+        await PointChange.objects.aaward_bulk([(self.interface, 25)])
+        states = await state_cache.aget_many(
+            interface for interface in (self.interface, self.other))
+        self.assertEqual(states[self.interface.pk]['points'], 25)
+        self.assertEqual(states[self.other.pk]['points'], 0)
+        self.assertEqual(await state_cache.aget(self.other), states[
+            self.other.pk])
@@ -0,0 +1,108 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from django_gamification.cache import state_cache
+from django_gamification.models import GamificationInterface, PointChange, \
+    BadgeDefinition, Badge, UnlockableDefinition
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'gamification': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'gamification',
+        },
+    },
+    GAMIFICATION_CACHE='gamification',
+)
+class InterfaceStateCacheTest(TestCase):
+    """Tests for the read-through cache of interface state"""
+
+    def setUp(self):
+        caches['gamification'].clear()
+        self.interface = GamificationInterface.objects.create()
+        self.badge_definition = BadgeDefinition.objects.create(
+            name='badge', progression_target=3, points=5)
+        self.unlockable_definition = UnlockableDefinition.objects.create(
+            name='unlockable', points_required=10)
+
+    def write(self, func, *args, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return func(*args, **kwargs)
+
+    def test_state(self):
+        self.write(PointChange.objects.create, amount=10,
+                   interface=self.interface)
+        self.assertEqual(state_cache.get(self.interface), {
+            'points': 10,
+            'badges': [],
+            'unlockables': [self.unlockable_definition.pk],
+            'progress': {self.badge_definition.pk: 0},
+        })
+        self.assertIsNone(state_cache.get(0))
+
+    def test_cached_reads_do_not_query(self):
+        state_cache.get(self.interface)
+        with self.assertNumQueries(0):
+            self.assertEqual(state_cache.get(self.interface)['points'], 0)
+
+    def test_invalidated_by_writes(self):
+        state_cache.get(self.interface)
+        self.write(PointChange.objects.create, amount=4,
+                   interface=self.interface)
+        self.assertEqual(state_cache.get(self.interface)['points'], 4)
+
+        self.write(Badge.objects.increment_many,
+                   {(self.interface, self.badge_definition): 3})
+        state = state_cache.get(self.interface)
+        self.assertEqual(state['badges'], [self.badge_definition.pk])
+        self.assertEqual(state['progress'], {self.badge_definition.pk: 3})
+        self.assertEqual(state['points'], 9)
+
+        badge = Badge.objects.get(interface=self.interface)
+        self.write(badge.force_revoke)
+        self.assertEqual(state_cache.get(self.interface)['badges'], [])
+
+        self.write(badge.progression.save)
+        self.write(self.interface.reset)
+        self.assertEqual(state_cache.get(self.interface)['points'], 0)
+
+    def test_invalidated_by_definition_changes(self):
+        other = GamificationInterface.objects.create()
+        state_cache.get_many([self.interface, other])
+        self.write(UnlockableDefinition.objects.create, name='free',
+                   points_required=0)
+        states = state_cache.get_many([self.interface, other])
+        self.assertEqual(len(states[other.pk]['unlockables']), 1)
+
+    def test_evicted_version(self):
+        state_cache.get(self.interface)
+        caches['gamification'].delete(
+            state_cache._version_key(self.interface.pk))
+        self.write(state_cache.invalidate, [self.interface.pk])
+        self.assertEqual(state_cache.get(self.interface)['points'], 0)
+
+    @override_settings(GAMIFICATION_CACHE_TIMEOUT=60)
+    def test_version_expires(self):
+        with mock.patch.object(caches['gamification'], 'add',
+                               wraps=caches['gamification'].add) as add:
+            state_cache.version(self.interface)
+        self.assertEqual({call.args[2] for call in add.call_args_list}, {60})
+
+    @override_settings(GAMIFICATION_LAZY=True)
+    def test_lazy_unlockables(self):
+        UnlockableDefinition.objects.create(name='free', points_required=0)
+        interface = GamificationInterface.objects.create()
+        self.assertEqual(len(state_cache.get(interface)['unlockables']), 1)
+
+    @override_settings(GAMIFICATION_CACHE=None)
+    def test_disabled(self):
+        state_cache.invalidate([self.interface.pk])
+        state_cache.invalidate_all()
+        with self.assertNumQueries(3):
+            state_cache.get(self.interface)
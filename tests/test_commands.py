@@ -0,0 +1,59 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from django_gamification.models import GamificationInterface, \
+    PointChange, UnlockableDefinition, Unlockable
+
+
+class RebuildPointBalancesTest(TestCase):
+    """Tests for the rebuild_point_balances management command"""
+
+    def setUp(self):
+        self.interface = GamificationInterface.objects.create()
+        PointChange.objects.create(amount=10, interface=self.interface)
+        PointChange.objects.create(amount=15, interface=self.interface)
+        GamificationInterface.objects.filter(pk=self.interface.pk).update(
+                                                            points_balance=3)
+
+    def test_verify_reports_without_writing(self):
+        out = StringIO()
+        call_command('rebuild_point_balances', verify=True, stdout=out)
+        self.assertIn('balance 3 != ledger 25', out.getvalue())
+        self.assertIn('1 out of sync', out.getvalue())
+        self.assertEqual(self.interface.points, 3)
+
+    def test_rebuild(self):
+        GamificationInterface.objects.create()
+        out = StringIO()
+        call_command('rebuild_point_balances', batch_size=1, stdout=out)
+        self.assertIn('Rebuilt 2 interfaces, 1 were out of sync', out.getvalue())
+        self.assertEqual(self.interface.points, 25)
+
+    def test_rebuild_unlocks_covered(self):
+        UnlockableDefinition.objects.create(name='u', points_required=20)
+        Unlockable.objects.update(acquired=False)
+        call_command('rebuild_point_balances', stdout=StringIO())
+        self.assertTrue(Unlockable.objects.get().acquired)
+
+        # Verifying writes nothing
+        Unlockable.objects.update(acquired=False)
+        call_command('rebuild_point_balances', verify=True, stdout=StringIO())
+        self.assertFalse(Unlockable.objects.get().acquired)
+
+
+class CompactPointChangesTest(TestCase):
+    """Tests for the compact_point_changes management command"""
+
+    def test_compact(self):
+        interface = GamificationInterface.objects.create()
+        for amount in (10, -5, 20):
+            PointChange.objects.create(amount=amount, interface=interface)
+
+        out = StringIO()
+        call_command('compact_point_changes', days=0, stdout=out)
+        self.assertIn('Removed 2 PointChanges', out.getvalue())
+        self.assertEqual(interface.points, 25)
+        self.assertEqual(list(PointChange.objects.values_list(
+            'amount', 'checkpoint')), [(25, True)])
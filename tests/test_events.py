@@ -0,0 +1,155 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from django_gamification import events
+from django_gamification.models import BadgeDefinition, Badge, \
+    GamificationEvent, GamificationInterface, PointChange
+
+
+class EventTestMixin(object):
+
+    def setUp(self):
+        self.interface = GamificationInterface.objects.create()
+        self.other = GamificationInterface.objects.create()
+        self.definition = BadgeDefinition.objects.create(
+            name='badge', progression_target=3, points=50)
+
+    def badge(self, interface):
+        return Badge.objects.select_related('progression').get(
+            interface=interface, badge_definition=self.definition)
+
+
+class ProcessEventsTest(EventTestMixin, TestCase):
+    """Tests that batches of events are coalesced per interface"""
+
+    def test_coalesces_events(self):
+        events.process_events([
+            events.Event(self.interface.pk, 'comment', 5, self.definition.pk,
+                         1),
+            events.Event(self.interface.pk, 'comment', 5, self.definition.pk,
+                         2),
+            events.Event(self.other.pk, 'vote', 1, None, 0),
+            events.Event(self.other.pk, 'unvote', -1, None, 0),
+        ])
+
+        self.assertEqual(list(PointChange.objects.filter(
+            interface=self.interface).values_list('amount', flat=True)
+            .order_by('pk')), [10, 50])
+        self.assertFalse(PointChange.objects.filter(
+            interface=self.other).exists())
+        self.assertEqual(self.interface.points, 60)
+        self.assertTrue(self.badge(self.interface).acquired)
+        self.assertEqual(self.badge(self.other).progression.progress, 0)
+
+
+@override_settings(
+    GAMIFICATION_EVENT_QUEUE='django_gamification.events.ThreadPoolQueue')
+class ThreadPoolQueueTest(EventTestMixin, TestCase):
+    """Tests for processing events on a background thread"""
+
+    def setUp(self):
+        super(ThreadPoolQueueTest, self).setUp()
+        self.queue = events.get_queue()
+        self.queue.executor = mock.Mock()
+
+    def tearDown(self):
+        self.queue.executor = None
+        self.queue.drain()
+
+    def test_processed_after_commit(self):
+        events.emit(self.interface, 'comment', amount=5)
+        self.queue.executor.submit.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            events.emit(self.interface, 'comment', amount=5,
+                        badge=self.definition)
+            events.emit(self.interface.pk, 'comment', amount=5,
+                        badge=self.definition.pk, progress=2)
+        self.queue.executor.submit.assert_called_once_with(self.queue._run)
+        self.assertEqual(self.interface.points, 0)
+
+        self.assertEqual(self.queue.drain(), 2)
+        self.assertEqual(self.interface.points, 60)
+        self.assertTrue(self.badge(self.interface).acquired)
+
+    def test_failure_is_logged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            events.emit(self.interface, 'comment', amount=5)
+
+        with mock.patch('django_gamification.events.process_events',
+                        side_effect=ValueError), \
+                mock.patch('django_gamification.events.connections') as \
+                connections, self.assertLogs('django_gamification.events'):
+            self.queue._run()
+        connections.close_all.assert_called_once_with()
+        self.assertEqual(self.queue.drain(), 0)
+
+
+@override_settings(
+    GAMIFICATION_EVENT_QUEUE='django_gamification.events.OutboxQueue')
+class OutboxQueueTest(EventTestMixin, TestCase):
+    """Tests for storing events in the outbox and draining them"""
+
+    def test_emit_stores_event(self):
+        events.emit(self.interface, 'comment', amount=5,
+                    badge=self.definition, progress=2)
+        events.emit(self.other, 'vote', amount=1)
+
+        self.assertEqual(list(GamificationEvent.objects.order_by(
+            'pk').values_list('interface', 'action', 'amount',
+                              'badge_definition', 'progress')),
+            [(self.interface.pk, 'comment', 5, self.definition.pk, 2),
+             (self.other.pk, 'vote', 1, None, 0)])
+        self.assertEqual(self.interface.points, 0)
+
+    def test_drain_in_batches(self):
+        for i in range(3):
+            events.emit(self.interface, 'comment', amount=5,
+                        badge=self.definition)
+        queue = events.get_queue()
+
+        self.assertEqual(queue.drain(batch_size=2), 2)
+        self.assertEqual(self.interface.points, 10)
+        self.assertEqual(queue.drain(batch_size=2), 1)
+        self.assertEqual(queue.drain(batch_size=2), 0)
+        self.assertEqual(self.interface.points, 65)
+        self.assertFalse(GamificationEvent.objects.exists())
+
+    def test_failing_event(self):
+        events.emit(self.interface, 'comment', amount=5)
+        events.emit(self.interface, 'broken', amount=100)
+        events.emit(self.other, 'comment', amount=5)
+        queue = events.get_queue()
+        process_events = events.process_events
+
+        def fail_broken(batch):
+            batch = list(batch)
+            if any(event.action == 'broken' for event in batch):
+                PointChange.objects.create(amount=1, interface=self.other)
+                raise ValueError('broken')
+            process_events(batch)
+
+        with mock.patch('django_gamification.events.process_events',
+                        side_effect=fail_broken), \
+                self.assertLogs('django_gamification.events', 'ERROR'):
+            self.assertEqual(queue.drain(), 3)
+        self.assertEqual(self.interface.points, 5)
+        self.assertEqual(self.other.points, 5)
+        self.assertEqual(list(GamificationEvent.objects.values_list(
+            'action', 'attempts')), [('broken', 1)])
+
+        GamificationEvent.objects.update(attempts=queue.max_attempts)
+        self.assertEqual(queue.drain(), 0)
+
+    def test_command(self):
+        for i in range(3):
+            events.emit(self.interface, 'comment', amount=5)
+
+        out = StringIO()
+        call_command('process_gamification_events', once=True, batch_size=2,
+                     stdout=out)
+        self.assertIn('Processed 3 events', out.getvalue())
+        self.assertEqual(self.interface.points, 15)
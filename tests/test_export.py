@@ -0,0 +1,79 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+
+from django_gamification.export import export
+from django_gamification.models import GamificationInterface, PointChange, \
+    BadgeDefinition, Badge, UnlockableDefinition
+
+
+class ExportTest(TestCase):
+    """Tests for streaming exports"""
+
+    def setUp(self):
+        self.definition = BadgeDefinition.objects.create(
+            name='badge', progression_target=2)
+        UnlockableDefinition.objects.create(name='unlockable',
+                                            points_required=10)
+        self.interface = GamificationInterface.objects.create()
+        self.other = GamificationInterface.objects.create()
+        for amount in (5, 10):
+            PointChange.objects.create(amount=amount,
+                                       interface=self.interface)
+        PointChange.objects.create(amount=1, interface=self.other)
+        Badge.objects.increment_many({(self.interface, self.definition): 1})
+
+    def test_ndjson(self):
+        lines = list(export('point_changes', interfaces=[self.interface],
+                            chunk_size=1))
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([(row['interface'], row['amount']) for row in rows],
+                         [(self.interface.pk, 5), (self.interface.pk, 10)])
+        self.assertEqual(list(rows[0]),
+                         ['id', 'interface', 'amount', 'time', 'checkpoint'])
+
+    def test_csv(self):
+        rows = list(csv.DictReader(export('badges', format='csv')))
+        self.assertEqual(
+            [(row['interface'], row['acquired'], row['progress'])
+             for row in rows],
+            [(str(self.interface.pk), 'False', '1'),
+             (str(self.other.pk), 'False', '0')])
+
+    def test_interfaces(self):
+        rows = [json.loads(line) for line in export('interfaces')]
+        self.assertEqual(rows, [{'id': self.interface.pk, 'points': 15},
+                                {'id': self.other.pk, 'points': 1}])
+
+    def test_streaming_response(self):
+        response = StreamingHttpResponse(export('unlockables', format='csv'))
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertEqual(content.splitlines()[0],
+                         'id,interface,unlockable_definition,name,'
+                         'points_required,acquired')
+        self.assertEqual(len(content.splitlines()), 3)
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            export('users')
+        with self.assertRaises(ValueError):
+            export('badges', format='xml')
+
+    def test_command(self):
+        out = StringIO()
+        call_command('export_gamification', 'point_changes',
+                     interfaces=[self.other.pk], stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export.csv')
+            call_command('export_gamification', 'point_changes',
+                         format='csv', output=path)
+            with open(path, newline='') as f:
+                self.assertEqual(len(list(csv.DictReader(f))), 3)
@@ -0,0 +1,163 @@
+import datetime
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import NotSupportedError, connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from django_gamification import importer
+from django_gamification.export import export
+from django_gamification.models import GamificationInterface, PointChange, \
+    BadgeDefinition, Badge, UnlockableDefinition, Unlockable, PointRollup
+
+TIME = datetime.datetime(2020, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)
+
+
+class ImportTest(TestCase):
+    """Tests for bulk importing interfaces, point changes and badges"""
+
+    def setUp(self):
+        self.definition = BadgeDefinition.objects.create(
+            name='badge', progression_target=3, points=10)
+        self.plain = BadgeDefinition.objects.create(name='plain')
+        UnlockableDefinition.objects.create(name='unlockable',
+                                            points_required=20)
+
+    def ndjson(self, *rows):
+        return [json.dumps(row) + '\n' for row in rows]
+
+    def test_import_and_reconcile(self):
+        created = importer.import_data('interfaces', self.ndjson(
+            {'id': 100}, {'id': 101}))
+        self.assertEqual(created, [100, 101])
+        self.assertEqual(importer.import_data('interfaces', self.ndjson(
+            {'id': 101}, {'id': 102})), [102])
+        self.assertEqual(Badge.objects.filter(interface=100).count(), 2)
+
+        self.assertEqual(importer.import_data('point_changes', self.ndjson(
+            {'interface': 100, 'amount': 15, 'time': TIME.isoformat()},
+            {'interface': 100, 'amount': 10},
+            {'interface': 101, 'amount': 5, 'checkpoint': True},
+        ), batch_size=2), 3)
+        self.assertEqual(importer.import_data('badges', [
+            'interface,badge_definition,acquired,revoked,progress\n',
+            '100,{},false,false,3\n'.format(self.definition.pk),
+            '101,{},false,false,1\n'.format(self.definition.pk),
+            '101,{},true,true,\n'.format(self.plain.pk),
+        ], format='csv'), 3)
+
+        interface = GamificationInterface.objects.get(pk=100)
+        self.assertEqual(interface.points, 25)
+        self.assertEqual(GamificationInterface.objects.get(pk=101).points, 5)
+        self.assertEqual(PointChange.objects.filter(
+            interface=interface).order_by('time').first().time, TIME)
+        self.assertTrue(PointChange.objects.get(interface=101).checkpoint)
+        self.assertEqual(PointRollup.objects.get(
+            interface=interface, period=PointRollup.DAY,
+            start=datetime.date(2020, 1, 2)).points, 15)
+        self.assertFalse(PointRollup.objects.filter(interface=101).exists())
+
+        # Nothing is derived until the reconcile pass
+        badge = Badge.objects.get(interface=100, badge_definition=self.definition)
+        self.assertEqual(badge.progression.progress, 3)
+        self.assertFalse(badge.acquired)
+        self.assertFalse(Unlockable.objects.get(interface=100).acquired)
+        plain = Badge.objects.get(interface=101, badge_definition=self.plain)
+        self.assertTrue(plain.acquired and plain.revoked)
+
+        importer.reconcile(batch_size=2)
+        self.assertTrue(Badge.objects.get(pk=badge.pk).acquired)
+        self.assertFalse(Badge.objects.get(
+            interface=101, badge_definition=self.definition).acquired)
+        self.assertTrue(Unlockable.objects.get(interface=100).acquired)
+        self.assertFalse(Unlockable.objects.get(interface=101).acquired)
+        # Reconciling awards no points, they are part of the history
+        self.assertEqual(interface.points, 25)
+
+    @override_settings(GAMIFICATION_LAZY=True)
+    def test_lazy(self):
+        importer.import_data('interfaces', self.ndjson({'id': 100}))
+        self.assertFalse(Badge.objects.exists())
+
+        importer.import_data('point_changes', self.ndjson(
+            {'interface': 100, 'amount': 30}))
+        importer.import_data('badges', self.ndjson(
+            {'interface': 100, 'badge_definition': self.definition.pk,
+             'progress': 5}))
+        importer.reconcile([100])
+
+        self.assertTrue(Badge.objects.get(interface=100).acquired)
+        self.assertTrue(Unlockable.objects.get(interface=100).acquired)
+
+    def test_missing_flags_are_kept(self):
+        importer.import_data('interfaces', self.ndjson({'id': 100}))
+        Badge.objects.filter(interface=100, badge_definition=self.plain
+                             ).update(acquired=True, revoked=True)
+        importer.import_data('badges', self.ndjson(
+            {'interface': 100, 'badge_definition': self.plain.pk},
+            {'interface': 100, 'badge_definition': self.definition.pk,
+             'acquired': True}))
+
+        plain = Badge.objects.get(interface=100, badge_definition=self.plain)
+        self.assertTrue(plain.acquired and plain.revoked)
+        badge = Badge.objects.get(interface=100,
+                                  badge_definition=self.definition)
+        self.assertTrue(badge.acquired and not badge.revoked)
+        # Its points come with the point changes, award does not add them
+        self.assertTrue(badge.points_awarded)
+        self.assertFalse(badge.award())
+
+    def test_time_needs_returned_rows(self):
+        importer.import_data('interfaces', self.ndjson({'id': 100}))
+        with mock.patch.object(type(connection.features),
+                               'can_return_rows_from_bulk_insert', False):
+            self.assertEqual(importer.import_data('point_changes', self.ndjson(
+                {'interface': 100, 'amount': 5})), 1)
+            with self.assertRaises(NotSupportedError):
+                importer.import_data('point_changes', self.ndjson(
+                    {'interface': 100, 'amount': 5,
+                     'time': TIME.isoformat()}))
+
+    def test_unknown_badge_definition(self):
+        importer.import_data('interfaces', self.ndjson({'id': 100}))
+        with self.assertRaises(ValueError):
+            importer.import_data('badges', self.ndjson(
+                {'interface': 100, 'badge_definition': 0}))
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            list(importer.read_rows('unlockables', []))
+        with self.assertRaises(ValueError):
+            list(importer.read_rows('badges', [], format='xml'))
+
+    def test_export_round_trip(self):
+        interface = GamificationInterface.objects.create()
+        PointChange.objects.create(amount=25, interface=interface)
+        changes = list(export('point_changes', format='csv'))
+        PointChange.objects.all().delete()
+
+        importer.import_data('point_changes', changes, format='csv')
+        self.assertEqual(interface.points, 25)
+
+    def test_command(self):
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            interfaces = os.path.join(directory, 'interfaces.csv')
+            with open(interfaces, 'w') as f:
+                f.write('id\n100\n')
+            point_changes = os.path.join(directory, 'points.ndjson')
+            with open(point_changes, 'w') as f:
+                f.writelines(self.ndjson({'interface': 100, 'amount': 20,
+                                          'time': timezone.now().isoformat()}))
+            call_command('import_gamification', interfaces=interfaces,
+                         point_changes=point_changes, stdout=out)
+
+        self.assertIn('Imported 1 interfaces', out.getvalue())
+        self.assertIn('Imported 1 point changes', out.getvalue())
+        self.assertIn('Reconciled', out.getvalue())
+        self.assertTrue(Unlockable.objects.get(interface=100).acquired)
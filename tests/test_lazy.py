@@ -0,0 +1,137 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from django_gamification.models import GamificationInterface, PointChange, \
+    BadgeDefinition, Badge, Progression, UnlockableDefinition, Unlockable
+
+
+@override_settings(GAMIFICATION_LAZY=True)
+class LazyBadgeTest(TestCase):
+    """Tests that badges are only stored once they are touched"""
+
+    def setUp(self):
+        self.interface = GamificationInterface.objects.create()
+        self.first = BadgeDefinition.objects.create(
+            name='first', progression_target=2, points=10)
+        self.second = BadgeDefinition.objects.create(
+            name='second', next_badge=self.first)
+
+    def test_nothing_stored_up_front(self):
+        GamificationInterface.objects.create()
+        GamificationInterface.objects.provision_bulk(3)
+        BadgeDefinition.objects.create(name='third')
+        self.assertEqual(Badge.objects.count(), 0)
+        self.assertEqual(Progression.objects.count(), 0)
+
+    def test_for_interface_builds_missing_badges(self):
+        badges = Badge.objects.for_interface(self.interface)
+        self.assertEqual([badge.name for badge in badges],
+                         ['first', 'second'])
+        self.assertTrue(all(badge.pk is None for badge in badges))
+        self.assertEqual(badges[0].progression.target, 2)
+        self.assertFalse(badges[0].acquired)
+
+    def test_progress_stores_badge(self):
+        badge = Badge.objects.get_for(self.interface, self.first)
+        badge.increment()
+        badge.save()
+
+        badge = Badge.objects.get(interface=self.interface)
+        self.assertEqual(badge.progression.progress, 1)
+        self.assertEqual(Badge.objects.for_interface(self.interface)[0],
+                         badge)
+
+    def test_repeated_progress(self):
+        for i in range(3):
+            badge = Badge.objects.get_for(self.interface, self.first)
+            badge.increment()
+            badge.save()
+
+        badge = Badge.objects.get(interface=self.interface)
+        self.assertEqual(badge.progression.progress, 3)
+        self.assertTrue(badge.acquired)
+        self.assertTrue(badge.award())
+        self.assertEqual(self.interface.points, 10)
+
+    def test_award_stores_badge(self):
+        badge = Badge.objects.get_for(self.interface, self.second)
+        badge.award()
+        badge.save()
+        self.assertEqual(Badge.acquired_objects.get().name, 'second')
+
+    def test_next_badge_is_linked_when_stored(self):
+        second = Badge.objects.materialize(self.interface, self.second)
+        self.assertIsNone(second.next_badge)
+
+        first = Badge.objects.materialize(self.interface, self.first)
+        self.assertEqual(Badge.objects.get(pk=second.pk).next_badge, first)
+        self.assertEqual(
+            Badge.objects.get_for(self.interface, self.second), second)
+
+        other = GamificationInterface.objects.create()
+        Badge.objects.materialize(other, self.first)
+        self.assertEqual(
+            Badge.objects.get_for(other, self.second).next_badge.interface,
+            other)
+        self.assertEqual(
+            Badge.objects.for_interface(other)[1].next_badge.interface,
+            other)
+
+    def test_materialize_race(self):
+        stored = Badge.objects.materialize(self.interface, self.first)
+        built = Badge.objects.build_badge(self.first, self.interface)
+        with mock.patch.object(Badge.objects, 'get_for', return_value=built):
+            badge = Badge.objects.materialize(self.interface, self.first)
+        self.assertEqual(badge, stored)
+        self.assertEqual(Badge.objects.count(), 1)
+        self.assertEqual(Progression.objects.count(), 1)
+
+
+@override_settings(GAMIFICATION_LAZY=True)
+class LazyUnlockableTest(TestCase):
+    """Tests that unlockables are only stored once they are unlocked"""
+
+    def setUp(self):
+        self.interface = GamificationInterface.objects.create()
+        self.cheap = UnlockableDefinition.objects.create(
+            name='cheap', points_required=10)
+        self.expensive = UnlockableDefinition.objects.create(
+            name='expensive', points_required=100)
+
+    def test_nothing_stored_up_front(self):
+        self.assertEqual(Unlockable.objects.count(), 0)
+
+    def test_unlock_stores_unlockable(self):
+        PointChange.objects.create(amount=5, interface=self.interface)
+        self.assertEqual(Unlockable.objects.count(), 0)
+        PointChange.objects.create(amount=5, interface=self.interface)
+        self.assertEqual(list(Unlockable.objects.values_list(
+            'name', 'acquired')), [('cheap', True)])
+
+        unlockables = Unlockable.objects.for_interface(self.interface)
+        self.assertEqual([(u.name, u.acquired, u.pk is None)
+                          for u in unlockables],
+                         [('cheap', True, False),
+                          ('expensive', False, True)])
+
+    def test_unlocked_stays_unlocked(self):
+        PointChange.objects.create(amount=10, interface=self.interface)
+        PointChange.objects.create(amount=-10, interface=self.interface)
+        self.assertTrue(
+            Unlockable.objects.get_for(self.interface, self.cheap).acquired)
+        self.assertFalse(
+            Unlockable.objects.get_for(self.interface,
+                                       self.expensive).acquired)
+
+    def test_award_bulk_stores_unlockables(self):
+        other = GamificationInterface.objects.create()
+        PointChange.objects.award_bulk([(self.interface, 150), (other, 50)])
+        self.assertEqual(sorted(Unlockable.objects.filter(
+            acquired=True).values_list('interface', 'name')),
+            [(self.interface.pk, 'cheap'), (self.interface.pk, 'expensive'),
+             (other.pk, 'cheap')])
+
+    def test_unlock_reached_without_interfaces(self):
+        Unlockable.objects.unlock_reached([])
+        self.assertEqual(Unlockable.objects.count(), 0)
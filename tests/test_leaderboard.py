@@ -0,0 +1,163 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from django_gamification.leaderboard import Leaderboard, Standing, \
+    leaderboard
+from django_gamification.models import GamificationInterface, PointChange, \
+    LeaderboardSnapshot, PointRollup
+
+UTC = datetime.timezone.utc
+
+
+class LeaderboardTest(TestCase):
+    """Tests for ranking interfaces by points"""
+
+    def setUp(self):
+        self.interfaces = GamificationInterface.objects.provision_bulk(5)
+        PointChange.objects.award_bulk(zip(self.interfaces,
+                                           [10, 50, 30, 50, 0]))
+        self.leaderboard = Leaderboard()
+
+    def ids(self, *indexes):
+        return [self.interfaces[index].pk for index in indexes]
+
+    def test_top(self):
+        first, second, third, fourth = self.ids(1, 3, 2, 0)
+        self.assertEqual(self.leaderboard.top(4), [
+            Standing(1, first, 50),
+            Standing(1, second, 50),
+            Standing(3, third, 30),
+            Standing(4, fourth, 10),
+        ])
+        self.assertEqual(len(self.leaderboard.top(10)), 5)
+
+    def test_rank(self):
+        self.assertEqual(self.leaderboard.rank(self.interfaces[3]), 1)
+        self.assertEqual(self.leaderboard.rank(self.interfaces[4].pk), 5)
+        self.assertIsNone(self.leaderboard.rank(0))
+        self.assertEqual(self.leaderboard.around(0), [])
+
+    def test_around(self):
+        self.assertEqual(
+            [standing.interface_id for standing in
+             self.leaderboard.around(self.interfaces[2], count=1)],
+            self.ids(3, 2, 0))
+        self.assertEqual(
+            [standing.interface_id for standing in
+             self.leaderboard.around(self.interfaces[1], count=1)],
+            self.ids(1, 3))
+
+    def test_follows_point_changes(self):
+        leaderboard.load()
+        with self.captureOnCommitCallbacks(execute=True):
+            PointChange.objects.create(amount=100,
+                                       interface=self.interfaces[4])
+            # Not before the change is committed
+            self.assertEqual(leaderboard.rank(self.interfaces[4]), 5)
+        self.assertEqual(leaderboard.rank(self.interfaces[4]), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.interfaces[3].reset()
+        self.assertEqual(leaderboard.rank(self.interfaces[3]), 5)
+
+        interface_id = self.interfaces[4].pk
+        with self.captureOnCommitCallbacks(execute=True):
+            self.interfaces[4].delete()
+        self.assertIsNone(leaderboard.rank(interface_id))
+        self.assertEqual(leaderboard.top(1)[0].interface_id,
+                         self.interfaces[1].pk)
+
+    def test_snapshot(self):
+        self.assertEqual(self.leaderboard.save_snapshot(batch_size=2), 5)
+        self.assertEqual(list(LeaderboardSnapshot.objects.order_by(
+            'rank', 'interface').values_list('interface', 'rank')),
+            list(zip(self.ids(1, 3, 2, 0, 4), [1, 1, 3, 4, 5])))
+
+        # Changes behind the leaderboard's back are applied on load
+        GamificationInterface.objects.filter(
+            pk=self.interfaces[0].pk).update(points_balance=60)
+        new = GamificationInterface.objects.create()
+        leaderboard = Leaderboard()
+        self.assertEqual(leaderboard.rank(self.interfaces[0]), 1)
+        self.assertEqual(leaderboard.rank(new), 5)
+
+    @override_settings(GAMIFICATION_LEADERBOARD_MAX_AGE=0)
+    def test_reload_when_too_old(self):
+        self.leaderboard.load()
+        GamificationInterface.objects.filter(
+            pk=self.interfaces[4].pk).update(points_balance=100)
+        self.assertEqual(self.leaderboard.rank(self.interfaces[4]), 1)
+
+    def test_update_leaderboard_command(self):
+        out = StringIO()
+        call_command('update_leaderboard', stdout=out)
+        self.assertIn('5 interfaces', out.getvalue())
+        self.assertEqual(LeaderboardSnapshot.objects.count(), 5)
+
+
+class PeriodLeaderboardTest(TestCase):
+    """Tests for ranking the points gained in a day, week or month"""
+
+    def award(self, interface, amount, when):
+        with mock.patch('django.utils.timezone.now', return_value=when):
+            PointChange.objects.create(amount=amount, interface=interface)
+
+    def setUp(self):
+        self.interfaces = GamificationInterface.objects.provision_bulk(4)
+        self.monday = datetime.datetime(2026, 10, 5, 12, tzinfo=UTC)
+        self.tuesday = self.monday + datetime.timedelta(days=1)
+        self.last_week = self.monday - datetime.timedelta(days=1)
+        first, second, third, fourth = self.interfaces
+
+        self.award(first, 10, self.monday)
+        self.award(first, 20, self.tuesday)
+        self.award(second, 30, self.tuesday)
+        self.award(third, 100, self.last_week)
+        self.award(third, 5, self.monday)
+        self.award(fourth, 1, self.tuesday)
+
+    def ids(self, *indexes):
+        return [self.interfaces[index].pk for index in indexes]
+
+    def test_top(self):
+        first, second, third, fourth = self.ids(0, 1, 2, 3)
+        self.assertEqual(leaderboard.top(3, PointRollup.WEEK, self.tuesday), [
+            Standing(1, first, 30),
+            Standing(1, second, 30),
+            Standing(3, third, 5),
+        ])
+        self.assertEqual(leaderboard.top(1, PointRollup.DAY, self.monday),
+                         [Standing(1, first, 10)])
+        self.assertEqual(leaderboard.top(2, PointRollup.MONTH, self.monday),
+                         [Standing(1, third, 105), Standing(2, first, 30)])
+        self.assertEqual(leaderboard.top(5, PointRollup.DAY), [])
+
+    def test_rank(self):
+        self.assertEqual(leaderboard.rank(
+            self.interfaces[1], PointRollup.WEEK, self.monday), 1)
+        self.assertEqual(leaderboard.rank(
+            self.interfaces[2], PointRollup.WEEK, self.monday), 3)
+        self.assertEqual(leaderboard.rank(
+            self.interfaces[2], PointRollup.WEEK, self.last_week), 1)
+        self.assertIsNone(leaderboard.rank(
+            self.interfaces[1], PointRollup.WEEK, self.last_week))
+
+    def test_around(self):
+        first, second, third, fourth = self.ids(0, 1, 2, 3)
+        self.assertEqual(
+            leaderboard.around(third, 1, PointRollup.WEEK, self.monday),
+            [Standing(1, second, 30), Standing(3, third, 5),
+             Standing(4, fourth, 1)])
+        self.assertEqual(
+            leaderboard.around(first, 1, PointRollup.WEEK, self.monday),
+            [Standing(1, first, 30), Standing(1, second, 30)])
+        self.assertEqual(
+            leaderboard.around(second, 5, PointRollup.DAY, self.monday), [])
+
+    def test_unknown_period(self):
+        with self.assertRaises(ValueError):
+            leaderboard.top(1, 'year')
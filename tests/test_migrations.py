@@ -0,0 +1,120 @@
+import datetime
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from django_gamification.models import GamificationInterface, \
+    PointChange, PointRollup, UnlockableDefinition, Unlockable
+
+
+def migration(name):
+    return import_module('django_gamification.migrations.' + name)
+
+
+class DataMigrationTest(TestCase):
+    """Tests for the data migrations that fix up existing rows"""
+
+    def setUp(self):
+        self.schema_editor = mock.Mock(connection=connection)
+
+    def test_unlock_covered_unlockables(self):
+        interface = GamificationInterface.objects.create()
+        UnlockableDefinition.objects.create(name='free', points_required=0)
+        UnlockableDefinition.objects.create(name='far', points_required=10)
+        Unlockable.objects.update(acquired=False)
+
+        migration('0022_unlock_covered_unlockables').unlock_covered(
+            apps, self.schema_editor)
+        self.assertEqual(list(Unlockable.objects.filter(
+            interface=interface, acquired=True
+        ).values_list('name', flat=True)), ['free'])
+
+    def test_backfill_pointrollups(self):
+        interface = GamificationInterface.objects.create()
+        old = PointChange.objects.create(amount=10, interface=interface)
+        PointChange.objects.create(amount=5, interface=interface)
+        PointChange.objects.filter(pk=old.pk).update(
+            time=timezone.now() - datetime.timedelta(days=40))
+        # Rollups as they were before the upgrade, plus a stale one
+        PointRollup.objects.all().delete()
+        PointRollup.objects.create(interface=interface, period='day',
+                                   start=datetime.date(2000, 1, 1), points=3)
+
+        migration('0023_backfill_pointrollups').backfill_rollups(
+            apps, self.schema_editor)
+        today = PointRollup.bucket_start(PointRollup.DAY, timezone.now())
+        self.assertEqual(PointRollup.objects.get(
+            interface=interface, period=PointRollup.DAY, start=today
+        ).points, 5)
+        self.assertEqual(PointRollup.objects.filter(
+            interface=interface).count(), 6)
+        self.assertFalse(PointRollup.objects.filter(
+            start=datetime.date(2000, 1, 1)).exists())
+
+        PointChange.objects.get(pk=old.pk).delete()
+        self.assertFalse(PointRollup.objects.filter(points__lt=0).exists())
+
+
+class RemoveDuplicatesMigrationTest(TransactionTestCase):
+    """Tests that duplicates are removed before the unique constraints"""
+
+    before = [('django_gamification',
+               '0014_gamificationinterface_points_balance')]
+    after = [('django_gamification', '0015_indexes')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_remove_duplicates(self):
+        old_apps = self.migrate(self.before)
+
+        def create(model_name, **kwargs):
+            return old_apps.get_model('django_gamification', model_name
+                                      )._default_manager.create(**kwargs)
+
+        interface = create('GamificationInterface')
+        definition = create('BadgeDefinition', name='b')
+        first = create('BadgeDefinition', name='first')
+        unlockable_definition = create('UnlockableDefinition', name='u',
+                                       points_required=5)
+        for model_name in ('Badge', 'Unlockable'):
+            old_apps.get_model('django_gamification',
+                               model_name)._default_manager.all().delete()
+
+        badges = [create('Badge', interface=interface,
+                         badge_definition=definition, name='b',
+                         acquired=acquired,
+                         progression=create('Progression', target=3))
+                  for acquired in (False, True, False)]
+        leading = create('Badge', interface=interface, badge_definition=first,
+                         name='first', next_badge=badges[0])
+        unlockables = [create('Unlockable', interface=interface,
+                              unlockable_definition=unlockable_definition,
+                              name='u', points_required=5, acquired=acquired)
+                       for acquired in (False, True)]
+
+        new_apps = self.migrate(self.after)
+
+        def manager(name):
+            return new_apps.get_model('django_gamification',
+                                      name)._default_manager
+
+        self.assertEqual(list(manager('Badge').filter(
+            badge_definition=definition.pk).values_list('pk', flat=True)),
+            [badges[1].pk])
+        self.assertEqual(manager('Badge').get(pk=leading.pk).next_badge_id,
+                         badges[1].pk)
+        self.assertEqual(manager('Progression').count(), 1)
+        self.assertEqual(list(manager('Unlockable').values_list(
+            'pk', flat=True)), [unlockables[1].pk])
@@ -1,9 +1,16 @@
 
-from django.test import TestCase
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
 
 from django_gamification.models import GamificationInterface, PointChange, \
     BadgeDefinition, Badge, Progression, UnlockableDefinition, Unlockable, \
-    Category
+    Category, PointRollup, interface_changed, _can_update_returning
+from django_gamification.registry import definition_registry
 
 
 class GamificationInterfaceTest(TestCase):
@@ -28,6 +35,93 @@ class GamificationInterfaceTest(TestCase):
         )
         self.assertEqual(interface.points, 100)
 
+    def test_points_balance_follows_ledger(self):
+        interface = GamificationInterface.objects.create()
+
+        first = PointChange.objects.create(amount=100, interface=interface)
+        PointChange.objects.create(amount=-30, interface=interface)
+        self.assertEqual(interface.points, 70)
+
+        first.amount = 50
+        first.save()
+        self.assertEqual(interface.points, 20)
+
+        first.delete()
+        self.assertEqual(interface.points, -30)
+
+        PointChange.objects.create(amount=5, interface=interface)
+        PointChange.objects.filter(interface=interface, amount=-30).delete()
+        self.assertEqual(interface.points, 5)
+        self.assertEqual(
+            GamificationInterface.objects.get(pk=interface.pk).points_balance,
+            5)
+
+    def test_points_balance_follows_moved_change(self):
+        interface = GamificationInterface.objects.create()
+        other = GamificationInterface.objects.create()
+        change = PointChange.objects.create(amount=100, interface=interface)
+
+        change.interface = other
+        change.amount = 60
+        change.save()
+        self.assertEqual(interface.points, 0)
+        self.assertEqual(other.points, 60)
+        self.assertEqual(dict(PointRollup.objects.filter(
+            period=PointRollup.DAY).values_list('interface', 'points')),
+            {interface.pk: 0, other.pk: 60})
+
+    def test_points_balance_without_update_returning(self):
+        interface = GamificationInterface.objects.create()
+
+        with mock.patch('django_gamification.models._can_update_returning',
+                        return_value=False):
+            change = PointChange.objects.create(amount=40,
+                                                interface=interface)
+        self.assertEqual(change._points_balance, 40)
+        self.assertEqual(interface.points, 40)
+
+        with mock.patch.object(connection.Database, 'sqlite_version_info',
+                               (3, 34, 1)):
+            self.assertFalse(_can_update_returning(connection))
+
+    def test_point_rollups_follow_ledger(self):
+        interface = GamificationInterface.objects.create()
+        first = PointChange.objects.create(amount=100, interface=interface)
+        PointChange.objects.create(amount=-30, interface=interface)
+        PointChange.objects.award_bulk([(interface, 5)])
+
+        for period, label in PointRollup.PERIOD_CHOICES:
+            self.assertEqual(PointRollup.objects.get(
+                interface=interface, period=period).points, 75)
+
+        first.amount = 50
+        first.save()
+        first.delete()
+        PointChange.objects.filter(amount=5).delete()
+        self.assertEqual(set(PointRollup.objects.filter(
+            interface=interface).values_list('points', flat=True)), {-30})
+
+        interface.reset()
+        self.assertFalse(PointRollup.objects.exists())
+
+    def test_point_rollups_use_default_timezone(self):
+        interface = GamificationInterface.objects.create()
+        # Still March 1st in New York
+        time = datetime(2026, 3, 2, 2, 0, tzinfo=dt_timezone.utc)
+
+        with timezone.override('America/New_York'):
+            change = PointChange.objects.create(amount=10,
+                                                interface=interface)
+            PointChange.objects.filter(pk=change.pk).update(time=time)
+            PointRollup.objects.all().delete()
+            PointRollup.objects.add([(interface.pk, time, 10)])
+            self.assertEqual(PointRollup.objects.get(
+                period=PointRollup.DAY).start, time.date())
+
+            PointChange.objects.filter(pk=change.pk).delete()
+        self.assertEqual(PointRollup.objects.get(
+            period=PointRollup.DAY).points, 0)
+
     def test_points_after_reset(self):
         interface = GamificationInterface.objects.create()
 
@@ -74,6 +168,160 @@ class GamificationInterfaceTest(TestCase):
         self.assertFalse(unlockable.acquired)
 
 
+class GamificationInterfaceManagerTest(TestCase):
+    """Tests for provisioning and resetting interfaces in bulk"""
+
+    def test_reset_queries_do_not_scale_with_badges(self):
+        interface = GamificationInterface.objects.create()
+        for i in range(10):
+            BadgeDefinition.objects.create(name='badge{}'.format(i),
+                                           progression_target=1)
+        for badge in interface.badge_set.all():
+            badge.increment()
+            badge.progression.save()
+            badge.save()
+
+        # savepoint, point delete, rollup delete, balance update, unlockable
+        # update, progression update, badge update, release
+        with self.assertNumQueries(8):
+            interface.reset()
+        self.assertFalse(interface.badge_set.filter(acquired=True).exists())
+        self.assertFalse(Progression.objects.filter(progress__gt=0).exists())
+
+    def test_reset_many(self):
+        UnlockableDefinition.objects.create(name='free', points_required=0)
+        UnlockableDefinition.objects.create(name='paid', points_required=10)
+        interfaces = GamificationInterface.objects.provision_bulk(5)
+        PointChange.objects.award_bulk(
+            (interface, 10) for interface in interfaces)
+        kept = interfaces.pop()
+
+        GamificationInterface.objects.reset_many(
+            GamificationInterface.objects.exclude(pk=kept.pk), batch_size=2)
+
+        self.assertEqual(kept.points, 10)
+        self.assertEqual(kept.unlockable_set.filter(acquired=True).count(), 2)
+        for interface in interfaces:
+            self.assertEqual(interface.points, 0)
+            self.assertFalse(interface.pointchange_set.exists())
+            self.assertEqual(list(interface.unlockable_set.filter(
+                acquired=True).values_list('name', flat=True)), ['free'])
+
+    def test_provision_bulk(self):
+        first = BadgeDefinition.objects.create(name='first',
+                                               progression_target=3)
+        BadgeDefinition.objects.create(name='second', next_badge=first)
+        UnlockableDefinition.objects.create(name='free', points_required=0)
+        UnlockableDefinition.objects.create(name='paid', points_required=10)
+
+        interfaces = GamificationInterface.objects.provision_bulk(
+                                                            5, batch_size=2)
+
+        self.assertEqual(len(interfaces), 5)
+        self.assertEqual(GamificationInterface.objects.count(), 5)
+        for interface in interfaces:
+            self.assertEqual(interface.badge_set.count(), 2)
+            second = interface.badge_set.get(name='second')
+            self.assertEqual(second.next_badge.interface, interface)
+            self.assertEqual(second.next_badge.progression.target, 3)
+            self.assertEqual(sorted(interface.unlockable_set.values_list(
+                'name', 'acquired')), [('free', True), ('paid', False)])
+
+
+class PointChangeManagerTest(TestCase):
+    """Tests for awarding points in bulk"""
+
+    def test_award_bulk(self):
+        first = GamificationInterface.objects.create()
+        second = GamificationInterface.objects.create()
+        third = GamificationInterface.objects.create()
+        UnlockableDefinition.objects.create(name='unlockable',
+                                            points_required=20)
+
+        created = PointChange.objects.award_bulk([
+            (first, 10),
+            (first, 15),
+            (second.pk, 25),
+            (third, 5),
+            (third, -5),
+        ], batch_size=2)
+
+        self.assertEqual(created, 5)
+        self.assertEqual(PointChange.objects.count(), 5)
+        self.assertEqual(first.points, 25)
+        self.assertEqual(second.points, 25)
+        self.assertEqual(third.points, 0)
+        self.assertEqual(sorted(Unlockable.objects.filter(
+            acquired=True).values_list('interface', flat=True)),
+            [first.pk, second.pk])
+
+    def test_award_bulk_single_round_trip(self):
+        interfaces = [GamificationInterface.objects.create()
+                      for i in range(50)]
+
+        # savepoint, insert, rollup insert and update, balance update,
+        # unlock update, release
+        with self.assertNumQueries(7):
+            PointChange.objects.award_bulk(
+                (interface, 10) for interface in interfaces)
+        self.assertEqual(interfaces[-1].points, 10)
+
+
+class PointChangeCompactionTest(TestCase):
+    """Tests for folding old PointChanges into checkpoints"""
+
+    def award(self, interface, amount, days_ago):
+        with mock.patch('django.utils.timezone.now',
+                        return_value=self.now - timedelta(days=days_ago)):
+            PointChange.objects.create(amount=amount, interface=interface)
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.first = GamificationInterface.objects.create()
+        self.second = GamificationInterface.objects.create()
+        self.third = GamificationInterface.objects.create()
+        for amount, days_ago in ((10, 40), (-5, 35), (20, 31), (7, 1)):
+            self.award(self.first, amount, days_ago)
+        self.award(self.second, 3, 50)
+        self.award(self.second, 4, 2)
+
+    def test_compact(self):
+        receiver = mock.Mock()
+        interface_changed.connect(receiver)
+        self.addCleanup(interface_changed.disconnect, receiver)
+        removed = PointChange.objects.compact(
+            self.now - timedelta(days=30), batch_size=2)
+
+        self.assertEqual(removed, 2)
+        self.assertEqual(receiver.call_args.kwargs['interface_ids'],
+                         [self.first.pk])
+        self.assertEqual(self.first.points, 32)
+        self.assertEqual(self.second.points, 7)
+        self.assertEqual(sorted(self.first.pointchange_set.values_list(
+            'amount', 'checkpoint')), [(7, False), (25, True)])
+        self.assertEqual(self.second.pointchange_set.count(), 2)
+
+        self.assertEqual(PointChange.objects.compact(
+            self.now - timedelta(days=30)), 0)
+
+    def test_checkpoint_not_in_rollups(self):
+        PointChange.objects.compact(self.now - timedelta(days=30))
+        rollups = list(PointRollup.objects.order_by('pk').values_list(
+            'points', flat=True))
+        checkpoint = self.first.pointchange_set.get(checkpoint=True)
+
+        checkpoint.amount = 30
+        checkpoint.save()
+        self.assertEqual(self.first.points, 37)
+        checkpoint.delete()
+        self.assertEqual(self.first.points, 7)
+        self.second.pointchange_set.filter(amount=3).update(checkpoint=True)
+        PointChange.objects.filter(checkpoint=True).delete()
+        self.assertEqual(self.second.points, 4)
+        self.assertEqual(list(PointRollup.objects.order_by('pk').values_list(
+            'points', flat=True)), rollups)
+
+
 class BadgeDefinitionTest(TestCase):
     """Tests that check the badge definitions are correctly created,
       additional inerfaces can be added after some badgedefinitions are already
@@ -218,6 +466,90 @@ class BadgeDefinitionTest(TestCase):
             self.assertEqual(badge.progression, None, msg=test_msg_4)
 
 
+class BadgeDefinitionFanOutTest(TestCase):
+    """Tests that new badge definitions are copied to interfaces in bulk"""
+
+    def test_new_definition_queries_do_not_scale_with_interfaces(self):
+        for i in range(30):
+            GamificationInterface.objects.create()
+        first = BadgeDefinition.objects.create(name='first',
+                                               progression_target=5)
+
+        # definition insert, interface ids, savepoint, progression insert,
+        # badge insert, next_badge update, release, version update
+        with self.assertNumQueries(8):
+            second = BadgeDefinition.objects.create(
+                name='second', progression_target=10, next_badge=first)
+
+        self.assertEqual(Badge.objects.filter(
+            badge_definition=second).count(), 30)
+        for badge in Badge.objects.filter(badge_definition=second):
+            self.assertEqual(badge.progression.target, 10)
+            self.assertEqual(badge.progression.progress, 0)
+            self.assertEqual(badge.next_badge.badge_definition, first)
+            self.assertEqual(badge.next_badge.interface_id,
+                             badge.interface_id)
+        self.assertEqual(Progression.objects.count(), 60)
+
+    def test_edited_definition_queries_do_not_scale_with_badges(self):
+        for i in range(30):
+            GamificationInterface.objects.create()
+        first = BadgeDefinition.objects.create(name='first')
+        second = BadgeDefinition.objects.create(name='second',
+                                                progression_target=10)
+
+        second.description = 'edited'
+        second.progression_target = 20
+        second.next_badge = first
+        # definition update, savepoint, progression update, badge update,
+        # release, version update
+        with self.assertNumQueries(6):
+            second.save()
+        self.assertEqual(Badge.objects.filter(
+            badge_definition=second, description='edited',
+            progression__target=20, next_badge__badge_definition=first,
+            next_badge__interface=F('interface')).count(), 30)
+
+        second.next_badge = None
+        second.progression_target = None
+        second.save()
+        self.assertEqual(Badge.objects.filter(
+            badge_definition=second, progression=None,
+            next_badge=None).count(), 30)
+        self.assertEqual(Progression.objects.count(), 0)
+
+    def test_create_badge(self):
+        first = BadgeDefinition.objects.create(name='first')
+        second = BadgeDefinition.objects.create(
+            name='second', progression_target=3, next_badge=first)
+        interface = GamificationInterface.objects.create()
+        interface.badge_set.all().delete()
+        Badge.objects.create_badge(first, interface)
+
+        badge = Badge.objects.create_badge(second, interface)
+        self.assertEqual(badge.progression.target, 3)
+        self.assertEqual(badge.next_badge.badge_definition, first)
+
+    def test_create_badges_in_chunks(self):
+        interfaces = [GamificationInterface.objects.create()
+                      for i in range(5)]
+        definitions = [
+            BadgeDefinition(name='a', points=5),
+            BadgeDefinition(name='b', progression_target=3),
+        ]
+        for definition in definitions:
+            super(BadgeDefinition, definition).save()
+
+        created = Badge.objects.create_badges(definitions, interfaces,
+                                              batch_size=2)
+        self.assertEqual(created, 10)
+        self.assertEqual(Badge.objects.filter(name='a', points=5,
+                                              progression=None).count(), 5)
+        self.assertEqual(Badge.objects.filter(
+            name='b', progression__target=3).count(), 5)
+        self.assertEqual(Badge.objects.create_badges([], interfaces), 0)
+
+
 class BadgeTest(TestCase):
     """Tests that check Badge progression and awards"""
 
@@ -237,6 +569,106 @@ class BadgeTest(TestCase):
         self.assertEqual(badge.progression.finished, True)
         self.assertEqual(badge.acquired, True)
 
+    def test_increment_by(self):
+        interface = GamificationInterface.objects.create()
+        BadgeDefinition.objects.create(name='mybadgedefinition',
+                                       progression_target=5)
+        badge = Badge.objects.get(interface=interface)
+        badge.increment(by=4)
+        self.assertFalse(badge.acquired)
+        badge.increment(by=2)
+        self.assertEqual(badge.progression.progress, 6)
+        self.assertTrue(badge.acquired)
+
+    def test_increment_many(self):
+        first = GamificationInterface.objects.create()
+        second = GamificationInterface.objects.create()
+        counted = BadgeDefinition.objects.create(
+            name='counted', progression_target=5, points=20)
+        free = BadgeDefinition.objects.create(name='free', points=10)
+        Badge.objects.filter(interface=second, badge_definition=counted
+                             ).update(revoked=True)
+
+        acquired = Badge.objects.increment_many({
+            (first, counted): 3,
+            (second.pk, counted.pk): 10,
+            (first, free): 1,
+        })
+        self.assertEqual(acquired, [])
+        self.assertEqual(Badge.objects.get(
+            interface=first, badge_definition=counted).progression.progress,
+            3)
+        self.assertEqual(Badge.objects.get(
+            interface=second, badge_definition=counted).progression.progress,
+            0)
+
+        acquired = Badge.objects.increment_many({(first, counted): 2})
+        badge = Badge.objects.get(interface=first, badge_definition=counted)
+        self.assertEqual(acquired, [badge.pk])
+        self.assertTrue(badge.acquired)
+        self.assertEqual(first.points, 20)
+
+        # Only the increment that crosses the target awards points
+        self.assertEqual(Badge.objects.increment_many({(first, counted): 1}),
+                         [])
+        self.assertEqual(first.points, 20)
+
+    @override_settings(GAMIFICATION_LAZY=True)
+    def test_increment_many_lazy(self):
+        interface = GamificationInterface.objects.create()
+        definition = BadgeDefinition.objects.create(
+            name='counted', progression_target=2)
+        Badge.objects.increment_many({(interface, definition): 1})
+        Badge.objects.increment_many({(interface, definition): 1})
+        badge = Badge.objects.get(interface=interface)
+        self.assertEqual(badge.progression.progress, 2)
+        self.assertTrue(badge.acquired)
+
+    @override_settings(GAMIFICATION_LAZY=True)
+    def test_increment_many_lazy_in_bulk(self):
+        interfaces = [GamificationInterface.objects.create()
+                      for i in range(20)]
+        self.addCleanup(definition_registry.clear)
+        with self.captureOnCommitCallbacks(execute=True):
+            first = BadgeDefinition.objects.create(name='first',
+                                                   progression_target=1)
+            second = BadgeDefinition.objects.create(
+                name='second', progression_target=2, next_badge=first)
+        stored = Badge.objects.materialize(interfaces[0], second)
+        definition_registry.badge_definitions()
+
+        # savepoint, badges, progression insert, badge insert, orphaned
+        # progressions, next_badge update, stored badges, progress update,
+        # crossed badges, acquire update, release
+        with self.assertNumQueries(11):
+            acquired = Badge.objects.increment_many(dict(
+                [((interface, first), 1) for interface in interfaces] +
+                [((interface, second), 1) for interface in interfaces]))
+        self.assertEqual(len(acquired), 20)
+        self.assertEqual(Badge.objects.filter(
+            badge_definition=second, progression__progress=1,
+            next_badge__badge_definition=first).count(), 20)
+        self.assertEqual(Progression.objects.count(), 40)
+        self.assertEqual(Badge.objects.get(pk=stored.pk).next_badge,
+                         Badge.objects.get(interface=interfaces[0],
+                                           badge_definition=first))
+
+    @override_settings(GAMIFICATION_LAZY=True)
+    def test_increment_many_lazy_stored_concurrently(self):
+        interface = GamificationInterface.objects.create()
+        definition = BadgeDefinition.objects.create(
+            name='counted', progression_target=2)
+        stored = Badge.objects.materialize(interface, definition)
+
+        # Another worker stores the badge after it was looked up
+        with mock.patch.object(type(Badge.objects), '_find_pairs',
+                               side_effect=[{}, {(interface.pk, definition.pk): (
+                                   stored.pk, stored.progression_id,
+                                   False)}]):
+            Badge.objects.increment_many({(interface, definition): 1})
+        self.assertEqual(Badge.objects.get().progression.progress, 1)
+        self.assertEqual(Progression.objects.count(), 1)
+
     def test_award(self):
         """Tests that before badge is awarded, the badge is not acquired and
           PointChange model is not updated. And after the badge is awarded the
@@ -255,6 +687,47 @@ class BadgeTest(TestCase):
         self.assertEqual(PointChange.objects.all().count(), 1)
         self.assertEqual(interface.points, 10)
 
+    def test_increment_then_award(self):
+        interface = GamificationInterface.objects.create()
+        BadgeDefinition.objects.create(name='mybadgedefinition',
+                                       progression_target=1, points=10)
+        badge = Badge.objects.get(interface=interface)
+        badge.increment()
+        badge.progression.save()
+        badge.save()
+
+        self.assertTrue(Badge.objects.get(pk=badge.pk).acquired)
+        self.assertEqual(interface.points, 0)
+        self.assertTrue(badge.award())
+        self.assertEqual(interface.points, 10)
+        self.assertFalse(Badge.objects.get(pk=badge.pk).award())
+        self.assertEqual(interface.points, 10)
+
+    def test_save_does_not_load_progression(self):
+        interface = GamificationInterface.objects.create()
+        BadgeDefinition.objects.create(name='mybadgedefinition',
+                                       progression_target=1)
+        badge = Badge.objects.get(interface=interface)
+        badge.name = 'renamed'
+
+        with self.assertNumQueries(1):
+            badge.save()
+
+    def test_revoke_unawarded(self):
+        interface = GamificationInterface.objects.create()
+        BadgeDefinition.objects.create(name='mybadgedefinition',
+                                       progression_target=1, points=10)
+        badge = Badge.objects.get(interface=interface)
+        badge.increment()
+        badge.progression.save()
+        badge.save()
+
+        # The points were never awarded, so there are none to take back
+        self.assertTrue(badge.force_revoke())
+        self.assertEqual(interface.points, 0)
+        self.assertTrue(badge.award())
+        self.assertEqual(interface.points, 10)
+
     def test_revoke_acquired_objects(self):
         interface = GamificationInterface.objects.create()
         BadgeDefinition.objects.create(
@@ -283,6 +756,66 @@ class BadgeTest(TestCase):
         self.assertEqual(interface.points, 10)
 
 
+class BadgeConcurrentAwardTest(TestCase):
+    """Tests that duplicate awards and revokes only change points once"""
+
+    def setUp(self):
+        self.interface = GamificationInterface.objects.create()
+        BadgeDefinition.objects.create(name='mybadgedefinition', points=10)
+
+    def copies(self):
+        return (Badge.objects.get(interface=self.interface),
+                Badge.objects.get(interface=self.interface))
+
+    def test_duplicate_award(self):
+        first, second = self.copies()
+        self.assertTrue(first.award())
+        self.assertFalse(second.award())
+        self.assertFalse(second.acquired)
+        self.assertEqual(self.interface.points, 10)
+        self.assertTrue(Badge.objects.get(interface=self.interface).acquired)
+
+    def test_duplicate_revoke_and_award_back(self):
+        Badge.objects.get(interface=self.interface).award()
+        first, second = self.copies()
+        self.assertTrue(first.force_revoke())
+        self.assertFalse(second.force_revoke())
+        self.assertEqual(self.interface.points, 0)
+
+        first, second = self.copies()
+        self.assertTrue(first.award())
+        self.assertFalse(second.award())
+        self.assertEqual(self.interface.points, 10)
+        self.assertEqual(PointChange.objects.count(), 3)
+
+    def test_unfinished_progression(self):
+        badge = Badge.objects.get(interface=self.interface)
+        badge.progression = Progression.objects.create(target=2)
+        badge.save()
+        self.assertFalse(badge.award())
+        self.assertFalse(badge.force_revoke())
+        self.assertEqual(self.interface.points, 0)
+
+
+class UnlockableManagerTest(TestCase):
+    """Tests for creating unlockables from definitions"""
+
+    def test_create_unlockable(self):
+        interface = GamificationInterface.objects.create()
+        PointChange.objects.create(amount=10, interface=interface)
+        definition = UnlockableDefinition(name='unlockable',
+                                          points_required=10)
+        super(UnlockableDefinition, definition).save()
+
+        Unlockable.objects.create_unlockable(definition, interface)
+        self.assertTrue(Unlockable.objects.get(interface=interface).acquired)
+
+    def test_create_unlockables_without_definitions(self):
+        interface = GamificationInterface.objects.create()
+        self.assertEqual(
+            Unlockable.objects.create_unlockables([], [interface]), 0)
+
+
 class UnlockableDefinitionTest(TestCase):
     """Test that  Unlockable Definitions are created correctly."""
     def test_save(self):
@@ -0,0 +1,147 @@
+from unittest import mock
+
+from django.db import transaction
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from django_gamification.models import BadgeDefinition, Category, \
+    GamificationInterface, RegistryVersion, UnlockableDefinition
+from django_gamification.registry import definition_registry
+
+
+class DefinitionRegistryTest(TestCase):
+    """Tests for the in-process definition registry"""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category = Category.objects.create(name='category')
+            self.second = BadgeDefinition.objects.create(
+                name='second', category=self.category)
+            self.first = BadgeDefinition.objects.create(
+                name='first', next_badge=self.second)
+            self.unlockable = UnlockableDefinition.objects.create(
+                name='unlockable', points_required=10)
+
+    def tearDown(self):
+        definition_registry.clear()
+
+    def test_definitions(self):
+        self.assertEqual(definition_registry.badge_definitions(),
+                         [self.second, self.first])
+        self.assertEqual(definition_registry.unlockable_definitions(),
+                         [self.unlockable])
+        self.assertEqual(definition_registry.categories(),
+                         {self.category.pk: self.category})
+        self.assertEqual(definition_registry.badge_definition(self.first.pk),
+                         self.first)
+        self.assertEqual(
+            definition_registry.unlockable_definition(self.unlockable.pk),
+            self.unlockable)
+        self.assertIsNone(definition_registry.badge_definition(0))
+
+    def test_loaded_once(self):
+        definition_registry.badge_definitions()
+
+        with self.assertNumQueries(0):
+            definition = definition_registry.badge_definition(self.second.pk)
+            definition_registry.unlockable_definitions()
+            self.assertEqual(definition.category, self.category)
+
+    def test_next_badges(self):
+        self.assertEqual(definition_registry.next_badges(self.first),
+                         [self.second])
+        self.assertEqual(definition_registry.next_badges(self.second.pk), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.next_badge = self.first
+            self.second.save()
+        self.assertEqual(definition_registry.next_badges(self.first),
+                         [self.second])
+
+    def test_unlockable_definitions_between(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            cheap = UnlockableDefinition.objects.create(
+                name='cheap', points_required=5)
+            same = UnlockableDefinition.objects.create(
+                name='same', points_required=10)
+
+        between = definition_registry.unlockable_definitions_between
+        self.assertEqual(between(0, 4), [])
+        self.assertEqual(between(0, 5), [cheap])
+        self.assertEqual(between(5, 10), [self.unlockable, same])
+        self.assertEqual(between(10, 100), [])
+        self.assertEqual(between(20, 0), [])
+
+    def test_save_reloads(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.unlockable.points_required = 20
+            self.unlockable.save()
+
+        self.assertEqual(definition_registry.unlockable_definitions()[0]
+                         .points_required, 20)
+
+    def test_delete_reloads(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.delete()
+        self.assertEqual(definition_registry.badge_definitions(),
+                         [self.second])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.delete()
+        self.assertEqual(definition_registry.badge_definitions(), [])
+        self.assertEqual(definition_registry.categories(), {})
+
+    @override_settings(GAMIFICATION_REGISTRY_CHECK_INTERVAL=0)
+    def test_version_change_reloads(self):
+        definition_registry.badge_definitions()
+        BadgeDefinition.objects.filter(pk=self.first.pk).update(name='moved')
+
+        # Another process changed the definitions
+        RegistryVersion.objects.update(version=F('version') + 1)
+
+        self.assertEqual(
+            definition_registry.badge_definition(self.first.pk).name, 'moved')
+
+    def test_version_checked_at_interval(self):
+        definition_registry.badge_definitions()
+        checked = definition_registry._checked
+
+        with self.assertNumQueries(0):
+            definition_registry.badge_definitions()
+
+        with mock.patch('time.monotonic', return_value=checked + 5):
+            with self.assertNumQueries(1):
+                definition_registry.badge_definitions()
+            with override_settings(
+                    GAMIFICATION_REGISTRY_CHECK_INTERVAL=None), \
+                    self.assertNumQueries(0):
+                definition_registry.badge_definitions()
+
+    def test_uncommitted_change_stays_in_thread(self):
+        definition_registry.badge_definitions()
+
+        with self.captureOnCommitCallbacks():
+            third = BadgeDefinition.objects.create(name='third')
+        self.assertIn(third, definition_registry.badge_definitions())
+        self.assertNotIn(
+            third, definition_registry._definitions.badge_definitions)
+
+    def test_rolled_back_change_is_dropped(self):
+        definition_registry.badge_definitions()
+
+        try:
+            with transaction.atomic():
+                third = BadgeDefinition.objects.create(name='third')
+                self.assertIn(third, definition_registry.badge_definitions())
+                raise ValueError
+        except ValueError:
+            pass
+
+        self.assertEqual(definition_registry.badge_definitions(),
+                         [self.second, self.first])
+
+    def test_new_interface_uses_registry(self):
+        interface = GamificationInterface.objects.create()
+
+        self.assertEqual(interface.badge_set.count(), 2)
+        self.assertEqual(interface.unlockable_set.count(), 1)
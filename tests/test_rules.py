@@ -0,0 +1,104 @@
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+
+from django_gamification import events
+from django_gamification.models import BadgeDefinition, Badge, \
+    GamificationEvent, GamificationInterface
+from django_gamification.registry import definition_registry
+from django_gamification.rules import rule_engine
+
+
+def long_comment(event):
+    return event.data is not None and event.data.get('length', 0) >= 100
+
+
+class RuleEngineTest(TestCase):
+    """Tests that badge definition triggers progress and award badges"""
+
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.interface = GamificationInterface.objects.create()
+            self.commenter = BadgeDefinition.objects.create(
+                name='commenter', progression_target=3, points=10,
+                trigger='comment')
+            self.essayist = BadgeDefinition.objects.create(
+                name='essayist', trigger='comment',
+                trigger_predicate='tests.test_rules.long_comment')
+            self.voter = BadgeDefinition.objects.create(
+                name='voter', progression_target=1, trigger='vote')
+            BadgeDefinition.objects.create(name='manual')
+
+    def tearDown(self):
+        definition_registry.clear()
+
+    def badge(self, definition):
+        return Badge.objects.select_related('progression').get(
+            interface=self.interface, badge_definition=definition)
+
+    def comment(self, length):
+        return events.Event(self.interface.pk, 'comment', 1, None, 0,
+                            {'length': length})
+
+    def test_dispatch_table(self):
+        self.assertEqual(
+            [rule.badge_definition_id for rule in rule_engine.rules(
+                'comment')], [self.commenter.pk, self.essayist.pk])
+        self.assertEqual(rule_engine.rules('unknown'), [])
+
+        self.assertEqual(
+            [rule.badge_definition_id for rule in rule_engine.match(
+                self.comment(10))], [self.commenter.pk])
+        self.assertEqual(
+            [rule.badge_definition_id for rule in rule_engine.match(
+                self.comment(200))], [self.commenter.pk, self.essayist.pk])
+
+    def test_recompiled_when_definitions_change(self):
+        rule_engine.rules('comment')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.voter.trigger = 'comment'
+            self.voter.save()
+        self.assertEqual(len(rule_engine.rules('comment')), 3)
+        self.assertEqual(rule_engine.rules('vote'), [])
+
+    def test_invalid_predicate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.voter.trigger_predicate = 'tests.test_rules.missing'
+            self.voter.save()
+
+        with self.assertLogs('django_gamification.rules', 'ERROR'):
+            self.assertEqual(rule_engine.rules('vote'), [])
+        self.assertEqual(len(rule_engine.rules('comment')), 2)
+
+        with self.assertRaises(ValidationError):
+            self.voter.clean()
+        self.essayist.clean()
+
+    def test_process_events(self):
+        events.process_events([self.comment(10), self.comment(20)])
+        self.assertEqual(self.badge(self.commenter).progression.progress, 2)
+        self.assertFalse(self.badge(self.essayist).acquired)
+
+        events.process_events([self.comment(150), self.comment(300)])
+        self.assertTrue(self.badge(self.commenter).acquired)
+        self.assertTrue(self.badge(self.essayist).acquired)
+        self.assertFalse(self.badge(self.voter).acquired)
+        self.assertEqual(self.interface.points, 14)
+
+    def test_revoked_badge_not_awarded(self):
+        events.process_events([self.comment(150)])
+        badge = self.badge(self.essayist)
+        badge.force_revoke()
+
+        events.process_events([self.comment(150)])
+        self.assertTrue(self.badge(self.essayist).revoked)
+
+    @override_settings(
+        GAMIFICATION_EVENT_QUEUE='django_gamification.events.OutboxQueue')
+    def test_outbox_keeps_data(self):
+        events.emit(self.interface, 'comment', data={'length': 120})
+        self.assertEqual(GamificationEvent.objects.get().data,
+                         {'length': 120})
+
+        events.get_queue().drain()
+        self.assertTrue(self.badge(self.essayist).acquired)
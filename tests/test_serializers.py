@@ -0,0 +1,100 @@
+from django.test import TestCase
+
+from django_gamification.extensions.drf.serializers import \
+    BadgeDefinitionSerializer, BadgeSerializer, BadgeValuesSerializer, \
+    GamificationInterfaceSerializer, GamificationInterfaceValuesSerializer, \
+    PointChangeSerializer, PointChangeValuesSerializer, UnlockableSerializer, \
+    UnlockableValuesSerializer
+from django_gamification.models import GamificationInterface, PointChange, \
+    BadgeDefinition, Badge, Category, UnlockableDefinition, Unlockable
+
+
+class EagerLoadingTest(TestCase):
+    """Tests that list serialization costs a constant number of queries"""
+
+    def setUp(self):
+        category = Category.objects.create(name='category')
+        for i in range(3):
+            BadgeDefinition.objects.create(name='badge{}'.format(i),
+                                           progression_target=2,
+                                           category=category)
+        UnlockableDefinition.objects.create(name='unlockable',
+                                            points_required=5)
+        self.interfaces = GamificationInterface.objects.provision_bulk(5)
+        PointChange.objects.award_bulk(
+            (interface, i) for i, interface in enumerate(self.interfaces))
+
+    def serialize(self, serializer_class, queryset):
+        with self.assertNumQueries(1):
+            return serializer_class(
+                serializer_class.setup_eager_loading(queryset),
+                many=True).data
+
+    def test_interfaces(self):
+        data = self.serialize(GamificationInterfaceSerializer,
+                              GamificationInterface.objects.order_by('pk'))
+        self.assertEqual([dict(row) for row in data], [
+            {'id': interface.pk, 'points': i}
+            for i, interface in enumerate(self.interfaces)])
+
+    def test_badges(self):
+        data = self.serialize(BadgeSerializer, Badge.objects.all())
+        self.assertEqual(len(data), 15)
+        self.assertEqual(dict(data[0]['progression']), {
+            'id': data[0]['progression']['id'], 'progress': 0, 'target': 2,
+            'finished': False})
+
+    def test_badge_definitions(self):
+        data = self.serialize(BadgeDefinitionSerializer,
+                              BadgeDefinition.objects.all())
+        self.assertEqual([row['category']['name'] for row in data],
+                         ['category'] * 3)
+
+    def test_unlockables(self):
+        data = self.serialize(UnlockableSerializer, Unlockable.objects.all())
+        self.assertEqual(len(data), 5)
+
+
+class ValuesSerializerTest(TestCase):
+    """Tests that the values serializers match the model serializers"""
+
+    def setUp(self):
+        definition = BadgeDefinition.objects.create(
+            name='progress', progression_target=2, points=5)
+        BadgeDefinition.objects.create(name='plain', description='text')
+        UnlockableDefinition.objects.create(name='unlockable',
+                                            points_required=5)
+        interfaces = GamificationInterface.objects.provision_bulk(3)
+        PointChange.objects.award_bulk(
+            (interface, 10) for interface in interfaces)
+        PointChange.objects.create(amount=-3, interface=interfaces[0])
+        Badge.objects.increment_many({(interfaces[1], definition): 2})
+
+    def assertSameOutput(self, serializer_class, values_serializer_class,
+                         queryset):
+        queryset = queryset.order_by('pk')
+        expected = serializer_class(queryset, many=True).data
+        with self.assertNumQueries(1):
+            data = values_serializer_class(queryset).data
+        self.assertEqual(data, expected)
+        self.assertEqual([list(row) for row in data],
+                         [list(row) for row in expected])
+
+    def test_interfaces(self):
+        self.assertSameOutput(GamificationInterfaceSerializer,
+                              GamificationInterfaceValuesSerializer,
+                              GamificationInterface.objects.all())
+
+    def test_point_changes(self):
+        self.assertSameOutput(PointChangeSerializer,
+                              PointChangeValuesSerializer,
+                              PointChange.objects.all())
+
+    def test_badges(self):
+        self.assertSameOutput(BadgeSerializer, BadgeValuesSerializer,
+                              Badge.objects.all())
+
+    def test_unlockables(self):
+        self.assertSameOutput(UnlockableSerializer,
+                              UnlockableValuesSerializer,
+                              Unlockable.objects.all())
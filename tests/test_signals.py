@@ -1,8 +1,11 @@
 
+from unittest import mock
+
 from django.test import TestCase
 
 from django_gamification.models import PointChange, GamificationInterface, \
     BadgeDefinition, Badge, UnlockableDefinition, Unlockable
+from django_gamification.registry import definition_registry
 from django_gamification.signals import check_unlockables
 
 
@@ -14,6 +17,9 @@ class CheckUnlockablesTest(TestCase):
 
 class CheckGamificationInterfaceCreateTest(TestCase):
     """ Tests that new badges are created when a new interface is created """
+    def tearDown(self):
+        definition_registry.clear()
+
     def test_badges_after_interface_create(self):
         BadgeDefinition.objects.create(
             name='mybadgedefinition',
@@ -23,6 +29,24 @@ class CheckGamificationInterfaceCreateTest(TestCase):
         GamificationInterface.objects.create()
         self.assertEqual(Badge.objects.count(), 1)
 
+    def test_interface_create_queries_do_not_scale_with_definitions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(10):
+                BadgeDefinition.objects.create(name='badge{}'.format(i),
+                                               progression_target=i + 1)
+                UnlockableDefinition.objects.create(
+                    name='unlockable{}'.format(i), points_required=i)
+        definition_registry.badge_definitions()
+
+        # interface insert, then for badges: definitions, savepoint,
+        # progression insert, badge insert, release and for unlockables:
+        # definitions, savepoint, insert, unlock update, release
+        with self.assertNumQueries(11):
+            interface = GamificationInterface.objects.create()
+        self.assertEqual(interface.badge_set.count(), 10)
+        self.assertEqual(interface.unlockable_set.filter(
+            acquired=True).count(), 1)
+
     def test_badges_after_interface_save(self):
         interface = GamificationInterface.objects.create()
         BadgeDefinition.objects.create(
@@ -53,3 +77,79 @@ class CheckGamificationInterfaceCreateTest(TestCase):
         Unlockable.objects.all().delete()
         interface.save()
         self.assertEqual(Unlockable.objects.count(), 0)
+
+
+class CheckUnlockablesIncrementalTest(TestCase):
+    """ Tests that only the unlockables crossed by a change are unlocked """
+    def setUp(self):
+        self.interface = GamificationInterface.objects.create()
+        with self.captureOnCommitCallbacks(execute=True):
+            for points_required in (10, 20, 30):
+                UnlockableDefinition.objects.create(
+                    name='unlockable{}'.format(points_required),
+                    points_required=points_required,
+                )
+
+    def tearDown(self):
+        definition_registry.clear()
+
+    def acquired(self):
+        return sorted(Unlockable.objects.filter(
+            interface=self.interface, acquired=True
+        ).values_list('points_required', flat=True))
+
+    def test_unlocks_crossed_range(self):
+        PointChange.objects.create(amount=15, interface=self.interface)
+        self.assertEqual(self.acquired(), [10])
+        PointChange.objects.create(amount=15, interface=self.interface)
+        self.assertEqual(self.acquired(), [10, 20, 30])
+
+    def test_negative_change_does_nothing(self):
+        PointChange.objects.create(amount=25, interface=self.interface)
+        with self.assertNumQueries(6):
+            # savepoint, balance update, insert, rollup insert and update and
+            # release, no unlock check
+            PointChange.objects.create(amount=-25, interface=self.interface)
+        self.assertEqual(self.acquired(), [10, 20])
+
+    def test_one_unlock_query(self):
+        PointChange.objects.create(amount=11, interface=self.interface)
+        with self.assertNumQueries(7):
+            # savepoint, balance update, insert, rollup insert and update,
+            # unlock update and release
+            PointChange.objects.create(amount=8, interface=self.interface)
+        with self.assertNumQueries(7):
+            PointChange.objects.create(amount=1, interface=self.interface)
+        self.assertEqual(self.acquired(), [10, 20])
+
+    def test_definition_unknown_to_registry(self):
+        # Another process created the definition, this one's registry is
+        # still stale
+        definition_registry.unlockable_definitions()
+        with mock.patch.object(definition_registry, 'invalidate'):
+            UnlockableDefinition.objects.create(name='unlockable15',
+                                                points_required=15)
+        PointChange.objects.create(amount=16, interface=self.interface)
+        self.assertEqual(self.acquired(), [10, 15])
+
+    def test_edited_change_checks_full_balance(self):
+        change = PointChange.objects.create(amount=5, interface=self.interface)
+        change.amount = 35
+        change.save()
+        self.assertEqual(self.acquired(), [10, 20, 30])
+
+    def test_new_unlockable_already_covered_by_balance(self):
+        PointChange.objects.create(amount=25, interface=self.interface)
+        UnlockableDefinition.objects.create(name='cheap', points_required=5)
+        self.assertEqual(self.acquired(), [5, 10, 20])
+
+        definition = UnlockableDefinition.objects.get(name='unlockable30')
+        definition.points_required = 25
+        definition.save()
+        self.assertEqual(self.acquired(), [5, 10, 20, 25])
+
+    def test_new_interface_with_free_unlockable(self):
+        UnlockableDefinition.objects.create(name='free', points_required=0)
+        interface = GamificationInterface.objects.create()
+        self.assertTrue(Unlockable.objects.get(
+            interface=interface, name='free').acquired)
@@ -0,0 +1,169 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from django_gamification.cache import state_cache
+from django_gamification.extensions.drf.views import \
+    GamificationInterfaceViewSet, BadgeViewSet, PointChangeViewSet, \
+    PointChangePagination
+from django_gamification.models import GamificationInterface, PointChange, \
+    BadgeDefinition
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'gamification': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'views',
+        },
+    },
+    GAMIFICATION_CACHE='gamification',
+)
+class ViewSetTest(TestCase):
+    """Tests for the DRF viewsets"""
+
+    def setUp(self):
+        caches['gamification'].clear()
+        self.factory = APIRequestFactory()
+        self.staff = User.objects.create_user('staff', is_staff=True)
+        self.interface = GamificationInterface.objects.create()
+        self.other = GamificationInterface.objects.create()
+        BadgeDefinition.objects.create(name='badge', progression_target=2)
+
+    def get(self, viewset, action, path, **kwargs):
+        headers = kwargs.pop('headers', {})
+        user = kwargs.pop('user', self.staff)
+        request = self.factory.get(path, HTTP_ACCEPT='application/json',
+                                   **headers)
+        force_authenticate(request, user=user)
+        return viewset.as_view({'get': action})(request, **kwargs)
+
+    def test_staff_only(self):
+        path = '/badges/?interface={}'.format(self.interface.pk)
+        response = self.get(BadgeViewSet, 'list', path,
+                            user=User.objects.create_user('player'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_point_history_pages(self):
+        now = timezone.now()
+        changes = [PointChange.objects.create(amount=i,
+                                              interface=self.interface)
+                   for i in range(5)]
+        # Two changes at the same time are ordered by id
+        PointChange.objects.filter(pk__in=[c.pk for c in changes[:2]]).update(
+            time=now - datetime.timedelta(days=1))
+        PointChange.objects.create(amount=100, interface=self.other)
+
+        amounts = []
+        path = '/point-changes/?interface={}'.format(self.interface.pk)
+        with mock.patch.object(PointChangePagination, 'page_size', 2):
+            while path:
+                response = self.get(PointChangeViewSet, 'list', path)
+                self.assertEqual(response.status_code, 200)
+                amounts.extend(row['amount']
+                               for row in response.data['results'])
+                path = response.data['next']
+        self.assertEqual(amounts, [4, 3, 2, 1, 0])
+
+    def test_invalid_cursor(self):
+        response = self.get(PointChangeViewSet, 'list',
+                            '/point-changes/?cursor=bogus')
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_interface(self):
+        response = self.get(BadgeViewSet, 'list', '/badges/?interface=x')
+        self.assertEqual(response.status_code, 400)
+
+    def test_not_modified(self):
+        path = '/badges/?interface={}'.format(self.interface.pk)
+        response = self.get(BadgeViewSet, 'list', path)
+        self.assertEqual(len(response.data['results']), 1)
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+
+        with self.assertNumQueries(0):
+            response = self.get(BadgeViewSet, 'list', path, headers={
+                'HTTP_IF_NONE_MATCH': etag})
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PointChange.objects.create(amount=5, interface=self.interface)
+        response = self.get(BadgeViewSet, 'list', path, headers={
+            'HTTP_IF_NONE_MATCH': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        other = self.get(BadgeViewSet, 'list',
+                         '/badges/?interface={}'.format(self.other.pk))
+        self.assertNotEqual(other['ETag'], response['ETag'])
+
+    def test_compacted_history_is_modified(self):
+        for amount in (1, 2):
+            PointChange.objects.create(amount=amount, interface=self.interface)
+        path = '/point-changes/?interface={}'.format(self.interface.pk)
+        etag = self.get(PointChangeViewSet, 'list', path)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PointChange.objects.compact(timezone.now())
+        response = self.get(PointChangeViewSet, 'list', path, headers={
+            'HTTP_IF_NONE_MATCH': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['amount'] for row in response.data['results']],
+                         [3])
+
+    def test_unknown_interface_has_no_version(self):
+        for path, viewset, kwargs in (
+                ('/badges/?interface=999', BadgeViewSet, {}),
+                ('/interfaces/999/', GamificationInterfaceViewSet,
+                 {'pk': 999}),
+                ('/interfaces/x/', GamificationInterfaceViewSet, {'pk': 'x'})):
+            response = self.get(viewset, 'list' if not kwargs else 'retrieve',
+                                path, **kwargs)
+            self.assertNotIn('ETag', response)
+        self.assertIsNone(state_cache.version(999, create=False))
+
+    def test_interface_retrieve(self):
+        PointChange.objects.create(amount=5, interface=self.interface)
+        response = self.get(GamificationInterfaceViewSet, 'retrieve',
+                            '/interfaces/{}/'.format(self.interface.pk),
+                            pk=self.interface.pk)
+        self.assertEqual(response.data, {'id': self.interface.pk,
+                                         'points': 5})
+
+        response = self.get(
+            GamificationInterfaceViewSet, 'retrieve',
+            '/interfaces/{}/'.format(self.interface.pk),
+            pk=self.interface.pk,
+            headers={'HTTP_IF_NONE_MATCH': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+        # Dates cannot tell apart changes made within the same second
+        response = self.get(
+            GamificationInterfaceViewSet, 'retrieve',
+            '/interfaces/{}/'.format(self.interface.pk),
+            pk=self.interface.pk,
+            headers={'HTTP_IF_MODIFIED_SINCE': http_date()})
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_without_interface(self):
+        response = self.get(GamificationInterfaceViewSet, 'list',
+                            '/interfaces/')
+        self.assertEqual([row['id'] for row in response.data['results']],
+                         [self.interface.pk, self.other.pk])
+        self.assertNotIn('ETag', response)
+
+    @override_settings(GAMIFICATION_CACHE=None)
+    def test_without_cache(self):
+        response = self.get(BadgeViewSet, 'list', '/badges/?interface={}'
+                            .format(self.interface.pk))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)